@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+import uuid
+from typing import Iterable, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.cache import cache_categorias, cache_supermercados
+from app.condicional import incrementar_version
+from app.db.database import AsyncSessionLocal
+from app.db.totales import descontar_productos
+from app.indices.autocompletar import indice_autocompletar
+from app.indices.ordenados import indices_ordenados
+from app.indices.precios import matriz_precios
+
+# Borrado de supermercados, categorías, productos y listas con sentencias por
+# conjuntos, sin cargar los hijos en la sesión. En PostgreSQL las claves ajenas
+# tienen ON DELETE CASCADE (migración 5) y basta con borrar el padre; en SQLite
+# no se comprueban las claves ajenas y se borran antes los hijos.
+# La purga asíncrona borra un supermercado o una categoría grande por lotes,
+# cada uno en su propia transacción, y se puede consultar su avance en /borrados.
+
+# Productos o listas que se borran en cada lote de una purga
+TAMANO_LOTE_BORRADO = int(os.getenv("TAMANO_LOTE_BORRADO", 5000))
+# Purgas terminadas que se guardan para consultar su resultado
+PURGAS_GUARDADAS = int(os.getenv("PURGAS_GUARDADAS", 100))
+
+logger = logging.getLogger("app.borrado")
+
+MODELOS = {"supermercado": models.Supermercado, "categoria": models.Categoria}
+
+
+# True si la base de datos borra en cascada las filas dependientes
+def cascada_en_bd(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+
+def _borrar(modelo, *condiciones):
+    return delete(modelo).where(*condiciones).execution_options(synchronize_session=False)
+
+
+# Quita de los índices en memoria los productos borrados: filas (id, nombre, precio)
+def quitar_de_indices(eliminados: Iterable):
+    for producto_id, nombre, precio in eliminados:
+        indice_autocompletar.quitar(nombre)
+        indices_ordenados.quitar(producto_id, nombre, precio)
+        matriz_precios.quitar(producto_id)
+
+
+# Borra productos y sus filas de producto_lista, descontándolas de los totales de las listas.
+# - **productos_ids**: lista de ids o SELECT de ids de producto.
+async def borrar_productos(db: AsyncSession, productos_ids):
+    await db.execute(descontar_productos(productos_ids))
+    if not cascada_en_bd(db):
+        await db.execute(_borrar(models.ProductoLista, models.ProductoLista.producto_id.in_(productos_ids)))
+    await db.execute(_borrar(models.Producto, models.Producto.id.in_(productos_ids)))
+
+
+# Borra listas de la compra con sus productos.
+# - **listas_ids**: lista de ids o SELECT de ids de lista.
+async def borrar_listas(db: AsyncSession, listas_ids):
+    if not cascada_en_bd(db):
+        await db.execute(_borrar(models.ProductoLista, models.ProductoLista.lista_compra_id.in_(listas_ids)))
+    await db.execute(_borrar(models.ListaCompra, models.ListaCompra.id.in_(listas_ids)))
+
+
+# Borra un supermercado o una categoría con todo lo que depende de él.
+# Devuelve False si no existe.
+async def borrar(db: AsyncSession, tipo: str, id: int) -> bool:
+    modelo = MODELOS[tipo]
+    productos = select(models.Producto.id).where(getattr(models.Producto, f"{tipo}_id") == id)
+    if cascada_en_bd(db):
+        # Sus productos también pueden estar en listas de otros supermercados
+        await db.execute(descontar_productos(productos))
+    else:
+        # borrar_productos ya los descuenta de los totales de las listas
+        await borrar_productos(db, productos)
+        if tipo == "supermercado":
+            await borrar_listas(db, select(models.ListaCompra.id).where(models.ListaCompra.supermercado_id == id))
+    resultado = await db.execute(_borrar(modelo, modelo.id == id))
+    return resultado.rowcount > 0
+
+
+# Invalida cachés y versiones tras borrar un supermercado o una categoría
+def borrado_terminado(tipo: str):
+    (cache_supermercados if tipo == "supermercado" else cache_categorias).invalidar()
+    incrementar_version(tipo, "producto", "lista_compra")
+
+
+# Estado de una purga asíncrona
+class Purga:
+    def __init__(self, tipo: str, objetivo_id: int, productos: int, listas: int):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.objetivo_id = objetivo_id
+        self.estado = "pendiente"  # pendiente, en_curso, terminada o error
+        self.productos_total = productos
+        self.listas_total = listas
+        self.productos_borrados = 0
+        self.listas_borradas = 0
+        self.lotes = 0
+        self.creada = time.time()
+        self.terminada = None
+        self.error = None
+
+    @property
+    def activa(self) -> bool:
+        return self.estado in ("pendiente", "en_curso")
+
+    def resumen(self) -> dict:
+        total = self.productos_total + self.listas_total
+        borrados = self.productos_borrados + self.listas_borradas
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "objetivo_id": self.objetivo_id,
+            "estado": self.estado,
+            "productos": {"borrados": self.productos_borrados, "total": self.productos_total},
+            "listas": {"borradas": self.listas_borradas, "total": self.listas_total},
+            "lotes": self.lotes,
+            "porcentaje": 100.0 if self.estado == "terminada" else round(100 * borrados / total, 1) if total else 0.0,
+            "segundos": round((self.terminada or time.time()) - self.creada, 3),
+            "error": self.error,
+        }
+
+
+# Purgas de este worker por id, en orden de creación
+purgas = {}
+_tareas = set()
+
+
+def _guardar_purga(purga: Purga):
+    purgas[purga.id] = purga
+    terminadas = [id for id, otra in purgas.items() if not otra.activa]
+    for id in terminadas[:max(0, len(terminadas) - PURGAS_GUARDADAS)]:
+        del purgas[id]
+
+
+# Empieza la purga de un supermercado o una categoría en segundo plano y
+# devuelve su estado; si ya hay una en curso para el mismo objetivo, devuelve esa.
+async def iniciar_purga(db: AsyncSession, tipo: str, objetivo_id: int) -> Optional[Purga]:
+    for purga in purgas.values():
+        if purga.tipo == tipo and purga.objetivo_id == objetivo_id and purga.activa:
+            return purga
+
+    modelo = MODELOS[tipo]
+    if await db.get(modelo, objetivo_id) is None:
+        return None
+    productos = await db.scalar(
+        select(func.count(models.Producto.id)).where(getattr(models.Producto, f"{tipo}_id") == objetivo_id)
+    )
+    listas = 0
+    if tipo == "supermercado":
+        listas = await db.scalar(select(func.count(models.ListaCompra.id)).where(models.ListaCompra.supermercado_id == objetivo_id))
+
+    purga = Purga(tipo, objetivo_id, productos, listas)
+    _guardar_purga(purga)
+    # Contexto vacío: las sentencias de la purga no cuentan en las métricas ni en el perfil de la petición
+    tarea = asyncio.create_task(_purgar(purga), context=contextvars.Context())
+    _tareas.add(tarea)
+    tarea.add_done_callback(_tareas.discard)
+    return purga
+
+
+async def _purgar(purga: Purga):
+    purga.estado = "en_curso"
+    columna = getattr(models.Producto, f"{purga.tipo}_id")
+    try:
+        # Productos por lotes, cada lote en su transacción
+        while True:
+            async with AsyncSessionLocal() as db:
+                eliminados = (await db.execute(
+                    select(models.Producto.id, models.Producto.nombre, models.Producto.precio)
+                    .where(columna == purga.objetivo_id)
+                    .order_by(models.Producto.id)
+                    .limit(TAMANO_LOTE_BORRADO)
+                )).all()
+                if not eliminados:
+                    break
+                await borrar_productos(db, [producto_id for producto_id, *_ in eliminados])
+                await db.commit()
+            quitar_de_indices(eliminados)
+            incrementar_version("producto", "lista_compra")
+            purga.productos_borrados += len(eliminados)
+            purga.lotes += 1
+            # Deja pasar las peticiones que esperan entre un lote y el siguiente
+            await asyncio.sleep(0)
+
+        # Listas de la compra del supermercado
+        while purga.tipo == "supermercado":
+            async with AsyncSessionLocal() as db:
+                listas = (await db.execute(
+                    select(models.ListaCompra.id)
+                    .where(models.ListaCompra.supermercado_id == purga.objetivo_id)
+                    .order_by(models.ListaCompra.id)
+                    .limit(TAMANO_LOTE_BORRADO)
+                )).scalars().all()
+                if not listas:
+                    break
+                await borrar_listas(db, listas)
+                await db.commit()
+            incrementar_version("lista_compra")
+            purga.listas_borradas += len(listas)
+            purga.lotes += 1
+            await asyncio.sleep(0)
+
+        # El supermercado o la categoría, ya sin nada que dependa de él
+        async with AsyncSessionLocal() as db:
+            await borrar(db, purga.tipo, purga.objetivo_id)
+            await db.commit()
+        borrado_terminado(purga.tipo)
+        purga.estado = "terminada"
+    except Exception as e:
+        logger.exception("Error en la purga %s de %s %s", purga.id, purga.tipo, purga.objetivo_id)
+        purga.estado = "error"
+        purga.error = str(e)
+    finally:
+        purga.terminada = time.time()
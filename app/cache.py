@@ -0,0 +1,137 @@
+import hashlib
+import hmac
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+
+# Tiempo de vida (segundos) y número máximo de entradas de cada caché
+CACHE_NOMBRES_TTL = float(os.getenv("CACHE_NOMBRES_TTL", "300"))
+CACHE_NOMBRES_CAPACIDAD = int(os.getenv("CACHE_NOMBRES_CAPACIDAD", "1024"))
+
+# Tiempo de vida (segundos) y capacidad de la caché de credenciales verificadas
+CACHE_LOGIN_TTL = float(os.getenv("CACHE_LOGIN_TTL", "60"))
+CACHE_LOGIN_CAPACIDAD = int(os.getenv("CACHE_LOGIN_CAPACIDAD", "10000"))
+
+
+# Caché LRU nombre -> id para tablas pequeñas que casi no cambian.
+# Solo guarda los nombres encontrados: un nombre que no existe se vuelve a
+# consultar siempre, así un alta hecha en otro worker se ve al momento.
+# Las escrituras de la propia tabla llaman a invalidar(), pero solo en su worker:
+# un borrado hecho en otro worker no se ve hasta que caduca la entrada. Por eso
+# quien va a guardar el id en una clave ajena usa resolver(..., comprobar=True).
+class CacheNombres:
+    def __init__(self, modelo, capacidad: int = CACHE_NOMBRES_CAPACIDAD, ttl: float = CACHE_NOMBRES_TTL):
+        self.modelo = modelo
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # nombre -> (id, caduca)
+        self.aciertos = 0
+        self.fallos = 0
+
+    # Id de la fila con ese nombre, o None si no existe.
+    # - **comprobar**: confirma un acierto por clave primaria y bloquea la fila hasta el commit
+    #   (FOR SHARE en PostgreSQL) para que no se borre antes de guardar el id en una clave ajena.
+    #   Si ya no está (o se ha renombrado) se busca de nuevo por nombre.
+    async def resolver(self, db: AsyncSession, nombre: str, comprobar: bool = False) -> Optional[int]:
+        entrada = self._entradas.get(nombre)
+        if entrada is not None and entrada[1] > time.monotonic() and (not comprobar or await self._existe(db, entrada[0], nombre)):
+            self._entradas.move_to_end(nombre)
+            self.aciertos += 1
+            return entrada[0]
+
+        self.fallos += 1
+        consulta = select(self.modelo.id).where(self.modelo.nombre == nombre).limit(1)
+        if comprobar:
+            consulta = consulta.with_for_update(read=True)
+        id = (await db.execute(consulta)).scalar()
+        if id is None:
+            self._entradas.pop(nombre, None)
+            return None
+
+        self._entradas[nombre] = (id, time.monotonic() + self.ttl)
+        self._entradas.move_to_end(nombre)
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+        return id
+
+    async def _existe(self, db: AsyncSession, id: int, nombre: str) -> bool:
+        consulta = select(self.modelo.id).where(self.modelo.id == id, self.modelo.nombre == nombre).with_for_update(read=True)
+        return (await db.execute(consulta)).scalar() is not None
+
+    def invalidar(self):
+        self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+cache_supermercados = CacheNombres(models.Supermercado)
+cache_categorias = CacheNombres(models.Categoria)
+cache_usuarios = CacheNombres(models.Usuario)
+
+
+# Caché LRU de credenciales ya verificadas, para no recalcular el hash lento
+# en logins repetidos. No guarda la contraseña: la clave es un HMAC de
+# usuario y contraseña con una clave aleatoria del proceso, y el valor es el
+# hash guardado en la base de datos, así que cambiar la contraseña invalida
+# la entrada. Los intentos fallidos no se guardan.
+class CacheCredenciales:
+    def __init__(self, capacidad: int = CACHE_LOGIN_CAPACIDAD, ttl: float = CACHE_LOGIN_TTL):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._clave = secrets.token_bytes(32)
+        self._entradas = OrderedDict()  # huella -> (hash guardado, caduca)
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _huella(self, username: str, password: str) -> bytes:
+        return hmac.new(self._clave, f"{username}\0{password}".encode(), hashlib.sha256).digest()
+
+    def verificada(self, username: str, password: str, hashed_password: str) -> bool:
+        if self.ttl <= 0:
+            return False
+        huella = self._huella(username, password)
+        entrada = self._entradas.get(huella)
+        if entrada is not None and entrada[1] > time.monotonic() and hmac.compare_digest(entrada[0], hashed_password):
+            self._entradas.move_to_end(huella)
+            self.aciertos += 1
+            return True
+
+        self._entradas.pop(huella, None)
+        self.fallos += 1
+        return False
+
+    def guardar(self, username: str, password: str, hashed_password: str):
+        if self.ttl <= 0:
+            return
+        huella = self._huella(username, password)
+        self._entradas[huella] = (hashed_password, time.monotonic() + self.ttl)
+        self._entradas.move_to_end(huella)
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self):
+        self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "ttl_segundos": self.ttl,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+cache_credenciales = CacheCredenciales()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import time
+import uuid
+from fastapi import Request, Response
+from app.exceptions import NotModifiedException
+
+# Contador de versión de cada tabla. Lo incrementan los endpoints que la modifican
+# y forma parte del ETag de los GET que leen de ella.
+versiones = {
+    "producto": 0,
+    "categoria": 0,
+    "supermercado": 0,
+    "lista_compra": 0,
+    "usuario": 0,
+}
+
+# Los contadores viven en la memoria de cada worker: el identificador del proceso
+# evita que dos workers generen el mismo ETag para datos distintos.
+_PROCESO = uuid.uuid4().hex[:8]
+
+# Con varios workers, una escritura en uno no incrementa los contadores de los demás.
+# Por eso el ETag cambia además cada ETAG_VENTANA segundos: un worker que no ha
+# visto la escritura responde 304 con datos antiguos como mucho durante ese tiempo.
+# ETAG_VENTANA=0 quita el límite, solo es seguro con un único worker.
+ETAG_VENTANA = int(os.getenv("ETAG_VENTANA", "10"))
+
+# Cabecera Cache-Control de cada ruta
+CACHE_CONTROL = {
+    "productos": os.getenv("CACHE_CONTROL_PRODUCTOS", "no-cache"),
+    "categorias": os.getenv("CACHE_CONTROL_CATEGORIAS", "no-cache"),
+    "supermercados": os.getenv("CACHE_CONTROL_SUPERMERCADOS", "no-cache"),
+}
+
+
+def incrementar_version(*tablas: str):
+    for tabla in tablas:
+        versiones[tabla] += 1
+
+
+def calcular_etag(tablas: tuple, request: Request) -> str:
+    clave = [_PROCESO, request.url.path, request.url.query]
+    clave += [f"{tabla}={versiones[tabla]}" for tabla in tablas]
+    if ETAG_VENTANA:
+        clave.append(str(int(time.time() // ETAG_VENTANA)))
+    return '"' + hashlib.sha1("|".join(clave).encode()).hexdigest() + '"'
+
+
+# Comprueba si algún ETag de If-None-Match coincide (se ignora el prefijo W/ de los débiles)
+def coincide(if_none_match: str, etag: str) -> bool:
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor == "*" or valor.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Dependencia para los GET condicionales.
+# - **tablas**: tablas de las que depende la respuesta.
+# - **cache_control**: valor de la cabecera Cache-Control.
+# Si el cliente ya tiene la versión actual se responde 304 sin abrir la base de datos.
+def condicional(*tablas: str, cache_control: str = "no-cache"):
+    async def comprobar_etag(request: Request, response: Response):
+        cabeceras = {"ETag": calcular_etag(tablas, request), "Cache-Control": cache_control}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and coincide(if_none_match, cabeceras["ETag"]):
+            raise NotModifiedException(headers=cabeceras)
+
+        response.headers.update(cabeceras)
+
+    return comprobar_etag
@@ -0,0 +1,79 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app import models
+from app.respuestas import serializador_filas
+
+# Consultas compartidas por los endpoints de listado.
+# Cargan las relaciones que se usan al construir la respuesta en la misma
+# sentencia SQL, para no lanzar una consulta extra por cada fila.
+
+# Columnas de los listados de productos, leídas como tuplas sin construir objetos del ORM.
+# Las filas se convierten con fila_producto_a_dict.
+def consulta_filas_productos():
+    return (
+        select(
+            models.Producto.id,
+            models.Producto.nombre,
+            models.Producto.precio,
+            models.Categoria.pasillo,
+            models.Categoria.nombre.label("categoria"),
+            models.Supermercado.nombre.label("supermercado"),
+        )
+        .outerjoin(models.Producto.categoria)
+        .outerjoin(models.Producto.supermercado)
+    )
+
+
+fila_producto_a_dict = serializador_filas(["id", "nombre", "precio", "pasillo", "categoría", "supermercado"])
+
+
+# Columna por la que se ordenan los productos ("nombre" o "precio").
+# En PostgreSQL los nombres se comparan con la colación "C" (por código de
+# carácter, con el índice ix_producto_nombre_c de la migración 6), que es el
+# orden de SQLite y del índice en memoria; la colación por defecto depende del idioma.
+def columna_orden_producto(db, orden: str):
+    columna = getattr(models.Producto, orden)
+    if orden == "nombre" and db.bind.dialect.name == "postgresql":
+        return columna.collate("C")
+    return columna
+
+
+# Filas de productos con los ids dados, en el mismo orden que los ids.
+# - **condiciones**: filtros que se vuelven a comprobar en la base de datos,
+#   por si los ids salen de un índice en memoria desactualizado.
+async def productos_por_ids(db, ids, *condiciones) -> list:
+    if not len(ids):
+        return []
+    resultado = await db.execute(consulta_filas_productos().where(models.Producto.id.in_(list(ids)), *condiciones))
+    por_id = {fila.id: fila for fila in resultado}
+    return [por_id[id] for id in ids if id in por_id]
+
+
+# Listas de la compra con su usuario y su supermercado.
+# El número de productos y el total están en la propia lista.
+def consulta_listas_compra():
+    return select(models.ListaCompra).options(
+        joinedload(models.ListaCompra.usuario),
+        joinedload(models.ListaCompra.supermercado),
+    )
+
+
+# Productos de una lista de la compra como tuplas (id, nombre, cantidad, precio)
+def consulta_filas_productos_lista(lista_compra_id: int):
+    return (
+        select(models.Producto.id, models.Producto.nombre, models.ProductoLista.cantidad, models.ProductoLista.precio)
+        .join(models.ProductoLista.producto)
+        .where(models.ProductoLista.lista_compra_id == lista_compra_id)
+    )
+
+
+# Respuesta común de los listados de listas de la compra
+def lista_compra_a_dict(item: models.ListaCompra) -> dict:
+    return {
+        "id": item.id,
+        "usuario": item.usuario.nombre,
+        "fecha": item.fecha_creacion.strftime('%d-%m-%Y'),
+        "supermercado": item.supermercado.nombre,
+        "productos": item.num_productos,
+        "total": item.total,
+    }
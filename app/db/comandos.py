@@ -0,0 +1,46 @@
+"""
+Comandos de administración de la base de datos, para ejecutarlos una vez por
+despliegue en lugar de en cada worker:
+
+    python -m app.db.comandos migrar     # aplica las migraciones pendientes
+    python -m app.db.comandos sembrar    # carga los datos iniciales en las tablas vacías
+    python -m app.db.comandos version    # muestra la versión del esquema
+"""
+import argparse
+import sys
+import time
+from app.db.database import SessionLocal, engine
+from app.db.iniciar_db import cargar_bd
+from app.db.migraciones import VERSION_ESQUEMA, aplicar_migraciones, version_actual
+
+
+def migrar():
+    version = aplicar_migraciones(engine)
+    print(f"Esquema de la base de datos en la versión {version}.")
+
+
+def sembrar():
+    inicio = time.perf_counter()
+    with SessionLocal() as db:
+        rellenadas = cargar_bd(db)
+    if rellenadas:
+        print(f"Datos iniciales cargados en {', '.join(rellenadas)} ({time.perf_counter() - inicio:.3f} s).")
+    else:
+        print("Todas las tablas tienen datos, no se ha cargado nada.")
+
+
+# Termina con código 1 si el esquema no está en la versión que espera la aplicación
+def version():
+    with engine.connect() as conexion:
+        actual = version_actual(conexion)
+    print(f"Versión del esquema: {actual} (la aplicación espera la {VERSION_ESQUEMA}).")
+    if actual != VERSION_ESQUEMA:
+        sys.exit(1)
+
+
+COMANDOS = {"migrar": migrar, "sembrar": sembrar, "version": version}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("comando", choices=COMANDOS)
+    COMANDOS[parser.parse_args().comando]()
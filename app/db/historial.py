@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import DateTime, func, insert, literal, select, type_coerce
+from app import models
+
+# Sentencias del historial de precios. Cada escritura de Producto.precio añade
+# una fila en historial_precio en la misma transacción que el cambio; las filas
+# no se modifican ni se borran. Las series se leen por el índice (producto_id, fecha).
+
+# Unidades en las que se agrupan las series: formato de SQLite y unidad de date_trunc
+AGRUPACIONES = {
+    "hora": ("%Y-%m-%d %H:00:00", "hour"),
+    "dia": ("%Y-%m-%d 00:00:00", "day"),
+    "semana": ("%Y-%m-%d 00:00:00", "week"),
+    "mes": ("%Y-%m-01 00:00:00", "month"),
+}
+
+
+# Filas para un INSERT (executemany) a partir de pares (producto_id, precio)
+def filas_historial(precios: Iterable[Tuple[int, float]], fecha: Optional[datetime] = None) -> list:
+    fecha = fecha or datetime.utcnow()
+    return [
+        {"producto_id": producto_id, "precio": precio, "fecha": fecha}
+        for producto_id, precio in precios if precio is not None
+    ]
+
+
+# INSERT ... SELECT con el precio actual de los productos indicados
+# - **productos_ids**: lista de ids o SELECT de ids de producto.
+def registrar_precios(productos_ids, fecha: Optional[datetime] = None):
+    return insert(models.HistorialPrecio).from_select(
+        ["producto_id", "precio", "fecha"],
+        select(models.Producto.id, models.Producto.precio, literal(fecha or datetime.utcnow(), DateTime))
+        .where(models.Producto.id.in_(productos_ids), models.Producto.precio.isnot(None)),
+    )
+
+
+# Inicio del intervalo (hora, día, semana o mes) de una fecha, según la base de datos.
+# En SQLite la fecha es texto y se recorta con strftime; la semana empieza el lunes como en date_trunc.
+def truncar_fecha(columna, agrupar: str, dialecto: str):
+    formato, unidad = AGRUPACIONES[agrupar]
+    if dialecto == "sqlite":
+        modificadores = ["weekday 0", "-6 days"] if agrupar == "semana" else []
+        return type_coerce(func.strftime(formato, columna, *modificadores), DateTime)
+    return func.date_trunc(unidad, columna)
+
+
+def _en_rango(producto_id: int, desde: Optional[datetime], hasta: Optional[datetime]) -> list:
+    condiciones = [models.HistorialPrecio.producto_id == producto_id]
+    if desde is not None:
+        condiciones.append(models.HistorialPrecio.fecha >= desde)
+    if hasta is not None:
+        condiciones.append(models.HistorialPrecio.fecha <= hasta)
+    return condiciones
+
+
+# Puntos del historial sin agrupar, en orden
+def consulta_historial(producto_id: int, desde: Optional[datetime], hasta: Optional[datetime], limite: int):
+    return (
+        select(models.HistorialPrecio.fecha, models.HistorialPrecio.precio)
+        .where(*_en_rango(producto_id, desde, hasta))
+        .order_by(models.HistorialPrecio.fecha, models.HistorialPrecio.id)
+        .limit(limite)
+    )
+
+
+# Un punto por intervalo con el precio mínimo, el máximo, el último y el número de cambios.
+# El último se elige con row_number() dentro de cada intervalo.
+def consulta_serie(producto_id: int, desde: Optional[datetime], hasta: Optional[datetime], agrupar: str, dialecto: str):
+    intervalo = truncar_fecha(models.HistorialPrecio.fecha, agrupar, dialecto)
+    puntos = (
+        select(
+            intervalo.label("intervalo"),
+            models.HistorialPrecio.precio,
+            func.row_number().over(
+                partition_by=intervalo,
+                order_by=(models.HistorialPrecio.fecha.desc(), models.HistorialPrecio.id.desc()),
+            ).label("orden"),
+        )
+        .where(*_en_rango(producto_id, desde, hasta))
+        .subquery()
+    )
+    return (
+        select(
+            puntos.c.intervalo,
+            func.min(puntos.c.precio),
+            func.max(puntos.c.precio),
+            func.max(puntos.c.precio).filter(puntos.c.orden == 1),
+            func.count(),
+        )
+        .group_by(puntos.c.intervalo)
+        .order_by(puntos.c.intervalo)
+    )
+
+
+# Último precio anterior a una fecha, para empezar la serie con el precio vigente
+def consulta_precio_anterior(producto_id: int, fecha: datetime):
+    return (
+        select(models.HistorialPrecio.precio)
+        .where(models.HistorialPrecio.producto_id == producto_id, models.HistorialPrecio.fecha < fecha)
+        .order_by(models.HistorialPrecio.fecha.desc(), models.HistorialPrecio.id.desc())
+        .limit(1)
+    )
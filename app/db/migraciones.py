@@ -0,0 +1,247 @@
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, insert, inspect, select, text,
+)
+
+# Migraciones del esquema de la base de datos.
+# Cada migración se aplica una sola vez, en orden, dentro de su propia transacción
+# junto con el registro en la tabla version_esquema. Para cambiar el esquema se añade
+# una función al final de MIGRACIONES y se actualiza app/models.py de la misma forma.
+
+# Clave del bloqueo de PostgreSQL que evita que dos workers migren a la vez
+_BLOQUEO_MIGRACIONES = 7245019
+
+_metadata_version = MetaData()
+version_esquema = Table(
+    "version_esquema", _metadata_version,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String, nullable=False),
+    Column("aplicada", DateTime, nullable=False),
+)
+
+
+# 1. Tablas tal y como las creaba Base.metadata.create_all antes de las migraciones.
+# En una base de datos existente las tablas ya están y no se tocan.
+def _m001_esquema_inicial(conexion):
+    metadata = MetaData()
+    Table(
+        "supermercado", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("nombre", String, unique=True, nullable=False),
+    )
+    Table(
+        "categoria", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("nombre", String, nullable=False),
+        Column("pasillo", Integer, nullable=False),
+    )
+    Table(
+        "usuario", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("username", String, unique=True, nullable=False),
+        Column("password", String, nullable=False),
+        Column("nombre", String, nullable=False),
+        Column("apellido", String, nullable=False),
+    )
+    Table(
+        "producto", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("nombre", String),
+        Column("precio", Float),
+        Column("supermercado_id", Integer, ForeignKey("supermercado.id")),
+        Column("categoria_id", Integer, ForeignKey("categoria.id")),
+    )
+    Table(
+        "lista_compra", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("fecha_creacion", DateTime),
+        Column("supermercado_id", Integer, ForeignKey("supermercado.id")),
+        Column("usuario_id", Integer, ForeignKey("usuario.id")),
+    )
+    Table(
+        "producto_lista", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("cantidad", Integer),
+        Column("precio", Float),
+        Column("lista_compra_id", Integer, ForeignKey("lista_compra.id")),
+        Column("producto_id", Integer, ForeignKey("producto.id")),
+    )
+    metadata.create_all(conexion, checkfirst=True)
+
+
+# 2. Índices de las columnas por las que se filtra y se hace join,
+# y un producto como mucho una vez en cada lista. Antes del índice único se juntan
+# las filas repetidas de un producto en una lista en la de menor id, sumando
+# cantidades e importes.
+def _m002_indices(conexion):
+    repetida = (
+        "producto_lista.lista_compra_id IS NOT NULL AND producto_lista.producto_id IS NOT NULL AND "
+        "producto_lista.id NOT IN (SELECT MIN(id) FROM producto_lista GROUP BY lista_compra_id, producto_id)"
+    )
+    misma_linea = "otra.lista_compra_id = producto_lista.lista_compra_id AND otra.producto_id = producto_lista.producto_id"
+    conexion.execute(text(
+        "UPDATE producto_lista SET "
+        f"cantidad = (SELECT SUM(otra.cantidad) FROM producto_lista otra WHERE {misma_linea}), "
+        f"precio = (SELECT SUM(otra.precio) FROM producto_lista otra WHERE {misma_linea}) "
+        "WHERE id IN (SELECT MIN(id) FROM producto_lista WHERE lista_compra_id IS NOT NULL AND producto_id IS NOT NULL "
+        "GROUP BY lista_compra_id, producto_id HAVING COUNT(*) > 1)"
+    ))
+    conexion.execute(text(f"DELETE FROM producto_lista WHERE {repetida}"))
+
+    for sentencia in [
+        "CREATE INDEX IF NOT EXISTS ix_producto_nombre ON producto (nombre)",
+        "CREATE INDEX IF NOT EXISTS ix_producto_precio ON producto (precio)",
+        "CREATE INDEX IF NOT EXISTS ix_producto_supermercado_id ON producto (supermercado_id)",
+        "CREATE INDEX IF NOT EXISTS ix_producto_categoria_id ON producto (categoria_id)",
+        "CREATE INDEX IF NOT EXISTS ix_lista_compra_supermercado_id ON lista_compra (supermercado_id)",
+        "CREATE INDEX IF NOT EXISTS ix_lista_compra_usuario_id ON lista_compra (usuario_id)",
+        "CREATE INDEX IF NOT EXISTS ix_producto_lista_producto_id ON producto_lista (producto_id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_producto_lista_lista_producto ON producto_lista (lista_compra_id, producto_id)",
+        "CREATE INDEX IF NOT EXISTS ix_usuario_nombre ON usuario (nombre)",
+    ]:
+        conexion.execute(text(sentencia))
+
+
+# 3. Número de productos y total de cada lista de la compra, calculados con los datos actuales
+def _m003_totales_lista_compra(conexion):
+    conexion.execute(text("ALTER TABLE lista_compra ADD COLUMN num_productos INTEGER NOT NULL DEFAULT 0"))
+    conexion.execute(text("ALTER TABLE lista_compra ADD COLUMN total FLOAT NOT NULL DEFAULT 0"))
+    conexion.execute(text(
+        "UPDATE lista_compra SET "
+        "num_productos = (SELECT COUNT(*) FROM producto_lista WHERE producto_lista.lista_compra_id = lista_compra.id), "
+        "total = (SELECT COALESCE(SUM(precio), 0) FROM producto_lista WHERE producto_lista.lista_compra_id = lista_compra.id)"
+    ))
+
+
+# 4. Historial de precios (solo se añaden filas), con el precio actual de cada producto como primer punto
+def _m004_historial_precio(conexion):
+    metadata = MetaData()
+    Table(
+        "historial_precio", metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("producto_id", Integer, nullable=False),
+        Column("precio", Float, nullable=False),
+        Column("fecha", DateTime, nullable=False),
+    )
+    metadata.create_all(conexion, checkfirst=True)
+    conexion.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_historial_precio_producto_fecha ON historial_precio (producto_id, fecha)"
+    ))
+    conexion.execute(
+        text("INSERT INTO historial_precio (producto_id, precio, fecha) SELECT id, precio, :fecha FROM producto WHERE precio IS NOT NULL"),
+        {"fecha": datetime.utcnow()},
+    )
+
+
+# Claves ajenas que borran en cascada: (tabla, columna, tabla referida)
+CLAVES_EN_CASCADA = [
+    ("producto", "supermercado_id", "supermercado"),
+    ("producto", "categoria_id", "categoria"),
+    ("lista_compra", "supermercado_id", "supermercado"),
+    ("producto_lista", "lista_compra_id", "lista_compra"),
+    ("producto_lista", "producto_id", "producto"),
+]
+
+
+# 5. Borrado en cascada en la base de datos (ON DELETE CASCADE).
+# SQLite no permite cambiar las claves ajenas de una tabla existente y no las
+# comprueba si no se activa PRAGMA foreign_keys, así que solo cambia PostgreSQL;
+# con SQLite los borrados quitan antes las filas dependientes (ver app/borrado.py).
+# Las claves se crean NOT VALID, sin comprobar las filas existentes, para que el
+# bloqueo exclusivo de las tablas dure poco; se validan en la migración 7.
+def _m005_borrado_en_cascada(conexion):
+    if conexion.dialect.name != "postgresql":
+        return
+    inspector = inspect(conexion)
+    for tabla, columna, referida in CLAVES_EN_CASCADA:
+        for clave in inspector.get_foreign_keys(tabla):
+            if clave["constrained_columns"] == [columna] and clave["name"]:
+                conexion.execute(text(f'ALTER TABLE {tabla} DROP CONSTRAINT "{clave["name"]}"'))
+        conexion.execute(text(
+            f"ALTER TABLE {tabla} ADD CONSTRAINT {tabla}_{columna}_fkey FOREIGN KEY ({columna}) "
+            f"REFERENCES {referida} (id) ON DELETE CASCADE NOT VALID"
+        ))
+
+
+# 6. Índice para ordenar los productos por nombre con la colación "C" (ver
+# columna_orden_producto en app/consultas.py). SQLite ya compara por código de
+# carácter y usa ix_producto_nombre.
+def _m006_nombre_producto_c(conexion):
+    if conexion.dialect.name != "postgresql":
+        return
+    conexion.execute(text('CREATE INDEX IF NOT EXISTS ix_producto_nombre_c ON producto (nombre COLLATE "C", id)'))
+
+
+# 7. Validación de las claves ajenas de la migración 5. Va en su propia transacción:
+# VALIDATE CONSTRAINT recorre las tablas con un bloqueo que no impide leer ni
+# escribir, pero en la misma transacción que el ADD CONSTRAINT se mantendría el
+# bloqueo exclusivo de este hasta el final. En una base de datos que ya las validó no hace nada.
+def _m007_validar_claves_en_cascada(conexion):
+    if conexion.dialect.name != "postgresql":
+        return
+    for tabla, columna, _ in CLAVES_EN_CASCADA:
+        conexion.execute(text(f"ALTER TABLE {tabla} VALIDATE CONSTRAINT {tabla}_{columna}_fkey"))
+
+
+MIGRACIONES = [
+    (1, "Esquema inicial", _m001_esquema_inicial),
+    (2, "Índices de búsqueda y producto único por lista", _m002_indices),
+    (3, "Totales de las listas de la compra", _m003_totales_lista_compra),
+    (4, "Historial de precios", _m004_historial_precio),
+    (5, "Borrado en cascada en la base de datos", _m005_borrado_en_cascada),
+    (6, "Orden de los nombres de producto por código de carácter", _m006_nombre_producto_c),
+    (7, "Validación de las claves ajenas en cascada", _m007_validar_claves_en_cascada),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+# Versión aplicada en la base de datos (0 si nunca se ha migrado)
+def version_actual(conexion) -> int:
+    if not inspect(conexion).has_table("version_esquema"):
+        return 0
+    return conexion.execute(select(version_esquema.c.version).order_by(version_esquema.c.version.desc()).limit(1)).scalar() or 0
+
+
+# Comprueba, sin modificar nada, que el esquema está en la versión que espera la aplicación
+def comprobar_version(engine) -> int:
+    with engine.connect() as conexion:
+        version = version_actual(conexion)
+    if version != VERSION_ESQUEMA:
+        raise RuntimeError(
+            f"El esquema está en la versión {version} y la aplicación espera la {VERSION_ESQUEMA}. "
+            "Ejecuta python -m app.db.comandos migrar"
+        )
+    return version
+
+
+# Aplica las migraciones pendientes y devuelve la versión final del esquema
+def aplicar_migraciones(engine) -> int:
+    with engine.connect() as conexion:
+        postgres = conexion.dialect.name == "postgresql"
+        if postgres:
+            conexion.execute(text("SELECT pg_advisory_lock(:clave)"), {"clave": _BLOQUEO_MIGRACIONES})
+            conexion.commit()
+
+        try:
+            with conexion.begin():
+                _metadata_version.create_all(conexion, checkfirst=True)
+
+            version = version_actual(conexion)
+            conexion.commit()
+            for numero, descripcion, migracion in MIGRACIONES:
+                if numero <= version:
+                    continue
+                with conexion.begin():
+                    migracion(conexion)
+                    conexion.execute(insert(version_esquema).values(
+                        version=numero, descripcion=descripcion, aplicada=datetime.utcnow()
+                    ))
+                print(f"Migración {numero} aplicada: {descripcion}")
+                version = numero
+        finally:
+            if postgres:
+                conexion.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": _BLOQUEO_MIGRACIONES})
+                conexion.commit()
+
+    return version
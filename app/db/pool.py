@@ -0,0 +1,92 @@
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import event, exc
+
+# Límites superiores (en segundos) de los intervalos del histograma de espera
+LIMITES_ESPERA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Contadores de un pool de conexiones, alimentados por los eventos del pool
+class EstadisticasPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.esperas = [0] * (len(LIMITES_ESPERA) + 1)
+        self.espera_total = 0.0
+        self.timeouts = 0
+        self.conexiones_creadas = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidaciones = 0
+
+    def registrar_espera(self, segundos: float):
+        with self._lock:
+            self.esperas[bisect_left(LIMITES_ESPERA, segundos)] += 1
+            self.espera_total += segundos
+
+    def incrementar(self, contador: str):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def resumen(self, pool) -> dict:
+        with self._lock:
+            esperas = list(self.esperas)
+            espera_total = self.espera_total
+            contadores = {
+                "conexiones_creadas": self.conexiones_creadas,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidaciones": self.invalidaciones,
+                "timeouts": self.timeouts,
+            }
+
+        # Estado actual del pool (no todos los pools tienen tamaño)
+        estado = {}
+        for clave, metodo in (("tamano", "size"), ("en_uso", "checkedout"), ("libres", "checkedin"), ("overflow", "overflow")):
+            if hasattr(pool, metodo):
+                estado[clave] = getattr(pool, metodo)()
+        if "overflow" in estado:
+            # QueuePool cuenta el overflow en negativo mientras el pool no está lleno
+            estado["overflow"] = max(0, estado["overflow"])
+
+        # Histograma acumulado, como en Prometheus
+        histograma = []
+        acumulado = 0
+        for limite, cuenta in zip(list(LIMITES_ESPERA) + ["+Inf"], esperas):
+            acumulado += cuenta
+            histograma.append({"hasta": limite, "cuenta": acumulado})
+
+        return {
+            "pool": type(pool).__name__,
+            **estado,
+            **contadores,
+            "espera": {
+                "total_segundos": round(espera_total, 6),
+                "cuenta": acumulado,
+                "histograma": histograma,
+            },
+        }
+
+
+# Crea una subclase de la clase de pool que mide cuánto tarda en entregar una conexión.
+# Pool.recreate() usa la misma clase, así que las estadísticas sobreviven a un dispose().
+def clase_pool_medida(clase_pool, estadisticas: EstadisticasPool):
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return clase_pool.connect(self)
+        except exc.TimeoutError:
+            estadisticas.incrementar("timeouts")
+            raise
+        finally:
+            estadisticas.registrar_espera(time.perf_counter() - inicio)
+
+    return type(clase_pool.__name__, (clase_pool,), {"connect": connect})
+
+
+# Registra los eventos del pool de un motor (síncrono) en las estadísticas
+def escuchar_eventos_pool(engine, estadisticas: EstadisticasPool):
+    event.listen(engine, "connect", lambda *args: estadisticas.incrementar("conexiones_creadas"))
+    event.listen(engine, "checkout", lambda *args: estadisticas.incrementar("checkouts"))
+    event.listen(engine, "checkin", lambda *args: estadisticas.incrementar("checkins"))
+    event.listen(engine, "invalidate", lambda *args: estadisticas.incrementar("invalidaciones"))
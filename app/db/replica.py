@@ -0,0 +1,64 @@
+import math
+import os
+import time
+from typing import Optional
+
+# Reparto de las peticiones entre la base de datos primaria y la réplica de
+# lectura (DATABASE_REPLICA_ASYNC_URL). Las peticiones GET y HEAD leen de la
+# réplica y el resto van a la primaria. Después de una escritura, el cliente
+# recibe una cookie y sus lecturas siguen en la primaria durante
+# DB_LECTURA_TRAS_ESCRITURA segundos, para que vea sus propios cambios aunque la
+# réplica vaya con retraso. La cookie sirve con varios workers porque no
+# depende de la memoria del proceso.
+
+# URL del motor asíncrono de la réplica; sin ella todo va a la primaria
+SQLALCHEMY_REPLICA_ASYNC_URL = os.getenv("DATABASE_REPLICA_ASYNC_URL", "")
+# Segundos que las lecturas de un cliente siguen en la primaria tras escribir (0 para no hacerlo)
+DB_LECTURA_TRAS_ESCRITURA = float(os.getenv("DB_LECTURA_TRAS_ESCRITURA", "5"))
+
+COOKIE_ESCRITURA = "escritura_reciente"
+
+# Métodos que solo leen
+METODOS_LECTURA = {"GET", "HEAD"}
+
+
+# True si la cookie indica que el cliente ha escrito hace menos de DB_LECTURA_TRAS_ESCRITURA segundos
+def escritura_reciente(cookie: Optional[str]) -> bool:
+    try:
+        return cookie is not None and float(cookie) > time.time()
+    except ValueError:
+        return False
+
+
+# Base de datos ("primaria" o "replica") y motivo con el que se atiende una petición
+def destino_peticion(metodo: str, cookie: Optional[str]) -> tuple:
+    if metodo not in METODOS_LECTURA:
+        return "primaria", "escritura"
+    if DB_LECTURA_TRAS_ESCRITURA and escritura_reciente(cookie):
+        return "primaria", "lectura_tras_escritura"
+    return "replica", "lectura"
+
+
+# Middleware ASGI que añade la cookie de escritura reciente a las respuestas
+# correctas de las peticiones que no son de lectura; solo se añade a la
+# aplicación si hay réplica
+class MiddlewareLecturaTrasEscritura:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in METODOS_LECTURA or not DB_LECTURA_TRAS_ESCRITURA:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                caduca = time.time() + DB_LECTURA_TRAS_ESCRITURA
+                cookie = (
+                    f"{COOKIE_ESCRITURA}={caduca:.3f}; Max-Age={math.ceil(DB_LECTURA_TRAS_ESCRITURA)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
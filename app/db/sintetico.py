@@ -0,0 +1,259 @@
+"""
+Genera datos sintéticos para pruebas de rendimiento, siempre iguales para la misma semilla:
+
+- Supermercados y categorías con un rango de precios propio por categoría.
+- Productos: cada nombre se vende en varios supermercados con precios parecidos.
+- Historial de precios: el precio actual de cada producto y, si se pide, cambios
+  de precio anteriores repartidos en el año previo.
+- Usuarios (todos con la contraseña "sintetico") con más o menos actividad.
+- Listas de la compra cuyos productos siguen una popularidad de tipo Zipf
+  (unos pocos productos aparecen en muchas listas).
+
+Los datos se cargan en una sola transacción con COPY en PostgreSQL (psycopg2) o
+con INSERT por lotes (executemany) en el resto. La base de datos debe estar
+migrada y sin datos.
+
+Uso:
+    python -m app.db.sintetico --supermercados 100 --productos 1000000 --usuarios 500000 \\
+        --listas 1000000 --productos-lista 5000000 --historial 10 --semilla 1
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import func, select, text
+from app import models
+from app.utils import hash_password
+
+# Filas por cada COPY / executemany
+TAMANO_LOTE = 50000
+
+# Fecha fija para que las fechas de las listas no dependan del día en que se generan
+FECHA_BASE = datetime(2024, 1, 1)
+
+# (nombre, pasillo, precio mediano, dispersión del precio, productos base)
+CATEGORIAS = [
+    ("Frutas", 1, 2.0, 0.5, ["Manzana", "Pera", "Plátano", "Naranja", "Uvas", "Fresas", "Kiwi", "Melón"]),
+    ("Verduras", 2, 1.5, 0.5, ["Lechuga", "Tomate", "Cebolla", "Patata", "Zanahoria", "Pimiento", "Calabacín", "Brócoli"]),
+    ("Bebidas", 3, 1.8, 0.7, ["Agua", "Zumo de naranja", "Refresco de cola", "Cerveza", "Vino tinto", "Café", "Té", "Bebida isotónica"]),
+    ("Lácteos", 4, 1.6, 0.5, ["Leche entera", "Leche desnatada", "Yogur natural", "Queso curado", "Queso fresco", "Mantequilla", "Nata"]),
+    ("Carnes", 5, 7.0, 0.6, ["Pollo", "Ternera", "Cerdo", "Cordero", "Hamburguesas", "Salchichas", "Jamón serrano"]),
+    ("Panadería", 6, 1.5, 0.6, ["Pan de molde", "Barra de pan", "Croissants", "Magdalenas", "Pan integral", "Tostadas"]),
+    ("Congelados", 7, 3.5, 0.6, ["Pizza", "Helado", "Guisantes", "Croquetas", "Merluza", "Patatas fritas"]),
+    ("Dulces", 8, 2.5, 0.6, ["Chocolate", "Galletas", "Caramelos", "Turrón", "Bizcocho", "Cereales"]),
+    ("Aseo", 9, 3.0, 0.6, ["Champú", "Gel de ducha", "Pasta de dientes", "Desodorante", "Jabón de manos"]),
+    ("Limpieza", 10, 3.0, 0.6, ["Detergente", "Suavizante", "Lavavajillas", "Lejía", "Limpiacristales"]),
+    ("Despensa", 11, 2.0, 0.7, ["Arroz", "Pasta", "Aceite de oliva", "Lentejas", "Garbanzos", "Harina", "Azúcar", "Atún"]),
+    ("Ropa", 12, 15.0, 0.5, ["Camiseta", "Calcetines", "Pantalón", "Sudadera"]),
+]
+
+MARCAS = [
+    "Hacendado", "Carrefour", "Auchan", "Eroski", "Dia", "Alipende", "Milbona", "Gallo", "Pascual", "Danone",
+    "Nestlé", "Puleva", "Central Lechera", "Campofrío", "ElPozo", "Bimbo", "Pescanova", "Findus", "Nocilla", "Cuétara",
+    "Colacao", "Gullón", "La Piara", "Calvo", "Isabel", "Coosur", "Carbonell", "SOS", "Brillante", "Luengo",
+    "Ariel", "Skip", "Fairy", "Neutrex", "Colgate", "Sanex", "Dove", "Mahou", "Estrella", "Font Vella",
+]
+
+FORMATOS = ["", "500 g", "1 kg", "250 g", "1 L", "2 L", "pack 6", "familiar", "bio", "sin lactosa"]
+
+
+# Zipf: devuelve una función que elige un elemento de 0 a n-1, los primeros mucho más a menudo
+def muestreador_zipf(aleatorio: random.Random, n: int, exponente: float):
+    acumulados = list(accumulate(1 / (rango + 1) ** exponente for rango in range(n)))
+    total = acumulados[-1]
+    # El orden de popularidad no coincide con el orden de los ids
+    orden = array("q", range(n))
+    aleatorio.shuffle(orden)
+    return lambda: orden[min(n - 1, bisect_left(acumulados, aleatorio.random() * total))]
+
+
+# Escribe filas en una tabla: COPY en PostgreSQL con psycopg2, executemany en el resto
+class Cargador:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.copy = conexion.dialect.name == "postgresql" and conexion.dialect.driver == "psycopg2"
+        self.filas = {}
+
+    def cargar(self, tabla, columnas: list, filas):
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= TAMANO_LOTE:
+                self._escribir(tabla, columnas, lote)
+                lote = []
+        if lote:
+            self._escribir(tabla, columnas, lote)
+
+    def _escribir(self, tabla, columnas: list, lote: list):
+        self.filas[tabla.name] = self.filas.get(tabla.name, 0) + len(lote)
+        if not self.copy:
+            self.conexion.execute(tabla.insert(), [dict(zip(columnas, fila)) for fila in lote])
+            return
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(lote)
+        buffer.seek(0)
+        cursor = self.conexion.connection.dbapi_connection.cursor()
+        cursor.copy_expert(f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+
+    # Los ids se han insertado a mano: las secuencias de PostgreSQL deben continuar tras el máximo
+    def ajustar_secuencias(self, tablas: list):
+        if self.conexion.dialect.name != "postgresql":
+            return
+        for tabla in tablas:
+            self.conexion.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{tabla.name}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {tabla.name}))"
+            ))
+
+
+def generar(
+    engine,
+    supermercados: int = 100,
+    productos: int = 100000,
+    ofertas: int = 5,
+    usuarios: int = 10000,
+    listas: int = 20000,
+    productos_lista: int = 100000,
+    semilla: int = 1,
+    exponente_zipf: float = 1.1,
+    historial: int = 0,
+) -> dict:
+    aleatorio = random.Random(semilla)
+
+    with engine.begin() as conexion:
+        if conexion.execute(select(func.count()).select_from(models.Producto)).scalar() or \
+                conexion.execute(select(func.count()).select_from(models.Supermercado)).scalar():
+            raise RuntimeError("La base de datos ya tiene datos; usa una base de datos nueva y migrada")
+
+        cargador = Cargador(conexion)
+
+        cargador.cargar(models.Supermercado.__table__, ["id", "nombre"], (
+            (i, f"Supermercado {i}") for i in range(1, supermercados + 1)
+        ))
+
+        cargador.cargar(models.Categoria.__table__, ["id", "nombre", "pasillo"], (
+            (i, nombre, pasillo) for i, (nombre, pasillo, *_) in enumerate(CATEGORIAS, start=1)
+        ))
+
+        # Productos: cada nombre con un precio base según su categoría se vende en
+        # varios supermercados distintos con un precio un poco diferente
+        precios = array("d")
+
+        def filas_productos():
+            usados = set()
+            id = 0
+            while id < productos:
+                categoria_id = aleatorio.randint(1, len(CATEGORIAS))
+                _, _, mediana, dispersion, bases = CATEGORIAS[categoria_id - 1]
+                nombre = " ".join(parte for parte in (aleatorio.choice(bases), aleatorio.choice(MARCAS), aleatorio.choice(FORMATOS)) if parte)
+                if nombre in usados:
+                    nombre = f"{nombre} ref. {len(usados)}"
+                usados.add(nombre)
+
+                base = aleatorio.lognormvariate(0, dispersion) * mediana
+                for supermercado_id in aleatorio.sample(range(1, supermercados + 1), min(supermercados, max(1, round(aleatorio.expovariate(1 / ofertas))))):
+                    if id >= productos:
+                        break
+                    id += 1
+                    precio = round(max(0.1, base * aleatorio.uniform(0.85, 1.15)), 2)
+                    precios.append(precio)
+                    yield id, nombre, precio, supermercado_id, categoria_id
+
+        cargador.cargar(models.Producto.__table__, ["id", "nombre", "precio", "supermercado_id", "categoria_id"], filas_productos())
+
+        # Historial: `historial` precios por producto en el año anterior a FECHA_BASE
+        # y el precio actual en FECHA_BASE
+        def filas_historial():
+            id = 0
+            inicio = FECHA_BASE - timedelta(days=365)
+            for producto_id, precio in enumerate(precios, start=1):
+                for segundos in sorted(aleatorio.randrange(365 * 24 * 3600) for _ in range(historial)):
+                    id += 1
+                    yield id, producto_id, round(precio * aleatorio.uniform(0.85, 1.15), 2), inicio + timedelta(seconds=segundos)
+                id += 1
+                yield id, producto_id, precio, FECHA_BASE
+
+        cargador.cargar(models.HistorialPrecio.__table__, ["id", "producto_id", "precio", "fecha"], filas_historial())
+
+        # Todos los usuarios comparten el mismo hash para no calcular un PBKDF2 por usuario
+        password = hash_password("sintetico")
+        cargador.cargar(models.Usuario.__table__, ["id", "username", "password", "nombre", "apellido"], (
+            (i, f"usuario{i}", password, f"Nombre{i}", f"Apellido{i % 1000}") for i in range(1, usuarios + 1)
+        ))
+
+        # Listas: unos usuarios hacen muchas más listas que otros y los productos
+        # siguen una popularidad Zipf. Los totales se calculan al generarlas.
+        usuario_de_lista = muestreador_zipf(aleatorio, usuarios, 0.8) if usuarios else None
+        producto_popular = muestreador_zipf(aleatorio, len(precios), exponente_zipf) if len(precios) else None
+        media = productos_lista / listas if listas else 0
+        maximo = min(len(precios), 200)
+        columnas_listas = ["id", "fecha_creacion", "supermercado_id", "usuario_id", "num_productos", "total"]
+        columnas_items = ["id", "cantidad", "precio", "lista_compra_id", "producto_id"]
+        filas_listas = []
+        items = []
+
+        # Se escriben las listas antes que sus productos por las claves ajenas
+        def escribir():
+            cargador.cargar(models.ListaCompra.__table__, columnas_listas, filas_listas)
+            cargador.cargar(models.ProductoLista.__table__, columnas_items, items)
+            filas_listas.clear()
+            items.clear()
+
+        if usuarios and supermercados:
+            for id in range(1, listas + 1):
+                en_lista = set()
+                total = 0.0
+                for _ in range(min(maximo, max(1, round(aleatorio.expovariate(1 / media))) if media else 0)):
+                    producto_id = producto_popular() + 1
+                    if producto_id in en_lista:
+                        continue
+                    en_lista.add(producto_id)
+                    cantidad = aleatorio.choices((1, 2, 3, 4, 6), (50, 25, 12, 8, 5))[0]
+                    precio = round(precios[producto_id - 1] * cantidad, 2)
+                    total += precio
+                    items.append((len(items) + cargador.filas.get("producto_lista", 0) + 1, cantidad, precio, id, producto_id))
+                fecha = FECHA_BASE + timedelta(seconds=aleatorio.randrange(365 * 24 * 3600))
+                filas_listas.append((id, fecha, aleatorio.randint(1, supermercados), usuario_de_lista() + 1, len(en_lista), round(total, 2)))
+                if len(items) >= TAMANO_LOTE or len(filas_listas) >= TAMANO_LOTE:
+                    escribir()
+            escribir()
+
+        cargador.ajustar_secuencias([
+            models.Supermercado.__table__, models.Categoria.__table__, models.Producto.__table__,
+            models.Usuario.__table__, models.ListaCompra.__table__, models.ProductoLista.__table__,
+            models.HistorialPrecio.__table__,
+        ])
+
+    return cargador.filas
+
+
+if __name__ == "__main__":
+    from app.db.database import engine
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--supermercados", type=int, default=100)
+    parser.add_argument("--productos", type=int, default=100000)
+    parser.add_argument("--ofertas", type=float, default=5, help="Supermercados que venden cada nombre de producto (media)")
+    parser.add_argument("--usuarios", type=int, default=10000)
+    parser.add_argument("--listas", type=int, default=20000)
+    parser.add_argument("--productos-lista", type=int, default=100000, help="Productos en listas en total (aproximado)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Exponente de la popularidad de los productos")
+    parser.add_argument("--historial", type=int, default=0, help="Cambios de precio anteriores por producto")
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    filas = generar(
+        engine, args.supermercados, args.productos, args.ofertas, args.usuarios,
+        args.listas, args.productos_lista, args.semilla, args.zipf, args.historial,
+    )
+    segundos = time.perf_counter() - inicio
+    for tabla, numero in filas.items():
+        print(f"{tabla:<16}{numero:>12}")
+    print(f"Datos generados en {segundos:.1f} s ({sum(filas.values()) / segundos:.0f} filas/s).")
@@ -0,0 +1,58 @@
+from sqlalchemy import func, select, update
+from app import models
+
+# Sentencias que mantienen ListaCompra.num_productos y ListaCompra.total.
+# Se ejecutan en la misma transacción que el cambio en producto_lista, así las
+# vistas generales de las listas no tienen que leer producto_lista.
+# ProductoLista.precio guarda el importe en el momento de agregar el producto,
+# por eso cambiar el precio de un producto no cambia los totales de las listas.
+
+
+# Suma productos e importe a una lista (valores negativos para restar)
+def sumar_a_lista(lista_compra_id: int, num_productos: int, importe: float):
+    return (
+        update(models.ListaCompra)
+        .where(models.ListaCompra.id == lista_compra_id)
+        .values(
+            num_productos=models.ListaCompra.num_productos + num_productos,
+            total=models.ListaCompra.total + importe,
+        )
+    )
+
+
+# Resta de cada lista los productos indicados antes de borrarlos.
+# - **productos_ids**: lista de ids o SELECT de ids de producto.
+def descontar_productos(productos_ids):
+    en_lista = (
+        models.ProductoLista.lista_compra_id == models.ListaCompra.id,
+        models.ProductoLista.producto_id.in_(productos_ids),
+    )
+    return (
+        update(models.ListaCompra)
+        .where(models.ListaCompra.id.in_(
+            select(models.ProductoLista.lista_compra_id).where(models.ProductoLista.producto_id.in_(productos_ids))
+        ))
+        .values(
+            num_productos=models.ListaCompra.num_productos - select(func.count(models.ProductoLista.id)).where(*en_lista).scalar_subquery(),
+            total=models.ListaCompra.total - select(func.coalesce(func.sum(models.ProductoLista.precio), 0)).where(*en_lista).scalar_subquery(),
+        )
+    )
+
+
+# Recalcula los totales de todas las listas a partir de producto_lista
+def reconciliar_totales():
+    de_la_lista = models.ProductoLista.lista_compra_id == models.ListaCompra.id
+    return update(models.ListaCompra).values(
+        num_productos=select(func.count(models.ProductoLista.id)).where(de_la_lista).scalar_subquery(),
+        total=select(func.coalesce(func.sum(models.ProductoLista.precio), 0)).where(de_la_lista).scalar_subquery(),
+    )
+
+
+# python -m app.db.totales  -> recalcula los totales de todas las listas
+if __name__ == "__main__":
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        resultado = db.execute(reconciliar_totales())
+        db.commit()
+        print(f"Totales recalculados en {resultado.rowcount} listas de la compra.")
@@ -18,4 +18,13 @@ class BadRequestException(HTTPException):
 
 class InternalServerErrorException(HTTPException):
     def __init__(self, detail="Error interno del servidor"):
-        super().__init__(status_code=500, detail=detail)
\ No newline at end of file
+        super().__init__(status_code=500, detail=detail)
+
+
+class NotModifiedException(HTTPException):
+    def __init__(self, headers: dict = None):
+        super().__init__(status_code=304, detail="No modificado", headers=headers)
+
+class ServiceUnavailableException(HTTPException):
+    def __init__(self, detail: str = "Servicio no disponible", retry_after: int = 1):
+        super().__init__(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
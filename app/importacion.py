@@ -0,0 +1,141 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, schemas
+from app.db.historial import filas_historial
+from app.indices.autocompletar import indice_autocompletar
+from app.indices.ordenados import indices_ordenados
+from app.indices.precios import matriz_precios
+
+# Filas que se insertan en cada sentencia (y en cada transacción)
+TAMANO_LOTE_IMPORTACION = 5000
+
+# Número máximo de errores que se devuelven en la respuesta
+MAXIMO_ERRORES = 1000
+
+COLUMNAS_CSV = ["nombre", "precio", "supermercado", "categoria"]
+
+
+# Divide el cuerpo de la petición en líneas según va llegando
+async def leer_lineas(trozos: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    async for trozo in trozos:
+        pendiente += decodificador.decode(trozo)
+        *lineas, pendiente = pendiente.split("\n")
+        for linea in lineas:
+            yield linea.rstrip("\r")
+    pendiente += decodificador.decode(b"", final=True)
+    if pendiente:
+        yield pendiente.rstrip("\r")
+
+
+# Convierte cada línea en (número de línea, diccionario con los campos del producto)
+# o (número de línea, mensaje de error) si no se puede leer
+async def leer_filas(lineas: AsyncIterator[str], formato: str) -> AsyncIterator[Tuple[int, object]]:
+    columnas = None
+    numero = 0
+    async for linea in lineas:
+        numero += 1
+        if not linea.strip():
+            continue
+
+        if formato == "ndjson":
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                yield numero, "JSON inválido"
+                continue
+            yield numero, fila if isinstance(fila, dict) else "Se esperaba un objeto JSON"
+            continue
+
+        valores = next(csv.reader([linea]))
+        if columnas is None:
+            columnas = [valor.strip().lower() for valor in valores]
+            faltan = set(COLUMNAS_CSV) - set(columnas)
+            if faltan:
+                raise ValueError(f"Faltan columnas en la cabecera CSV: {', '.join(sorted(faltan))}")
+            continue
+        if len(valores) != len(columnas):
+            yield numero, f"Se esperaban {len(columnas)} columnas y hay {len(valores)}"
+            continue
+        yield numero, dict(zip(columnas, valores))
+
+
+# Importa productos por lotes: resuelve los nombres de supermercados y categorías
+# nuevos de cada lote en una sola consulta e inserta el lote con un executemany.
+# Las filas con errores se saltan y se devuelven junto al número de línea.
+class ImportacionProductos:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.supermercados = {}
+        self.categorias = {}
+        self.insertados = 0
+        self.errores = []
+        self.num_errores = 0
+
+    def error(self, linea: int, mensaje: str):
+        self.num_errores += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append({"linea": linea, "error": mensaje})
+
+    async def resolver(self, modelo, conocidos: dict, nombres: set):
+        nuevos = nombres - conocidos.keys()
+        if not nuevos:
+            return
+        resultado = await self.db.execute(select(modelo.nombre, modelo.id).where(modelo.nombre.in_(nuevos)))
+        for nombre, id in resultado:
+            conocidos.setdefault(nombre, id)
+
+    async def insertar_lote(self, lote: list):
+        await self.resolver(models.Supermercado, self.supermercados, {producto.supermercado for _, producto in lote})
+        await self.resolver(models.Categoria, self.categorias, {producto.categoria for _, producto in lote})
+
+        filas = []
+        for linea, producto in lote:
+            if producto.supermercado not in self.supermercados:
+                self.error(linea, "Supermercado no encontrado")
+            elif producto.categoria not in self.categorias:
+                self.error(linea, "Categoría no encontrada")
+            else:
+                filas.append({
+                    "nombre": producto.nombre,
+                    "precio": producto.precio,
+                    "supermercado_id": self.supermercados[producto.supermercado],
+                    "categoria_id": self.categorias[producto.categoria],
+                })
+
+        if filas:
+            ids = (await self.db.execute(
+                insert(models.Producto).returning(models.Producto.id, sort_by_parameter_order=True), filas
+            )).scalars().all()
+            await self.db.execute(insert(models.HistorialPrecio), filas_historial(zip(ids, (fila["precio"] for fila in filas))))
+            await self.db.commit()
+            self.insertados += len(filas)
+            for id, fila in zip(ids, filas):
+                indice_autocompletar.agregar(fila["nombre"])
+                indices_ordenados.agregar(id, fila["nombre"], fila["precio"])
+                matriz_precios.agregar(id, fila["nombre"], fila["precio"], fila["supermercado_id"])
+
+    async def importar(self, filas: AsyncIterator[Tuple[int, object]]):
+        lote = []
+        async for linea, datos in filas:
+            if isinstance(datos, str):
+                self.error(linea, datos)
+                continue
+            try:
+                lote.append((linea, schemas.ProductoResponse(**datos)))
+            except ValidationError as e:
+                self.error(linea, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+
+            if len(lote) >= TAMANO_LOTE_IMPORTACION:
+                await self.insertar_lote(lote)
+                lote = []
+
+        if lote:
+            await self.insertar_lote(lote)
@@ -0,0 +1,131 @@
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Iterable, List
+
+
+# Nombres que se revisan como mucho en cada búsqueda
+MAXIMO_CANDIDATOS = 2000
+
+
+# Pasa un texto a minúsculas y sin tildes: "Lácteos" -> "lacteos"
+def normalizar(texto: str) -> str:
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+# Índice en memoria de los nombres de producto para autocompletar.
+# Cada nombre se parte en palabras normalizadas; el vocabulario ordenado permite
+# encontrar con búsqueda binaria todas las palabras que empiezan por lo escrito.
+# Un mismo nombre puede ser de varios productos (uno por supermercado), por eso
+# se cuenta cuántos productos lo usan y solo sale del índice al quitar el último.
+class IndiceAutocompletar:
+    def __init__(self):
+        self._productos_por_nombre = {}  # nombre -> número de productos con ese nombre
+        self._normalizados = {}  # nombre -> nombre normalizado
+        self._nombres_por_palabra = {}  # palabra normalizada -> nombres que la contienen
+        self._vocabulario = []  # palabras normalizadas ordenadas
+
+    def __len__(self):
+        return len(self._productos_por_nombre)
+
+    def reconstruir(self, nombres: Iterable[str]):
+        productos_por_nombre = {}
+        for nombre in nombres:
+            if nombre:
+                productos_por_nombre[nombre] = productos_por_nombre.get(nombre, 0) + 1
+
+        normalizados = {}
+        nombres_por_palabra = {}
+        for nombre in productos_por_nombre:
+            normalizados[nombre] = normalizar(nombre)
+            for palabra in set(normalizados[nombre].split()):
+                nombres_por_palabra.setdefault(palabra, set()).add(nombre)
+
+        self._productos_por_nombre = productos_por_nombre
+        self._normalizados = normalizados
+        self._nombres_por_palabra = nombres_por_palabra
+        self._vocabulario = sorted(nombres_por_palabra)
+
+    def agregar(self, nombre: str):
+        if not nombre:
+            return
+        if nombre in self._productos_por_nombre:
+            self._productos_por_nombre[nombre] += 1
+            return
+
+        self._productos_por_nombre[nombre] = 1
+        self._normalizados[nombre] = normalizar(nombre)
+        for palabra in set(self._normalizados[nombre].split()):
+            if palabra not in self._nombres_por_palabra:
+                self._nombres_por_palabra[palabra] = set()
+                insort(self._vocabulario, palabra)
+            self._nombres_por_palabra[palabra].add(nombre)
+
+    def quitar(self, nombre: str):
+        cuenta = self._productos_por_nombre.get(nombre)
+        if cuenta is None:
+            return
+        if cuenta > 1:
+            self._productos_por_nombre[nombre] = cuenta - 1
+            return
+
+        del self._productos_por_nombre[nombre]
+        for palabra in set(self._normalizados.pop(nombre).split()):
+            nombres = self._nombres_por_palabra[palabra]
+            nombres.discard(nombre)
+            if not nombres:
+                del self._nombres_por_palabra[palabra]
+                del self._vocabulario[bisect_left(self._vocabulario, palabra)]
+
+    # Conjuntos de nombres de las palabras que empiezan por el prefijo y cuántos nombres suman
+    def _rango(self, prefijo: str):
+        conjuntos = []
+        total = 0
+        i = bisect_left(self._vocabulario, prefijo)
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(prefijo):
+            conjunto = self._nombres_por_palabra[self._vocabulario[i]]
+            conjuntos.append(conjunto)
+            total += len(conjunto)
+            i += 1
+        return conjuntos, total
+
+    # Nombres en los que cada palabra de la consulta es el principio de alguna palabra del nombre.
+    # Se recorren los nombres de la palabra de la consulta con menos candidatos y se
+    # comprueban las demás. La búsqueda termina al tener suficientes coincidencias para
+    # ordenar o tras revisar MAXIMO_CANDIDATOS nombres, así el tiempo de respuesta no
+    # depende del tamaño del catálogo.
+    # Se devuelven primero los que empiezan por la consulta y después los más cortos.
+    def buscar(self, consulta: str, limite: int = 10) -> List[dict]:
+        palabras = normalizar(consulta).split()
+        if not palabras:
+            return []
+
+        conjuntos, _ = min((self._rango(palabra) for palabra in set(palabras)), key=lambda rango: rango[1])
+        consulta_normalizada = " ".join(palabras)
+
+        suficientes = limite * 5
+        coincidencias = []
+        revisados = 0
+        vistos = set()
+        for conjunto in conjuntos:
+            for nombre in conjunto:
+                if nombre in vistos:
+                    continue
+                vistos.add(nombre)
+                normalizado = self._normalizados[nombre]
+                if len(palabras) == 1 or all(any(p.startswith(q) for p in normalizado.split()) for q in palabras):
+                    coincidencias.append((not normalizado.startswith(consulta_normalizada), len(nombre), nombre))
+                revisados += 1
+                if revisados >= MAXIMO_CANDIDATOS or len(coincidencias) >= suficientes:
+                    break
+            if revisados >= MAXIMO_CANDIDATOS or len(coincidencias) >= suficientes:
+                break
+
+        coincidencias.sort()
+        return [
+            {"nombre": nombre, "productos": self._productos_por_nombre[nombre]}
+            for _, _, nombre in coincidencias[:limite]
+        ]
+
+
+indice_autocompletar = IndiceAutocompletar()
@@ -0,0 +1,108 @@
+import os
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Optional, Tuple
+
+# Resultados del índice a partir de los cuales compensa más la consulta SQL
+# que cargar los productos con un IN de ids
+MAXIMO_IDS = int(os.getenv("INDICE_ORDENADO_MAXIMO_IDS", 1000))
+
+
+# Ids de producto ordenados por (clave, id) en dos arrays paralelos, y los
+# que no tienen clave al final ordenados por id, como en la consulta SQL
+# (NULLS LAST, ver app/paginacion.py). Los textos se comparan por código de
+# carácter, igual que la colación BINARY de SQLite y "C" de PostgreSQL.
+# Las consultas por rango y por página son búsquedas binarias y los cambios
+# insertan o borran en la posición que toca.
+# - **tipo**: código de array.array para las claves ("d" para precios) o None
+#   para guardarlas en una lista (textos).
+class IndiceOrdenado:
+    def __init__(self, tipo: Optional[str] = None):
+        self._tipo = tipo
+        self._claves = array(tipo) if tipo else []
+        self._ids = array("q")
+        self._nulos = array("q")
+
+    def __len__(self):
+        return len(self._ids) + len(self._nulos)
+
+    def reconstruir(self, pares: Iterable[Tuple[object, int]]):
+        pares = list(pares)
+        ordenados = sorted((clave, id) for clave, id in pares if clave is not None)
+        claves = (clave for clave, _ in ordenados)
+        self._claves = array(self._tipo, claves) if self._tipo else list(claves)
+        self._ids = array("q", (id for _, id in ordenados))
+        self._nulos = array("q", sorted(id for clave, id in pares if clave is None))
+
+    # Primera posición con (clave, id) >= (clave, id) dados, o > si despues=True
+    def _posicion(self, clave, id: int, despues: bool = False) -> int:
+        inicio = bisect_left(self._claves, clave)
+        fin = bisect_right(self._claves, clave, inicio)
+        if despues:
+            return bisect_right(self._ids, id, inicio, fin)
+        return bisect_left(self._ids, id, inicio, fin)
+
+    def agregar(self, clave, id: int):
+        if clave is None:
+            insort(self._nulos, id)
+            return
+        posicion = self._posicion(clave, id)
+        self._claves.insert(posicion, clave)
+        self._ids.insert(posicion, id)
+
+    def quitar(self, clave, id: int):
+        if clave is None:
+            posicion = bisect_left(self._nulos, id)
+            if posicion < len(self._nulos) and self._nulos[posicion] == id:
+                del self._nulos[posicion]
+            return
+        posicion = self._posicion(clave, id)
+        if posicion < len(self._ids) and self._ids[posicion] == id and self._claves[posicion] == clave:
+            del self._claves[posicion]
+            del self._ids[posicion]
+
+    # Ids con minimo <= clave <= maximo, en orden (sin los que no tienen clave, como BETWEEN)
+    def rango(self, minimo, maximo) -> array:
+        return self._ids[bisect_left(self._claves, minimo):bisect_right(self._claves, maximo)]
+
+    # Hasta limite ids a continuación de (clave, id); sin cursor, los primeros (top-k)
+    def pagina(self, despues: Optional[Tuple[object, int]], limite: int) -> array:
+        if despues is not None and despues[0] is None:
+            inicio = bisect_right(self._nulos, despues[1])
+            return self._nulos[inicio:inicio + limite]
+        inicio = 0 if despues is None else self._posicion(despues[0], despues[1], despues=True)
+        ids = self._ids[inicio:inicio + limite]
+        return ids + self._nulos[:limite - len(ids)]
+
+
+# Índices de productos por precio y por nombre. Son opcionales (INDICE_ORDENADO=true)
+# porque ocupan memoria en cada worker; desactivados, los métodos no hacen nada y
+# los endpoints usan la consulta SQL.
+class IndicesProducto:
+    def __init__(self, activo: bool):
+        self.activo = activo
+        self.precio = IndiceOrdenado("d")
+        self.nombre = IndiceOrdenado()
+
+    def reconstruir(self, productos: Iterable[Tuple[int, str, float]]):
+        productos = list(productos)
+        self.precio.reconstruir((precio, id) for id, _, precio in productos)
+        self.nombre.reconstruir((nombre, id) for id, nombre, _ in productos)
+
+    def agregar(self, id: int, nombre: str, precio: float):
+        if self.activo:
+            self.precio.agregar(precio, id)
+            self.nombre.agregar(nombre, id)
+
+    def quitar(self, id: int, nombre: str, precio: float):
+        if self.activo:
+            self.precio.quitar(precio, id)
+            self.nombre.quitar(nombre, id)
+
+    def cambiar_precio(self, id: int, anterior: float, nuevo: float):
+        if self.activo:
+            self.precio.quitar(anterior, id)
+            self.precio.agregar(nuevo, id)
+
+
+indices_ordenados = IndicesProducto(activo=os.getenv("INDICE_ORDENADO", "false").lower() in ("1", "true", "si", "yes"))
@@ -0,0 +1,239 @@
+import math
+import os
+from array import array
+from itertools import combinations, repeat
+from operator import le, mul
+from typing import Iterable, List, Tuple
+
+INFINITO = math.inf
+
+# Tiendas máximas en un reparto y combinaciones de tiendas que se prueban como
+# mucho para buscar el reparto exacto; con más se usa una búsqueda local
+MAXIMO_TIENDAS = int(os.getenv("COMPARADOR_MAXIMO_TIENDAS", 3))
+MAXIMO_COMBINACIONES = int(os.getenv("COMPARADOR_MAXIMO_COMBINACIONES", 1000))
+
+
+# Matriz nombre de producto × supermercado con el precio más barato de ese
+# nombre en cada supermercado (infinito si no lo vende). Cada fila es un
+# array("d") con una columna por supermercado, así el coste de una lista en
+# todos los supermercados se calcula columna a columna con map/zip, en C.
+# Los cambios de precio solo tocan la celda del producto.
+class MatrizPrecios:
+    def __init__(self, activo: bool = True):
+        self.activo = activo
+        self._filas = {}  # nombre -> array("d") de precios por columna
+        self._columnas = {}  # supermercado_id -> columna
+        self._supermercados = []  # columna -> supermercado_id
+        self._celdas = {}  # (nombre, columna) -> {producto_id: precio}
+        self._productos = {}  # producto_id -> (nombre, columna)
+
+    def __len__(self):
+        return len(self._productos)
+
+    def _columna(self, supermercado_id: int) -> int:
+        columna = self._columnas.get(supermercado_id)
+        if columna is None:
+            columna = self._columnas[supermercado_id] = len(self._supermercados)
+            self._supermercados.append(supermercado_id)
+            for fila in self._filas.values():
+                fila.append(INFINITO)
+        return columna
+
+    # Recalcula el mínimo de una celda con los productos que tiene
+    def _actualizar_celda(self, nombre: str, columna: int):
+        ofertas = self._celdas.get((nombre, columna))
+        self._filas[nombre][columna] = min(ofertas.values()) if ofertas else INFINITO
+
+    def reconstruir(self, productos: Iterable[Tuple[int, str, float, int]]):
+        self._filas, self._columnas, self._supermercados, self._celdas, self._productos = {}, {}, [], {}, {}
+        productos = [producto for producto in productos if producto[2] is not None and producto[3] is not None]
+        for supermercado_id in sorted({supermercado_id for *_, supermercado_id in productos}):
+            self._columna(supermercado_id)
+        columnas = len(self._supermercados)
+        for id, nombre, precio, supermercado_id in productos:
+            columna = self._columnas[supermercado_id]
+            fila = self._filas.get(nombre)
+            if fila is None:
+                fila = self._filas[nombre] = array("d", repeat(INFINITO, columnas))
+            self._celdas.setdefault((nombre, columna), {})[id] = precio
+            self._productos[id] = (nombre, columna)
+            if precio < fila[columna]:
+                fila[columna] = precio
+
+    def agregar(self, id: int, nombre: str, precio: float, supermercado_id: int):
+        if not self.activo or precio is None or supermercado_id is None:
+            return
+        columna = self._columna(supermercado_id)
+        fila = self._filas.get(nombre)
+        if fila is None:
+            fila = self._filas[nombre] = array("d", repeat(INFINITO, len(self._supermercados)))
+        self._celdas.setdefault((nombre, columna), {})[id] = precio
+        self._productos[id] = (nombre, columna)
+        if precio < fila[columna]:
+            fila[columna] = precio
+
+    def quitar(self, id: int):
+        if not self.activo or id not in self._productos:
+            return
+        nombre, columna = self._productos.pop(id)
+        ofertas = self._celdas[(nombre, columna)]
+        del ofertas[id]
+        if not ofertas:
+            del self._celdas[(nombre, columna)]
+        self._actualizar_celda(nombre, columna)
+        if not any(precio != INFINITO for precio in self._filas[nombre]):
+            del self._filas[nombre]
+
+    def cambiar_precio(self, id: int, precio: float):
+        if not self.activo or id not in self._productos:
+            return
+        nombre, columna = self._productos[id]
+        self._celdas[(nombre, columna)][id] = precio
+        self._actualizar_celda(nombre, columna)
+
+    # Coste de una lista en cada supermercado y mejor reparto entre hasta
+    # `tiendas` supermercados.
+    # - **articulos**: pares (nombre, cantidad) de la lista; las cantidades deben ser
+    #   al menos 1 (con 0, infinito * 0 daría NaN en los supermercados que no lo venden).
+    # Devuelve un diccionario con supermercado_id en lugar de nombres.
+    def comparar(self, articulos: Iterable[Tuple[str, int]], tiendas: int) -> dict:
+        articulos = list(articulos)
+        if any(cantidad < 1 for _, cantidad in articulos):
+            raise ValueError("Las cantidades deben ser al menos 1")
+
+        nombres, costes, no_disponibles = [], [], []
+        for nombre, cantidad in articulos:
+            fila = self._filas.get(nombre)
+            if fila is None:
+                no_disponibles.append(nombre)
+            else:
+                nombres.append(nombre)
+                costes.append(array("d", map(mul, fila, repeat(cantidad))))
+
+        # Columnas de costes (una tupla por supermercado con el coste de cada artículo)
+        columnas = list(zip(*costes)) if costes else []
+        supermercados = []
+        for columna, costes_columna in enumerate(columnas):
+            disponibles = list(filter(INFINITO.__gt__, costes_columna))
+            if disponibles:
+                supermercados.append({
+                    "supermercado_id": self._supermercados[columna],
+                    "total": round(sum(disponibles), 2),
+                    "disponibles": len(disponibles),
+                    "faltan": len(nombres) - len(disponibles),
+                })
+        supermercados.sort(key=lambda supermercado: (supermercado["faltan"], supermercado["total"]))
+
+        return {
+            "supermercados": supermercados,
+            "reparto": self._reparto(nombres, columnas, tiendas) if columnas else None,
+            "no_disponibles": no_disponibles,
+        }
+
+    # Conjunto de hasta `tiendas` columnas con el menor coste, comprando cada
+    # artículo en la más barata del conjunto. Se prefiere el conjunto al que le
+    # faltan menos artículos y, entre esos, el más barato.
+    def _reparto(self, nombres: List[str], columnas: list, tiendas: int) -> dict:
+        # Candidatas: las que venden algo, sin las dominadas (otra es igual o más
+        # barata en todo), que nunca mejoran un reparto. Solo se compara con las
+        # más baratas, que son las que suelen dominar a las demás.
+        candidatas = sorted(
+            (columna for columna, costes in enumerate(columnas) if any(coste != INFINITO for coste in costes)),
+            key=lambda columna: _coste(columnas[columna]),
+        )
+        no_dominadas = [] if tiendas > 1 else candidatas[:1]
+        for columna in candidatas if tiendas > 1 else ():
+            if not any(all(map(le, columnas[otra], columnas[columna])) for otra in no_dominadas[:16]):
+                no_dominadas.append(columna)
+        if not no_dominadas:
+            return None
+
+        tiendas = min(tiendas, len(no_dominadas))
+        exacto = _combinaciones(len(no_dominadas), tiendas) <= MAXIMO_COMBINACIONES
+        if exacto:
+            mejor, mejor_coste = None, (INFINITO, INFINITO)
+            for k in range(1, tiendas + 1):
+                for conjunto in combinations(no_dominadas, k):
+                    coste = _coste(map(min, *(columnas[columna] for columna in conjunto)) if k > 1 else columnas[conjunto[0]])
+                    if coste < mejor_coste:
+                        mejor, mejor_coste = conjunto, coste
+        else:
+            mejor, mejor_coste = _busqueda_local(columnas, no_dominadas, tiendas)
+
+        por_tienda = {columna: [] for columna in mejor}
+        totales = dict.fromkeys(mejor, 0.0)
+        for i, nombre in enumerate(nombres):
+            columna = min(mejor, key=lambda columna: columnas[columna][i])
+            if columnas[columna][i] != INFINITO:
+                por_tienda[columna].append(nombre)
+                totales[columna] += columnas[columna][i]
+
+        return {
+            "tiendas": [
+                {"supermercado_id": self._supermercados[columna], "total": round(totales[columna], 2), "productos": por_tienda[columna]}
+                for columna in mejor if por_tienda[columna]
+            ],
+            "total": round(mejor_coste[1], 2),
+            "faltan": mejor_coste[0],
+            "exacto": exacto,
+        }
+
+
+# (artículos que faltan, total de los que hay) de unos costes por artículo
+def _coste(costes) -> Tuple[int, float]:
+    costes = list(costes)
+    total = sum(costes)
+    if total != INFINITO:
+        return 0, total
+    return costes.count(INFINITO), sum(filter(INFINITO.__gt__, costes))
+
+
+# Reparto aproximado cuando hay demasiadas combinaciones: se añaden una a una
+# las tiendas que más reducen el coste y después se cambia una tienda del
+# conjunto por otra mientras el coste baje
+def _busqueda_local(columnas: list, candidatas: list, tiendas: int) -> tuple:
+    conjunto = []
+    coste = (INFINITO, INFINITO)
+    minimos = None
+    for _ in range(tiendas):
+        mejor_columna, mejor_coste = None, coste
+        for columna in candidatas:
+            if columna in conjunto:
+                continue
+            nuevo = _coste(map(min, minimos, columnas[columna]) if minimos else columnas[columna])
+            if nuevo < mejor_coste:
+                mejor_columna, mejor_coste = columna, nuevo
+        if mejor_columna is None:
+            break
+        conjunto.append(mejor_columna)
+        coste = mejor_coste
+        minimos = list(map(min, minimos, columnas[mejor_columna])) if minimos else list(columnas[mejor_columna])
+
+    # En cada pasada se hace el mejor cambio de todos los posibles
+    while True:
+        mejor_cambio, mejor_coste = None, coste
+        for posicion in range(len(conjunto)):
+            resto = conjunto[:posicion] + conjunto[posicion + 1:]
+            minimos_resto = list(map(min, *(columnas[columna] for columna in resto))) if len(resto) > 1 else \
+                (list(columnas[resto[0]]) if resto else None)
+            for columna in candidatas:
+                if columna in conjunto:
+                    continue
+                nuevo = _coste(map(min, minimos_resto, columnas[columna]) if minimos_resto else columnas[columna])
+                if nuevo < mejor_coste:
+                    mejor_cambio, mejor_coste = (posicion, columna), nuevo
+        if mejor_cambio is None:
+            break
+        conjunto[mejor_cambio[0]] = mejor_cambio[1]
+        coste = mejor_coste
+    return tuple(conjunto), coste
+
+
+# Conjuntos de 1 a `tiendas` elementos que se pueden formar con n
+def _combinaciones(n: int, tiendas: int) -> int:
+    return sum(math.comb(n, k) for k in range(1, tiendas + 1))
+
+
+# Matriz de precios de la aplicación (COMPARADOR_MATRIZ=false para no tenerla en
+# memoria; el comparador la construye entonces con los productos de cada lista)
+matriz_precios = MatrizPrecios(activo=os.getenv("COMPARADOR_MATRIZ", "true").lower() in ("1", "true", "si", "yes"))
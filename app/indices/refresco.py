@@ -0,0 +1,106 @@
+import asyncio
+import contextvars
+import logging
+import os
+import time
+from typing import Callable, Iterable
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app import models
+from app.db.database import SessionLocal
+from app.indices.autocompletar import IndiceAutocompletar, indice_autocompletar
+from app.indices.ordenados import IndicesProducto, indices_ordenados
+from app.indices.precios import MatrizPrecios, matriz_precios
+
+# Los índices en memoria se construyen en cada worker y solo ven los cambios que
+# hace ese mismo worker; los de otros workers, las escrituras directas en la base
+# de datos y las importaciones hechas en otro proceso no les llegan. Por eso cada
+# índice caduca INDICES_VENTANA segundos después de construirse: la primera
+# petición que lo encuentra caducado lanza su reconstrucción en segundo plano y,
+# hasta que termina, los endpoints usan la consulta SQL (el comparador construye
+# una matriz solo con los productos de la lista; el autocompletado, que no tiene
+# consulta equivalente, sigue con el índice anterior). Igual que ETAG_VENTANA,
+# INDICES_VENTANA=0 quita el límite y solo es seguro con un único worker.
+INDICES_VENTANA = float(os.getenv("INDICES_VENTANA", "30"))
+
+logger = logging.getLogger("app.indices")
+
+
+# Reconstrucción periódica de un índice en memoria.
+# - **indice**: el objeto que usan los endpoints; se actualiza en su sitio.
+# - **nuevo**: crea un índice vacío del mismo tipo.
+# - **filas**: lee de una sesión síncrona las filas que recibe indice.reconstruir.
+class Refresco:
+    def __init__(self, nombre: str, indice, nuevo: Callable, filas: Callable[[Session], Iterable], ventana: float = INDICES_VENTANA):
+        self.nombre = nombre
+        self.indice = indice
+        self.nuevo = nuevo
+        self.filas = filas
+        self.ventana = ventana
+        self.construido = None  # time.monotonic() al empezar a leer las filas de la última reconstrucción
+        self.reconstrucciones = 0
+        self._tarea = None
+
+    # Lee las filas en una sesión propia y construye un índice nuevo, sin tocar el actual
+    def _construir(self) -> tuple:
+        inicio = time.monotonic()
+        nuevo = self.nuevo()
+        with SessionLocal() as db:
+            nuevo.reconstruir(self.filas(db))
+        return nuevo, inicio
+
+    # Cambia el contenido del índice por el del nuevo. Se hace en el bucle de eventos y
+    # sin await de por medio, así una petición ve el índice anterior o el nuevo, nunca uno a medias.
+    def _reemplazar(self, nuevo, inicio: float):
+        vars(self.indice).update(vars(nuevo))
+        self.construido = inicio
+        self.reconstrucciones += 1
+
+    # Reconstrucción síncrona: arranque del worker, scripts y pruebas
+    def reconstruir(self):
+        self._reemplazar(*self._construir())
+
+    # True si el índice se construyó hace menos de `ventana` segundos. Si ha caducado
+    # devuelve False y lanza la reconstrucción en segundo plano (una sola a la vez).
+    def vigente(self) -> bool:
+        if self.construido is not None and (not self.ventana or time.monotonic() - self.construido < self.ventana):
+            return True
+        if self._tarea is None or self._tarea.done():
+            # Contexto vacío: las sentencias de la reconstrucción no cuentan en las métricas de la petición
+            self._tarea = asyncio.get_running_loop().create_task(self._en_segundo_plano(), context=contextvars.Context())
+        return False
+
+    async def _en_segundo_plano(self):
+        try:
+            nuevo, inicio = await asyncio.get_running_loop().run_in_executor(None, self._construir)
+        except Exception:
+            logger.exception("Error al reconstruir el índice %s", self.nombre)
+            return
+        self._reemplazar(nuevo, inicio)
+
+
+refresco_autocompletar = Refresco(
+    "autocompletar",
+    indice_autocompletar,
+    IndiceAutocompletar,
+    lambda db: db.execute(select(models.Producto.nombre).execution_options(yield_per=10000)).scalars(),
+)
+
+refresco_ordenados = Refresco(
+    "ordenados",
+    indices_ordenados,
+    lambda: IndicesProducto(activo=indices_ordenados.activo),
+    lambda db: db.execute(
+        select(models.Producto.id, models.Producto.nombre, models.Producto.precio).execution_options(yield_per=10000)
+    ),
+)
+
+refresco_matriz = Refresco(
+    "matriz",
+    matriz_precios,
+    lambda: MatrizPrecios(activo=matriz_precios.activo),
+    lambda db: db.execute(
+        select(models.Producto.id, models.Producto.nombre, models.Producto.precio, models.Producto.supermercado_id)
+        .execution_options(yield_per=10000)
+    ),
+)
@@ -0,0 +1,175 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Las métricas se pueden desactivar con METRICAS=false
+METRICAS_ACTIVAS = os.getenv("METRICAS", "true").lower() in ("1", "true", "si", "yes")
+
+# Límites superiores de los histogramas
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_BYTES = (100, 1000, 10000, 100000, 1000000, 10000000)
+LIMITES_SENTENCIAS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+# Histograma acumulativo al estilo Prometheus
+class Histograma:
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)  # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+# Métricas de una ruta (método + plantilla de la ruta)
+class MetricasRuta:
+    __slots__ = ("duracion", "tamano", "sentencias", "tiempo_bd", "estados")
+
+    def __init__(self):
+        self.duracion = Histograma(LIMITES_SEGUNDOS)
+        self.tamano = Histograma(LIMITES_BYTES)
+        self.sentencias = Histograma(LIMITES_SENTENCIAS)
+        self.tiempo_bd = Histograma(LIMITES_SEGUNDOS)
+        self.estados = {}
+
+
+# Sentencias SQL y tiempo en la base de datos de la petición en curso.
+# El objeto se crea en el middleware y los eventos del motor lo actualizan:
+# el contexto llega a los eventos también desde los greenlets de SQLAlchemy async.
+class ConsultasPeticion:
+    __slots__ = ("sentencias", "segundos")
+
+    def __init__(self):
+        self.sentencias = 0
+        self.segundos = 0.0
+
+
+consultas_peticion: ContextVar = ContextVar("consultas_peticion", default=None)
+
+rutas = {}  # (método, ruta) -> MetricasRuta
+en_curso = 0
+enrutado = {}  # (método, ruta, base de datos, motivo) -> peticiones, con réplica de lectura
+
+
+# Cuenta a qué base de datos (primaria o réplica) se ha enviado una petición y por qué
+def registrar_enrutado(scope, destino: str, motivo: str):
+    if not METRICAS_ACTIVAS:
+        return
+    clave = (scope["method"], getattr(scope.get("route"), "path", None) or "sin_ruta", destino, motivo)
+    enrutado[clave] = enrutado.get(clave, 0) + 1
+
+
+# Cuenta las sentencias y el tiempo de cada una en la petición en curso
+def escuchar_sentencias(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if consultas_peticion.get() is not None:
+            context._inicio_metricas = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def despues(conn, cursor, statement, parameters, context, executemany):
+        consultas = consultas_peticion.get()
+        inicio = getattr(context, "_inicio_metricas", None)
+        if consultas is not None and inicio is not None:
+            consultas.sentencias += 1
+            consultas.segundos += time.perf_counter() - inicio
+
+
+# Middleware ASGI (sin BaseHTTPMiddleware, que añade una tarea y copia el cuerpo)
+# que mide cada petición HTTP y la guarda por método y plantilla de ruta.
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICAS_ACTIVAS:
+            await self.app(scope, receive, send)
+            return
+
+        global en_curso
+        respuesta = {"estado": 500, "bytes": 0}
+        consultas = ConsultasPeticion()
+        token = consultas_peticion.set(consultas)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["estado"] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                respuesta["bytes"] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            en_curso -= 1
+            consultas_peticion.reset(token)
+
+            ruta = scope.get("route")
+            clave = (scope["method"], getattr(ruta, "path", None) or "sin_ruta")
+            metricas = rutas.get(clave)
+            if metricas is None:
+                metricas = rutas[clave] = MetricasRuta()
+            metricas.duracion.observar(duracion)
+            metricas.tamano.observar(respuesta["bytes"])
+            metricas.sentencias.observar(consultas.sentencias)
+            metricas.tiempo_bd.observar(consultas.segundos)
+            metricas.estados[respuesta["estado"]] = metricas.estados.get(respuesta["estado"], 0) + 1
+
+
+def _etiquetas(metodo: str, ruta: str) -> str:
+    ruta = ruta.replace("\\", "\\\\").replace('"', '\\"')
+    return f'metodo="{metodo}",ruta="{ruta}"'
+
+
+def _histograma(lineas: list, nombre: str, descripcion: str, valores: list):
+    lineas.append(f"# HELP {nombre} {descripcion}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for etiquetas, histograma in valores:
+        acumulado = 0
+        for limite, cuenta in zip(histograma.limites + ("+Inf",), histograma.cuentas):
+            acumulado += cuenta
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {histograma.suma}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {histograma.total}")
+
+
+# Texto en el formato de exposición de Prometheus
+def exportar() -> str:
+    ordenadas = [(_etiquetas(*clave), metricas) for clave, metricas in sorted(rutas.items())]
+    lineas = [
+        "# HELP api_peticiones_en_curso Peticiones HTTP que se están atendiendo",
+        "# TYPE api_peticiones_en_curso gauge",
+        f"api_peticiones_en_curso {en_curso}",
+        "# HELP api_peticiones_total Peticiones HTTP atendidas por código de estado",
+        "# TYPE api_peticiones_total counter",
+    ]
+    for etiquetas, metricas in ordenadas:
+        for estado, cuenta in sorted(metricas.estados.items()):
+            lineas.append(f'api_peticiones_total{{{etiquetas},estado="{estado}"}} {cuenta}')
+
+    if enrutado:
+        lineas.append("# HELP api_bd_enrutado_total Peticiones por base de datos (primaria o réplica) y motivo")
+        lineas.append("# TYPE api_bd_enrutado_total counter")
+        for (metodo, ruta, destino, motivo), cuenta in sorted(enrutado.items()):
+            lineas.append(f'api_bd_enrutado_total{{{_etiquetas(metodo, ruta)},destino="{destino}",motivo="{motivo}"}} {cuenta}')
+
+    _histograma(lineas, "api_peticion_segundos", "Duración de las peticiones HTTP",
+                [(etiquetas, metricas.duracion) for etiquetas, metricas in ordenadas])
+    _histograma(lineas, "api_respuesta_bytes", "Tamaño del cuerpo de las respuestas",
+                [(etiquetas, metricas.tamano) for etiquetas, metricas in ordenadas])
+    _histograma(lineas, "api_sentencias_sql", "Sentencias SQL ejecutadas por petición",
+                [(etiquetas, metricas.sentencias) for etiquetas, metricas in ordenadas])
+    _histograma(lineas, "api_bd_segundos", "Tiempo en la base de datos por petición",
+                [(etiquetas, metricas.tiempo_bd) for etiquetas, metricas in ordenadas])
+    return "\n".join(lineas) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import *
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 from datetime import datetime
@@ -9,8 +9,9 @@ class Supermercado(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     nombre = Column(String, unique=True, nullable=False)
 
-    productos = relationship("Producto", back_populates="supermercado", cascade="all, delete-orphan")
-    listas_compra = relationship("ListaCompra", back_populates="supermercado", cascade="all, delete-orphan")
+    # passive_deletes: al borrar no se cargan los hijos, los borra la base de datos (ON DELETE CASCADE)
+    productos = relationship("Producto", back_populates="supermercado", cascade="all, delete-orphan", passive_deletes=True)
+    listas_compra = relationship("ListaCompra", back_populates="supermercado", cascade="all, delete-orphan", passive_deletes=True)
 
 
 # Tabla de Categorías (Pasillos)
@@ -21,23 +22,27 @@ class Categoria(Base):
     pasillo = Column(Integer, nullable=False)
 
     # Relación con Productos usando back_populates
-    productos = relationship("Producto", back_populates="categoria", cascade="all, delete-orphan")
+    productos = relationship("Producto", back_populates="categoria", cascade="all, delete-orphan", passive_deletes=True)
 
 
 # Tabla de Productos
 class Producto(Base):
     __tablename__ = "producto"
+    __table_args__ = (
+        # Solo en PostgreSQL (migración 6): orden por nombre con la colación "C"
+        Index("ix_producto_nombre_c", text('nombre COLLATE "C"'), "id").ddl_if(dialect="postgresql"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    nombre = Column(String)
-    precio = Column(Float)
-    supermercado_id = Column(Integer, ForeignKey("supermercado.id"))
-    categoria_id = Column(Integer, ForeignKey("categoria.id"))
+    nombre = Column(String, index=True)
+    precio = Column(Float, index=True)
+    supermercado_id = Column(Integer, ForeignKey("supermercado.id", ondelete="CASCADE"), index=True)
+    categoria_id = Column(Integer, ForeignKey("categoria.id", ondelete="CASCADE"), index=True)
 
     # Relación con Categoria usando back_populates
     categoria = relationship("Categoria", back_populates="productos")
 
     # Relación con ProductoLista usando back_populates
-    producto_lista = relationship("ProductoLista", back_populates="producto", cascade="all, delete-orphan")
+    producto_lista = relationship("ProductoLista", back_populates="producto", cascade="all, delete-orphan", passive_deletes=True)
 
     # Relación con Supermercado usando back_populates
     supermercado = relationship("Supermercado", back_populates="productos")
@@ -48,23 +53,31 @@ class ListaCompra(Base):
     __tablename__ = "lista_compra"
     id = Column(Integer, primary_key=True, autoincrement=True)
     fecha_creacion = Column(DateTime, default=datetime.utcnow)
-    supermercado_id = Column(Integer, ForeignKey("supermercado.id"))
-    usuario_id = Column(Integer, ForeignKey("usuario.id"))
+    supermercado_id = Column(Integer, ForeignKey("supermercado.id", ondelete="CASCADE"), index=True)
+    usuario_id = Column(Integer, ForeignKey("usuario.id"), index=True)
+
+    # Totales de la lista, mantenidos al agregar o quitar productos (ver app/db/totales.py)
+    num_productos = Column(Integer, nullable=False, default=0, server_default="0")
+    total = Column(Float, nullable=False, default=0, server_default="0")
 
     # Relación con Supermercado usando back_populates
     supermercado = relationship("Supermercado", back_populates="listas_compra")
     usuario = relationship("Usuario", back_populates="listas_compra")
-    productos = relationship("ProductoLista", back_populates="lista_compra", cascade="all, delete-orphan")
+    productos = relationship("ProductoLista", back_populates="lista_compra", cascade="all, delete-orphan", passive_deletes=True)
 
 
 # Tabla ProductoLista (relación entre productos y listas de compra)
 class ProductoLista(Base):
     __tablename__ = "producto_lista"
+    # Un producto solo puede estar una vez en cada lista (el índice sirve también para buscar por lista)
+    __table_args__ = (
+        Index("uq_producto_lista_lista_producto", "lista_compra_id", "producto_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     cantidad = Column(Integer, default=1)
     precio = Column(Float)
-    lista_compra_id = Column(Integer, ForeignKey("lista_compra.id"))
-    producto_id = Column(Integer, ForeignKey("producto.id"))
+    lista_compra_id = Column(Integer, ForeignKey("lista_compra.id", ondelete="CASCADE"))
+    producto_id = Column(Integer, ForeignKey("producto.id", ondelete="CASCADE"), index=True)
 
     # Relación con ListaCompra usando back_populates
     lista_compra = relationship("ListaCompra", back_populates="productos")
@@ -79,7 +92,21 @@ class Usuario(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     username = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
-    nombre = Column(String, nullable=False)
+    nombre = Column(String, nullable=False, index=True)
     apellido = Column(String, nullable=False)
 
-    listas_compra = relationship("ListaCompra", back_populates="usuario")
\ No newline at end of file
+    listas_compra = relationship("ListaCompra", back_populates="usuario")
+
+
+# Historial de precios de los productos. Solo se añaden filas: una por cada
+# precio que se escribe en Producto.precio (ver app/db/historial.py). No tiene
+# clave ajena para que el historial se conserve al borrar el producto.
+class HistorialPrecio(Base):
+    __tablename__ = "historial_precio"
+    __table_args__ = (
+        Index("ix_historial_precio_producto_fecha", "producto_id", "fecha"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    producto_id = Column(Integer, nullable=False)
+    precio = Column(Float, nullable=False)
+    fecha = Column(DateTime, nullable=False, default=datetime.utcnow)
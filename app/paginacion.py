@@ -0,0 +1,125 @@
+import base64
+import json
+from typing import Optional
+from fastapi import Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import fabrica_sesiones
+from app.exceptions import BadRequestException
+from app.respuestas import a_json, respuesta_json
+
+# Número máximo de elementos por página
+LIMITE_MAXIMO = 1000
+
+# Filas que se piden al cursor del servidor en cada viaje en modo streaming
+TAMANO_LOTE = 1000
+
+
+# Parámetros comunes de los listados paginados
+class Paginacion:
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO, description="Número máximo de elementos a devolver."),
+        after: Optional[str] = Query(None, description="Cursor devuelto en la cabecera X-Siguiente-Cursor de la página anterior."),
+        formato: str = Query("json", pattern="^(json|ndjson)$", description="'json' o 'ndjson' para recibir las filas en streaming."),
+    ):
+        self.limit = limit
+        self.after = after
+        self.formato = formato
+
+
+# Convierte los valores de la última fila en un cursor opaco
+def codificar_cursor(valores: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+# Recupera los valores de un cursor generado por codificar_cursor
+def decodificar_cursor(cursor: str, num_valores: int) -> list:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise BadRequestException(detail="Cursor inválido")
+
+    if not isinstance(valores, list) or len(valores) != num_valores:
+        raise BadRequestException(detail="Cursor inválido")
+    return valores
+
+
+# Ordena la consulta por las columnas del cursor (la última debe ser el id)
+# y se queda con las filas posteriores al cursor. Los NULL de las columnas
+# anteriores al id van al final en cualquier base de datos (SQLite los pone
+# al principio y PostgreSQL al final), y el cursor los trata como mayores que
+# cualquier valor para no saltar ni repetir filas.
+def ordenar_desde_cursor(consulta, columnas: list, after: Optional[str]):
+    *claves, id = columnas
+    consulta = consulta.order_by(*[columna.nulls_last() for columna in claves], id)
+    if after is None:
+        return consulta
+
+    valores = decodificar_cursor(after, len(columnas))
+
+    # (c1, c2, ...) > (v1, v2, ...) escrito sin comparar tuplas para que
+    # funcione en cualquier base de datos
+    condiciones = []
+    for i, columna in enumerate(columnas):
+        iguales = [_igual(columnas[j], valores[j]) for j in range(i)]
+        if i == len(claves):
+            condiciones.append(and_(*iguales, columna > valores[i]))
+        elif valores[i] is not None:
+            # Detrás de un NULL no hay ningún valor mayor
+            condiciones.append(and_(*iguales, or_(columna > valores[i], columna.is_(None))))
+    return consulta.where(or_(*condiciones))
+
+
+def _igual(columna, valor):
+    return columna.is_(None) if valor is None else columna == valor
+
+
+# Con una sola entidad en el SELECT se devuelven los objetos en lugar de tuplas
+def _filas(resultado, consulta):
+    if len(consulta.column_descriptions) == 1:
+        return resultado.scalars()
+    return resultado
+
+
+# Envía las filas de la consulta como NDJSON leyéndolas de un cursor del servidor.
+# La sesión es propia porque la respuesta se sigue enviando después de que
+# termine el endpoint; usa la misma base de datos (primaria o réplica) que `db`.
+def respuesta_ndjson(db: AsyncSession, consulta, serializar) -> StreamingResponse:
+    fabrica = fabrica_sesiones(db)
+
+    async def generar():
+        async with fabrica() as db:
+            resultado = await db.stream(consulta.execution_options(yield_per=TAMANO_LOTE))
+            async for fila in _filas(resultado, consulta):
+                yield a_json(serializar(fila)) + b"\n"
+
+    return StreamingResponse(generar(), media_type="application/x-ndjson")
+
+
+# Ejecuta un listado paginado por cursor.
+# - **columnas**: columnas de ordenación, terminando en el id.
+# - **clave**: obtiene de una fila los valores de esas columnas.
+# - **serializar**: convierte una fila en el diccionario de la respuesta.
+# Si hay más páginas, el cursor de la siguiente va en la cabecera X-Siguiente-Cursor.
+# La respuesta se serializa aquí directamente, sin pasar por jsonable_encoder.
+async def listar(db: AsyncSession, consulta, columnas: list, clave, serializar, pagina: Paginacion, response: Response):
+    consulta = ordenar_desde_cursor(consulta, columnas, pagina.after)
+
+    if pagina.formato == "ndjson":
+        if pagina.limit is not None:
+            consulta = consulta.limit(pagina.limit)
+        return respuesta_ndjson(db, consulta, serializar)
+
+    if pagina.limit is None:
+        resultado = await db.execute(consulta)
+        return respuesta_json([serializar(fila) for fila in _filas(resultado, consulta)], response)
+
+    resultado = await db.execute(consulta.limit(pagina.limit + 1))
+    filas = _filas(resultado, consulta).all()
+    if len(filas) > pagina.limit:
+        filas = filas[:pagina.limit]
+        response.headers["X-Siguiente-Cursor"] = codificar_cursor(clave(filas[-1]))
+
+    return respuesta_json([serializar(fila) for fila in filas], response)
@@ -0,0 +1,182 @@
+"""
+Detector de consultas N+1 y perfilador de sentencias SQL por petición, para
+desarrollo y pruebas (desactivado por defecto):
+
+- DETECTOR_N1=aviso|error: registra las sentencias de cada petición y marca las
+  que se repiten más de DETECTOR_N1_UMBRAL veces con la misma forma (el mismo
+  SQL con otros parámetros), lo típico de una relación cargada de forma perezosa
+  dentro de un bucle. Con "aviso" se escribe un warning al terminar la petición;
+  con "error" se lanza ConsultasRepetidas en la sentencia que supera el umbral.
+- PERFIL_DIRECTORIO=ruta: guarda en ese directorio un JSON por petición con las
+  sentencias, su tiempo y el plan (EXPLAIN) de cada SELECT distinta.
+"""
+import json
+import logging
+import os
+import re
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+MODO_N1 = os.getenv("DETECTOR_N1", "off").lower()
+UMBRAL_N1 = int(os.getenv("DETECTOR_N1_UMBRAL", 5))
+# Rutas que repiten sentencias a propósito (p. ej. la importación por lotes)
+RUTAS_EXCLUIDAS = {ruta for ruta in os.getenv("DETECTOR_N1_EXCLUIR", "/productos/importar").split(",") if ruta}
+PERFIL_DIRECTORIO = os.getenv("PERFIL_DIRECTORIO", "")
+PERFIL_EXPLAIN = os.getenv("PERFIL_EXPLAIN", "true").lower() in ("1", "true", "si", "yes")
+
+PERFILADOR_ACTIVO = MODO_N1 in ("aviso", "error") or bool(PERFIL_DIRECTORIO)
+
+logger = logging.getLogger("app.perfilador")
+
+# Marcadores de parámetros de los distintos drivers (?, $1, %(nombre)s, %s), con
+# el tipo que añade asyncpg a los IN expandidos ($1::INTEGER)
+_MARCADOR = re.compile(r"(?:\?|\$\d+|%\(\w+\)s|%s)(?:::\w+(?:\(\d+\))?)?")
+# Listas de marcadores (IN expandidos) y filas de VALUES de un INSERT de varias filas
+_LISTA = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+_FILAS = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+
+
+class ConsultasRepetidas(Exception):
+    pass
+
+
+# Forma de una sentencia: el SQL sin espacios de más y con los parámetros y las
+# listas de parámetros unificados, para que un IN con 3 o con 30 valores cuente igual
+def forma_sentencia(sql: str) -> str:
+    forma = _MARCADOR.sub("?", " ".join(sql.split()))
+    forma = _LISTA.sub("(?, ...)", forma)
+    return _FILAS.sub(r"\1, ...", forma)
+
+
+# Sentencias de la petición en curso, con el mismo mecanismo que las métricas
+class PerfilPeticion:
+    __slots__ = ("scope", "sentencias", "repeticiones")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.sentencias = []  # (forma, sql, parámetros, segundos, executemany, motor)
+        self.repeticiones = {}  # forma -> veces
+
+    @property
+    def ruta(self) -> str:
+        return getattr(self.scope.get("route"), "path", None) or self.scope["path"]
+
+    def registrar(self, sql: str, parametros, segundos: float, executemany: bool, motor):
+        forma = forma_sentencia(sql)
+        self.sentencias.append((forma, sql, parametros, segundos, executemany, motor))
+        veces = self.repeticiones[forma] = self.repeticiones.get(forma, 0) + 1
+        if veces == UMBRAL_N1 + 1 and MODO_N1 == "error" and self.ruta not in RUTAS_EXCLUIDAS:
+            infracciones.append((self.scope["method"], self.ruta, forma, veces))
+            raise ConsultasRepetidas(
+                f"{self.scope['method']} {self.ruta}: sentencia repetida más de {UMBRAL_N1} veces: {forma}"
+            )
+
+    # Formas que superan el umbral, con las veces que se han ejecutado
+    def repetidas(self) -> dict:
+        return {forma: veces for forma, veces in self.repeticiones.items() if veces > UMBRAL_N1}
+
+
+perfil_peticion: ContextVar = ContextVar("perfil_peticion", default=None)
+
+infracciones = []  # (método, ruta, forma, veces) de las peticiones que han superado el umbral
+
+
+def escuchar_sentencias_perfil(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if perfil_peticion.get() is not None:
+            context._inicio_perfil = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def despues(conn, cursor, statement, parameters, context, executemany):
+        perfil = perfil_peticion.get()
+        inicio = getattr(context, "_inicio_perfil", None)
+        if perfil is not None and inicio is not None:
+            perfil.registrar(statement, parameters, time.perf_counter() - inicio, executemany, conn.engine)
+
+
+# Plan de ejecución de una sentencia con los parámetros con los que se ejecutó
+async def explicar(motor, sql: str, parametros) -> list:
+    from app.db.database import async_engine
+
+    prefijo = "EXPLAIN QUERY PLAN " if motor.dialect.name == "sqlite" else "EXPLAIN "
+    if motor is async_engine.sync_engine:
+        async with async_engine.connect() as conexion:
+            filas = (await conexion.exec_driver_sql(prefijo + sql, parametros)).all()
+    else:
+        def ejecutar():
+            with motor.connect() as conexion:
+                return conexion.exec_driver_sql(prefijo + sql, parametros).all()
+        filas = await run_in_threadpool(ejecutar)
+    return [" | ".join(str(valor) for valor in fila) for fila in filas]
+
+
+async def guardar_perfil(perfil: PerfilPeticion, estado: int, segundos: float):
+    planes = {}
+    sentencias = []
+    for forma, sql, parametros, duracion, executemany, motor in perfil.sentencias:
+        if PERFIL_EXPLAIN and not executemany and forma not in planes and forma.upper().startswith(("SELECT", "WITH")):
+            try:
+                planes[forma] = await explicar(motor, sql, parametros)
+            except Exception as e:
+                planes[forma] = [f"Error al obtener el plan: {e}"]
+        sentencias.append({
+            "sql": sql,
+            "parametros": f"{len(parametros)} filas" if executemany else parametros,
+            "ms": round(duracion * 1000, 3),
+        })
+
+    contenido = {
+        "metodo": perfil.scope["method"],
+        "ruta": perfil.ruta,
+        "url": perfil.scope["path"] + ("?" + perfil.scope["query_string"].decode() if perfil.scope.get("query_string") else ""),
+        "estado": estado,
+        "ms": round(segundos * 1000, 3),
+        "ms_bd": round(sum(sentencia["ms"] for sentencia in sentencias), 3),
+        "num_sentencias": len(sentencias),
+        "repetidas": perfil.repetidas(),
+        "sentencias": sentencias,
+        "planes": planes,
+    }
+    os.makedirs(PERFIL_DIRECTORIO, exist_ok=True)
+    nombre = f"{time.time_ns()}-{perfil.scope['method']}-{re.sub(r'[^A-Za-z0-9]+', '_', perfil.ruta).strip('_') or 'raiz'}.json"
+    with open(os.path.join(PERFIL_DIRECTORIO, nombre), "w", encoding="utf-8") as fichero:
+        json.dump(contenido, fichero, ensure_ascii=False, indent=2, default=str)
+
+
+# Middleware ASGI que registra las sentencias de cada petición; solo se añade a
+# la aplicación si el detector o el perfil están activos
+class MiddlewarePerfilador:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        respuesta = {"estado": 500}
+        perfil = PerfilPeticion(scope)
+        token = perfil_peticion.set(perfil)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["estado"] = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            segundos = time.perf_counter() - inicio
+            perfil_peticion.reset(token)
+
+            if MODO_N1 == "aviso" and perfil.ruta not in RUTAS_EXCLUIDAS:
+                for forma, veces in perfil.repetidas().items():
+                    infracciones.append((scope["method"], perfil.ruta, forma, veces))
+                    logger.warning("Posible N+1 en %s %s: sentencia ejecutada %d veces: %s", scope["method"], perfil.ruta, veces, forma)
+
+            if PERFIL_DIRECTORIO:
+                await guardar_perfil(perfil, respuesta["estado"], segundos)
@@ -0,0 +1,53 @@
+import json
+from typing import Optional, Sequence
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+# orjson es opcional: si no está instalado se usa json de la librería estándar
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Fechas en formato ISO, igual que orjson y pydantic
+def _por_defecto(valor):
+    if hasattr(valor, "isoformat"):
+        return valor.isoformat()
+    return str(valor)
+
+
+# Convierte el contenido a JSON en bytes (UTF-8, sin escapar tildes)
+def a_json(contenido) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(contenido, ensure_ascii=False, separators=(",", ":"), default=_por_defecto).encode()
+
+
+# Clase de respuesta por defecto de la aplicación
+class RespuestaJSON(JSONResponse):
+    def render(self, content) -> bytes:
+        return a_json(content)
+
+
+# Respuesta ya serializada para devolver directamente desde un endpoint, sin
+# pasar por jsonable_encoder. Copia las cabeceras que las dependencias hayan
+# puesto en la respuesta del endpoint (ETag, cursor de la siguiente página...),
+# incluidas las repetidas como varias Set-Cookie.
+def respuesta_json(contenido, response: Optional[Response] = None) -> RespuestaJSON:
+    respuesta = RespuestaJSON(contenido)
+    if response is not None:
+        respuesta.raw_headers.extend(
+            (nombre, valor) for nombre, valor in response.raw_headers if nombre != b"content-length"
+        )
+    return respuesta
+
+
+# Genera una función fila -> dict para filas con las columnas en ese orden
+def serializador_filas(claves: Sequence[str]):
+    claves = tuple(claves)
+
+    def serializar(fila) -> dict:
+        return dict(zip(claves, fila))
+
+    return serializar
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from app.borrado import purgas
+from app.exceptions import NotFoundException
+
+router = APIRouter(
+    prefix="/borrados",  # Prefijo en las rutas de las purgas asíncronas
+    tags=["Borrados"],  # Esta etiqueta agrupa las rutas en Swagger UI
+)
+
+@router.get("/", summary="Purgas asíncronas de este worker")
+async def obtener_purgas():
+    """
+    Estado de las purgas de supermercados y categorías lanzadas en este worker
+    (DELETE .../eliminar/{id}?asincrono=true), de la más reciente a la más antigua.
+    """
+    return [purga.resumen() for purga in reversed(list(purgas.values()))]
+
+
+@router.get("/{id}", summary="Avance de una purga asíncrona")
+async def obtener_purga(id: str):
+    """
+    Productos y listas borrados hasta ahora, el porcentaje completado y el estado de una purga.
+    - **id**: El ID devuelto al lanzar la purga.
+    """
+    purga = purgas.get(id)
+    if purga is None:
+        raise NotFoundException(detail="Purga no encontrada")
+    return purga.resumen()
@@ -1,42 +1,45 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app import models, schemas
+from app.cache import cache_categorias
+from app.borrado import borrado_terminado, borrar, iniciar_purga, quitar_de_indices
+from app.condicional import CACHE_CONTROL, condicional, incrementar_version
 from app.exceptions import NotFoundException
+from app.paginacion import Paginacion, listar
+from app.respuestas import RespuestaJSON
 
 router = APIRouter(
     prefix="/categorias",  # Prefijo en las rutas de categoria
     tags=["Categorías"],  # Esta etiqueta agrupa las rutas en Swagger UI
 )
 
-@router.get("/", summary="Obtener todas las categorías", description="Obtiene la lista de todas las categorías registradas en el sistema.")
-def obtener_categorias(db:Session=Depends(get_db)):
-    data = db.query(models.Categoria).all()
-
+@router.get("/", dependencies=[Depends(condicional("categoria", cache_control=CACHE_CONTROL["categorias"]))], summary="Obtener todas las categorías", description="Obtiene la lista de todas las categorías registradas en el sistema.")
+async def obtener_categorias(response: Response, pagina: Paginacion = Depends(), db:AsyncSession=Depends(get_db)):
     # Construimos la respuesta con detalles de la categoría
-    resultado = [
-        {
-            "id": item.id,
-            "nombre": item.nombre,
-            "pasillo": item.pasillo,
-        }
-        for item in data
-    ]
-
-    return resultado 
-
-
-@router.get("/buscar/{id}", response_model=schemas.Categoria, summary="Buscar categoría")
-def obtener_categoria(id: int, db: Session = Depends(get_db)):
+    return await listar(
+        db,
+        select(models.Categoria),
+        [models.Categoria.id],
+        lambda item: [item.id],
+        lambda item: {"id": item.id, "nombre": item.nombre, "pasillo": item.pasillo},
+        pagina,
+        response,
+    )
+
+
+@router.get("/buscar/{id}", dependencies=[Depends(condicional("categoria", cache_control=CACHE_CONTROL["categorias"]))], response_model=schemas.Categoria, summary="Buscar categoría")
+async def obtener_categoria(id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtiene una categoría por su ID.
     - **id**: El ID de la categoría a buscar.
     """
-    return db.query(models.Categoria).filter(models.Categoria.id == id).first()
+    return await db.get(models.Categoria, id)
 
 
 @router.post("/nueva", summary="Crear una nueva categoría")
-def crear_categoria(categoria: schemas.Categoria, db: Session = Depends(get_db)):
+async def crear_categoria(categoria: schemas.Categoria, db: AsyncSession = Depends(get_db)):
     """
     Crea una nueva categoría en el sistema.
     - **nombre**: Nombre de la categoría.
@@ -44,20 +47,22 @@ def crear_categoria(categoria: schemas.Categoria, db: Session = Depends(get_db))
     """
     nueva_categoria = models.Categoria(nombre=categoria.nombre, pasillo=categoria.pasillo)
     db.add(nueva_categoria)
-    db.commit()
-    db.refresh(nueva_categoria)
+    await db.commit()
+    await db.refresh(nueva_categoria)
+    cache_categorias.invalidar()
+    incrementar_version("categoria")
     return{"Respuesta": "Categoría creada"}
 
 
 @router.put("/actualizar/{id}", summary="Actualizar una categoría")
-def actualizar_categoria(id: int, categoria: schemas.Categoria, db: Session = Depends(get_db)):
+async def actualizar_categoria(id: int, categoria: schemas.Categoria, db: AsyncSession = Depends(get_db)):
     """
     Actualiza una categoría por su ID.
     - **id**: ID de la categoría a actualizar.
     - **nombre**: Nuevo nombre de la categoría.
     - **pasillo**: Nuevo número de pasillo.
     """
-    categoria = db.query(models.Categoria).filter(models.Categoria.id == id).first()
+    categoria = await db.get(models.Categoria, id)
 
     if categoria is None:
         raise NotFoundException(detail="Categoría no encontrada")
@@ -65,24 +70,35 @@ def actualizar_categoria(id: int, categoria: schemas.Categoria, db: Session = De
     categoria.nombre = categoria.nombre
     categoria.pasillo = categoria.pasillo
 
-    db.commit()
-    db.refresh(categoria)
+    await db.commit()
+    await db.refresh(categoria)
+    cache_categorias.invalidar()
+    incrementar_version("categoria")
 
     return {"mensaje": "Categoría actualizada con éxito"}
 
 
 @router.delete("/eliminar/{id}", summary="Eliminar una categoría")
-def eliminar_categoria(id: int, db: Session = Depends(get_db)):
+async def eliminar_categoria(id: int, asincrono: bool = False, db: AsyncSession = Depends(get_db)):
     """
-    Elimina una categoría por su ID.
+    Elimina una categoría por su ID, con sus productos.
     - **id**: ID de la categoría a eliminar.
+    - **asincrono**: Si es true, borra por lotes en segundo plano y responde al momento
+      con el estado de la purga (su avance se consulta en /borrados/{id}).
     """
-    categoria = db.query(models.Categoria).filter(models.Categoria.id == id).first()
-
-    if categoria is None:
+    if asincrono:
+        purga = await iniciar_purga(db, "categoria", id)
+        if purga is None:
+            raise NotFoundException(detail="Categoría no encontrada")
+        return RespuestaJSON(purga.resumen(), status_code=202)
+
+    eliminados = (await db.execute(
+        select(models.Producto.id, models.Producto.nombre, models.Producto.precio).where(models.Producto.categoria_id == id)
+    )).all()
+    if not await borrar(db, "categoria", id):
         raise NotFoundException(detail="Categoría no encontrada")
-
-    db.delete(categoria)
-    db.commit()
+    await db.commit()
+    borrado_terminado("categoria")
+    quitar_de_indices(eliminados)
 
     return {"mensaje": "Categoría eliminada con éxito"}
\ No newline at end of file
@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+from app.cache import cache_categorias, cache_credenciales, cache_supermercados, cache_usuarios
+from app.db.database import async_engine, engine, estadisticas_pool, replica_engine
+from app.sesiones import sesiones
+
+router = APIRouter(
+    prefix="/internal",  # Prefijo en las rutas internas de diagnóstico
+    tags=["Interno"],  # Esta etiqueta agrupa las rutas en Swagger UI
+)
+
+@router.get("/pool", summary="Estado del pool de conexiones")
+async def obtener_estado_pool():
+    """
+    Conexiones en uso, libres y de overflow de cada motor, junto con el
+    histograma de tiempos de espera para obtener una conexión.
+    """
+    estado = {
+        "async": estadisticas_pool["async"].resumen(async_engine.pool),
+        "sync": estadisticas_pool["sync"].resumen(engine.pool),
+    }
+    if replica_engine is not None:
+        estado["replica"] = estadisticas_pool["replica"].resumen(replica_engine.pool)
+    return estado
+
+
+@router.get("/cache", summary="Aciertos y fallos de las cachés de nombres")
+async def obtener_estado_cache():
+    """
+    Estado de las cachés nombre -> id de supermercados, categorías y usuarios
+    y de las cachés de credenciales verificadas en el login y de tokens de sesión.
+    """
+    return {
+        "supermercados": cache_supermercados.estadisticas(),
+        "categorias": cache_categorias.estadisticas(),
+        "usuarios": cache_usuarios.estadisticas(),
+        "credenciales": cache_credenciales.estadisticas(),
+        "sesiones": sesiones.estadisticas(),
+    }
@@ -1,106 +1,159 @@
 from datetime import datetime
+from typing import List, Optional
 from http.client import HTTPException
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app import models, schemas
-from app.exceptions import NotFoundException
+from app.cache import cache_supermercados, cache_usuarios
+from app.condicional import incrementar_version
+from app.db.totales import sumar_a_lista
+from app.borrado import borrar_listas
+from app.consultas import consulta_filas_productos_lista, consulta_listas_compra, lista_compra_a_dict
+from app.paginacion import Paginacion, listar
+from app.exceptions import BadRequestException, NotFoundException
+from app.indices.precios import MAXIMO_TIENDAS, MatrizPrecios, matriz_precios
+from app.indices.refresco import refresco_matriz
+from app.respuestas import respuesta_json, serializador_filas
+from app.sesiones import usuario_opcional
 
 router = APIRouter(
     prefix="/listas_compra",  # Prefijo en las rutas de listas de compra
     tags=["Listas de Compra"],  # Esta etiqueta agrupa las rutas en Swagger UI
 )
 
-@router.get("/")
-def obtener_listas_compra(db:Session=Depends(get_db)):
-    data = db.query(models.ListaCompra).all()
+# Productos de una lista en el detalle de la lista y en /{id}/productos
+fila_producto_lista = serializador_filas(["producto", "cantidad", "precio"])
+fila_producto_de_lista = serializador_filas(["id", "nombre", "cantidad", "precio"])
 
-    # Construimos la respuesta con detalles de la lista
-    resultado = [
-        {
-            "id": item.id,
-            "usuario": item.usuario.nombre,
-            "fecha": item.fecha_creacion.strftime('%d-%m-%Y'),
-            "supermercado": item.supermercado.nombre,
-            "productos": len(item.productos),
-        }
-        for item in data
-    ]
 
-    return resultado 
+@router.get("/")
+async def obtener_listas_compra(response: Response, pagina: Paginacion = Depends(), db:AsyncSession=Depends(get_db)):
+    """
+    Obtiene las listas de la compra paginadas por id.
+    - **limit**: Número máximo de listas (sin él se devuelven todas).
+    - **after**: Cursor de la página anterior.
+    - **formato**: "json" o "ndjson".
+    """
+    # Construimos la respuesta con detalles de la lista
+    return await listar(
+        db,
+        consulta_listas_compra(),
+        [models.ListaCompra.id],
+        lambda item: [item.id],
+        lista_compra_a_dict,
+        pagina,
+        response,
+    )
 
 
 @router.get("/{id}", response_model=schemas.ListaCompraResponse, summary="Obtener lista de la compra por id")
-def obtener_lista_compra(id: int, db: Session = Depends(get_db)):
+async def obtener_lista_compra(id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtiene una lista de compra por su ID.
     - **id**: El ID de la lista de compra.
     """
-    lista_compra = db.query(models.ListaCompra).filter(models.ListaCompra.id == id).first()
+    lista_compra = await db.get(models.ListaCompra, id)
     if not lista_compra:
         return {"message": "Lista de compra no encontrada"}
 
-    productos_lista = db.query(models.ProductoLista).filter(models.ProductoLista.lista_compra_id == id).all()
-    
-    lista_compra_response = schemas.ListaCompraResponse(
-        id=lista_compra.id,
-        fecha_creacion=lista_compra.fecha_creacion,
-        productos=[schemas.ProductoLista(
-            producto=producto.producto.nombre,
-            cantidad=producto.cantidad,
-            precio=producto.precio
-        ) for producto in productos_lista]
-    )
-    return lista_compra_response
+    productos_lista = (await db.execute(consulta_filas_productos_lista(id))).all()
+
+    # Se devuelve ya serializada con la forma de ListaCompraResponse, que queda para la documentación
+    return respuesta_json({
+        "id": lista_compra.id,
+        "fecha_creacion": lista_compra.fecha_creacion,
+        "total": lista_compra.total,
+        "productos": [fila_producto_lista(fila[1:]) for fila in productos_lista],
+    })
 
 
 @router.get("/{id}/productos", summary="Buscar productos de una lista")
-def obtener_productos_lista(id: int, db: Session = Depends(get_db)):
-    productos_lista = (
-        db.query(models.ProductoLista)
-        .filter(models.ProductoLista.lista_compra_id == id)
-        .all()
-    )
-    
+async def obtener_productos_lista(id: int, db: AsyncSession = Depends(get_db)):
+    productos_lista = (await db.execute(consulta_filas_productos_lista(id))).all()
+
     # Construimos la respuesta con detalles del producto
-    resultado = [
-        {
-            "id": item.producto.id,
-            "nombre": item.producto.nombre,
-            "cantidad": item.cantidad,
-            "precio": item.precio
-        }
-        for item in productos_lista
-    ]
+    resultado = [fila_producto_de_lista(item) for item in productos_lista]
 
-    return resultado
+    return respuesta_json(resultado)
+
+
+@router.get("/{id}/comparar", summary="Comparar el coste de una lista en todos los supermercados")
+async def comparar_lista_compra(id: int, tiendas: int = Query(1, ge=1, le=MAXIMO_TIENDAS), db: AsyncSession = Depends(get_db)):
+    """
+    Calcula cuánto costaría la lista en cada supermercado, comparando los productos
+    por nombre, y el reparto más barato comprando en varios supermercados.
+    - **id**: ID de la lista de compra.
+    - **tiendas**: Número máximo de supermercados entre los que repartir la compra.
+
+    Los supermercados se ordenan por productos que les faltan y por total.
+    """
+    lista_compra = await db.get(models.ListaCompra, id)
+    if not lista_compra:
+        raise NotFoundException(detail="Lista de compra no encontrada")
+
+    articulos = [(nombre, cantidad) for _, nombre, cantidad, _ in (await db.execute(consulta_filas_productos_lista(id))).all()]
+    if any(cantidad < 1 for _, cantidad in articulos):
+        raise BadRequestException(detail="La lista tiene productos con cantidad menor que 1")
+
+    # Sin la matriz en memoria, o si ha caducado, se construye una solo con los productos de la lista
+    matriz = matriz_precios
+    if not matriz.activo or not refresco_matriz.vigente():
+        matriz = MatrizPrecios()
+        matriz.reconstruir((await db.execute(
+            select(models.Producto.id, models.Producto.nombre, models.Producto.precio, models.Producto.supermercado_id)
+            .where(models.Producto.nombre.in_({nombre for nombre, _ in articulos}))
+        )).all())
+
+    resultado = matriz.comparar(articulos, tiendas)
+
+    # Nombres de los supermercados que aparecen en la respuesta
+    ids = {supermercado["supermercado_id"] for supermercado in resultado["supermercados"]}
+    nombres = dict((await db.execute(
+        select(models.Supermercado.id, models.Supermercado.nombre).where(models.Supermercado.id.in_(ids))
+    )).all()) if ids else {}
+    for supermercado in resultado["supermercados"] + (resultado["reparto"]["tiendas"] if resultado["reparto"] else []):
+        supermercado["supermercado"] = nombres.get(supermercado["supermercado_id"])
+
+    # Ahorro del reparto frente a comprar todo en el supermercado de la lista
+    actual = next((supermercado for supermercado in resultado["supermercados"]
+                   if supermercado["supermercado_id"] == lista_compra.supermercado_id and not supermercado["faltan"]), None)
+    if resultado["reparto"] and actual and not resultado["reparto"]["faltan"]:
+        resultado["reparto"]["ahorro"] = round(actual["total"] - resultado["reparto"]["total"], 2)
+
+    return respuesta_json({
+        "lista_compra_id": lista_compra.id,
+        "supermercado_id": lista_compra.supermercado_id,
+        **resultado,
+    })
 
 
 @router.post("/nueva", summary="Crear nueva lista")
-def crear_lista_compra(lista_compra: schemas.ListaCompraRespNueva, db: Session = Depends(get_db)):
+async def crear_lista_compra(lista_compra: schemas.ListaCompraRespNueva, usuario_sesion: Optional[int] = Depends(usuario_opcional), db: AsyncSession = Depends(get_db)):
     """
     Crea una nueva lista de compra.
     - **supermercado**: El nombre del supermercado donde se compra.
-    - **usuario**: El nombre de la lista de compra.
+    - **usuario**: El nombre del usuario. No hace falta si se envía el token de sesión,
+      que tiene preferencia.
     """
 
     # Buscar el supermercado por nombre
     if lista_compra.supermercado:
-        supermercado_db = db.query(models.Supermercado).filter(models.Supermercado.nombre == lista_compra.supermercado).first()
-        if supermercado_db:
-            supermercado_id = supermercado_db.id
-        else:
+        supermercado_id = await cache_supermercados.resolver(db, lista_compra.supermercado, comprobar=True)
+        if supermercado_id is None:
             raise NotFoundException(detail="Supermercado no encontrado")
     else:
         raise NotFoundException(detail="El supermercado es obligatorio")
-    
-
-    # Buscar el usuario por nombre
-    if lista_compra.usuario:
-        usuario_db = db.query(models.Usuario).filter(models.Usuario.nombre == lista_compra.usuario).first()
-        if usuario_db:
-            usuario_id = usuario_db.id
-        else:
+
+
+    # El usuario de la sesión ya viene resuelto; si no, se busca por nombre
+    if usuario_sesion is not None:
+        usuario_id = usuario_sesion
+    elif lista_compra.usuario:
+        usuario_id = await cache_usuarios.resolver(db, lista_compra.usuario)
+        if usuario_id is None:
             raise NotFoundException(detail="Usuario no encontrado")
     else:
         raise NotFoundException(detail="El usuario es obligatorio")
@@ -112,38 +165,38 @@ def crear_lista_compra(lista_compra: schemas.ListaCompraRespNueva, db: Session =
         fecha_creacion=datetime.now()
     )
     db.add(db_lista_compra)
-    db.commit()
-    db.refresh(db_lista_compra)
+    await db.commit()
+    incrementar_version("lista_compra")
 
     return {"mensaje": "Lista de la compra creada exitosamente"}
 
 
 @router.post("/{lista_compra_id}/producto", summary="Agregar un producto a una lista de compra")
-def agregar_producto_a_lista(lista_compra_id: int, nombre_producto: str, cantidad: int, db: Session = Depends(get_db)):
+async def agregar_producto_a_lista(lista_compra_id: int, nombre_producto: str, cantidad: int, db: AsyncSession = Depends(get_db)):
     """
     Agrega un producto a una lista de compra existente usando el nombre del producto.
     - **lista_compra_id**: ID de la lista de compra a la que se agregará el producto.
     - **nombre_producto**: Nombre del producto a agregar.
     - **cantidad**: Cantidad del producto.
     """
-    
+
     # Buscar la lista de compra
-    lista_compra = db.query(models.ListaCompra).filter(models.ListaCompra.id == lista_compra_id).first()
+    lista_compra = await db.get(models.ListaCompra, lista_compra_id)
 
     if not lista_compra:
         raise NotFoundException(detail="Lista de compra no encontrada")
 
     # Obtener el producto por nombre
-    producto = db.query(models.Producto).filter(models.Producto.nombre == nombre_producto).first()
+    producto = (await db.execute(select(models.Producto).where(models.Producto.nombre == nombre_producto))).scalars().first()
 
     if not producto:
         raise NotFoundException(detail="Producto no encontrado")
 
     # Verificar si el producto ya está en la lista de compra
-    producto_lista = db.query(models.ProductoLista).filter(
+    producto_lista = (await db.execute(select(models.ProductoLista).where(
         models.ProductoLista.lista_compra_id == lista_compra_id,
         models.ProductoLista.producto_id == producto.id  # Usar el ID del producto obtenido
-    ).first()
+    ))).scalars().first()
 
     if producto_lista:
         raise NotFoundException(detail="El producto ya está en la lista de compra")
@@ -159,31 +212,127 @@ def agregar_producto_a_lista(lista_compra_id: int, nombre_producto: str, cantida
         precio=precio*cantidad
     )
 
-    db.add(nuevo_producto_lista)
-    db.commit()
-    db.refresh(nuevo_producto_lista)  # Actualizar el objeto para reflejar los datos de la base de datos
-    
+    try:
+        db.add(nuevo_producto_lista)
+        await db.execute(sumar_a_lista(lista_compra_id, 1, nuevo_producto_lista.precio))
+        await db.commit()
+    except IntegrityError:
+        # Otra petición ha agregado este producto a la lista a la vez
+        await db.rollback()
+        raise BadRequestException(detail="La lista de compra ha cambiado, vuelve a intentarlo")
+    await db.refresh(nuevo_producto_lista)  # Actualizar el objeto para reflejar los datos de la base de datos
+    incrementar_version("lista_compra")
+
     return {"message": "Producto agregado a la lista de compra"}
 
 
 
+@router.post("/{lista_compra_id}/productos", summary="Agregar varios productos a una lista de compra")
+async def agregar_productos_a_lista(lista_compra_id: int, productos: List[schemas.ProductoListaNuevo], db: AsyncSession = Depends(get_db)):
+    """
+    Agrega varios productos a una lista de compra existente en una sola transacción.
+    - **lista_compra_id**: ID de la lista de compra.
+    - **productos**: Lista de objetos con **nombre_producto** y **cantidad**.
+
+    Devuelve el estado de cada producto: "agregado", "no encontrado" o "ya en la lista".
+    """
+
+    # Buscar la lista de compra
+    lista_compra = await db.get(models.ListaCompra, lista_compra_id)
+
+    if not lista_compra:
+        raise NotFoundException(detail="Lista de compra no encontrada")
+
+    # Obtener todos los productos por nombre en una consulta (el primero de cada nombre)
+    nombres = {item.nombre_producto for item in productos}
+    encontrados = {}
+    resultado = await db.execute(
+        select(models.Producto.nombre, models.Producto.id, models.Producto.precio)
+        .where(models.Producto.nombre.in_(nombres))
+        .order_by(models.Producto.id)
+    )
+    for nombre, id, precio in resultado:
+        encontrados.setdefault(nombre, (id, precio))
+
+    # Productos que ya están en la lista de compra
+    en_lista = set((await db.execute(select(models.ProductoLista.producto_id).where(
+        models.ProductoLista.lista_compra_id == lista_compra_id,
+        models.ProductoLista.producto_id.in_([id for id, _ in encontrados.values()])
+    ))).scalars())
+
+    estados = []
+    nuevos = []
+    for item in productos:
+        if item.nombre_producto not in encontrados:
+            estados.append({"producto": item.nombre_producto, "estado": "no encontrado"})
+            continue
+
+        producto_id, precio = encontrados[item.nombre_producto]
+        if producto_id in en_lista:
+            estados.append({"producto": item.nombre_producto, "estado": "ya en la lista"})
+            continue
+
+        en_lista.add(producto_id)
+        nuevos.append({
+            "lista_compra_id": lista_compra_id,
+            "producto_id": producto_id,
+            "cantidad": item.cantidad,
+            "precio": precio*item.cantidad,
+        })
+        estados.append({"producto": item.nombre_producto, "estado": "agregado"})
+
+    # Agregar todos los productos nuevos en una sola sentencia
+    if nuevos:
+        try:
+            await db.execute(insert(models.ProductoLista), nuevos)
+            await db.execute(sumar_a_lista(lista_compra_id, len(nuevos), sum(nuevo["precio"] for nuevo in nuevos)))
+            await db.commit()
+        except IntegrityError:
+            # Otra petición ha agregado alguno de estos productos a la vez
+            await db.rollback()
+            raise BadRequestException(detail="La lista de compra ha cambiado, vuelve a intentarlo")
+        incrementar_version("lista_compra")
+
+    return {"agregados": len(nuevos), "productos": estados}
+
+
+@router.delete("/{lista_compra_id}/producto/{producto_id}", summary="Quitar un producto de una lista de compra")
+async def quitar_producto_de_lista(lista_compra_id: int, producto_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Quita un producto de una lista de compra.
+    - **lista_compra_id**: ID de la lista de compra.
+    - **producto_id**: ID del producto a quitar.
+    """
+    producto_lista = (await db.execute(select(models.ProductoLista).where(
+        models.ProductoLista.lista_compra_id == lista_compra_id,
+        models.ProductoLista.producto_id == producto_id
+    ))).scalars().first()
+
+    if not producto_lista:
+        raise NotFoundException(detail="El producto no está en la lista de compra")
+
+    await db.delete(producto_lista)
+    await db.execute(sumar_a_lista(lista_compra_id, -1, -producto_lista.precio))
+    await db.commit()
+    incrementar_version("lista_compra")
+
+    return {"mensaje": "Producto quitado de la lista de compra"}
+
+
 @router.delete("/eliminar/{id}", summary="Eliminar una lista de compra")
-def eliminar_lista_compra(id: int, db: Session = Depends(get_db)):
+async def eliminar_lista_compra(id: int, db: AsyncSession = Depends(get_db)):
     """
     Elimina una lista de compra por su ID.
     - **lista_compra_id**: ID de la lista de compra a eliminar.
     """
-    lista_compra = db.query(models.ListaCompra).filter(models.ListaCompra.id == id).first()
+    lista_compra = await db.get(models.ListaCompra, id)
 
     if not lista_compra:
         return {"message": "Lista de compra no encontrada"}
 
-    # Eliminar los productos de la lista
-    db.query(models.ProductoLista).filter(models.ProductoLista.lista_compra_id == id).delete()
-
-    # Eliminar la lista de compra
-    db.delete(lista_compra)
-    db.commit()
+    # Eliminar la lista de compra con sus productos
+    await borrar_listas(db, [id])
+    await db.commit()
+    incrementar_version("lista_compra")
 
     return {"mensaje": "Lista de compra eliminada con éxito"}
-
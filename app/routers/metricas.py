@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metricas import exportar
+
+router = APIRouter(
+    tags=["Métricas"],  # Esta etiqueta agrupa las rutas en Swagger UI
+)
+
+@router.get("/metrics", response_class=PlainTextResponse, summary="Métricas en formato Prometheus")
+async def obtener_metricas():
+    """
+    Latencia, tamaño de respuesta, códigos de estado, sentencias SQL y tiempo en la
+    base de datos por ruta, y peticiones en curso. Son del worker que responde.
+    """
+    return PlainTextResponse(exportar(), media_type="text/plain; version=0.0.4; charset=utf-8")
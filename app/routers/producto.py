@@ -1,38 +1,80 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import Numeric, case, cast, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app import schemas
-from app.exceptions import NotFoundException
-from app.schemas import Producto, Supermercado, Categoria
+from app.exceptions import BadRequestException, NotFoundException
 from app.db.database import get_db
 from app import models
+from app.cache import cache_categorias, cache_supermercados
+from app.condicional import CACHE_CONTROL, condicional, incrementar_version
+from app.db.historial import AGRUPACIONES, consulta_historial, consulta_precio_anterior, consulta_serie, filas_historial
+from app.borrado import borrar_productos, quitar_de_indices
+from app.consultas import columna_orden_producto, consulta_filas_productos, fila_producto_a_dict, productos_por_ids
+from app.indices import ordenados
+from app.indices.autocompletar import indice_autocompletar
+from app.indices.ordenados import indices_ordenados
+from app.indices.precios import matriz_precios
+from app.indices.refresco import refresco_autocompletar, refresco_ordenados
+from app.importacion import ImportacionProductos, leer_filas, leer_lineas
+from app.paginacion import Paginacion, codificar_cursor, decodificar_cursor, listar
+from app.respuestas import respuesta_json, serializador_filas
 
 router = APIRouter(
     prefix="/productos",
     tags=["Productos"]
 )
 
-@router.get("/")
-def obtener_productos(db:Session=Depends(get_db)):
-    data = db.query(models.Producto).all()
+# Respuesta de /productos/buscar (la clave de la categoría va sin tilde)
+fila_producto_buscar = serializador_filas(["id", "nombre", "precio", "pasillo", "categoria", "supermercado"])
 
-    # Construimos la respuesta con detalles del producto
-    resultado = [
-        {
-            "id": item.id,
-            "nombre": item.nombre,
-            "precio": item.precio,
-            "pasillo": item.categoria.pasillo,
-            "categoría": item.categoria.nombre,
-            "supermercado": item.supermercado.nombre,
-        }
-        for item in data
-    ]
+# Puntos de GET /productos/{id}/historial, agrupados o sin agrupar
+fila_serie = serializador_filas(["fecha", "minimo", "maximo", "ultimo", "cambios"])
+fila_historial = serializador_filas(["fecha", "precio"])
 
-    return resultado 
+# Productos devueltos por PUT /productos/actualizar-precios
+fila_precio_actualizado = serializador_filas(["id", "nombre", "precio", "supermercado_id"])
 
+# Los listados de productos incluyen el nombre de la categoría y del supermercado
+catalogo_condicional = Depends(condicional("producto", "categoria", "supermercado", cache_control=CACHE_CONTROL["productos"]))
 
-@router.get("/buscar", summary="Buscar productos con un filtro")
-def obtener_productos_filtro(supermercado_id: int, categoria_id: int, db: Session = Depends(get_db)):
+@router.get("/", dependencies=[catalogo_condicional])
+async def obtener_productos(response: Response, pagina: Paginacion = Depends(), db:AsyncSession=Depends(get_db)):
+    """
+    Obtiene los productos paginados por id.
+    - **limit**: Número máximo de productos (sin él se devuelven todos).
+    - **after**: Cursor de la página anterior.
+    - **formato**: "json" o "ndjson".
+    """
+    return await listar(
+        db,
+        consulta_filas_productos(),
+        [models.Producto.id],
+        lambda item: [item.id],
+        fila_producto_a_dict,
+        pagina,
+        response,
+    )
+
+
+@router.get("/autocompletar", summary="Autocompletar nombres de productos")
+async def autocompletar_productos(q: str, limite: int = Query(10, ge=1, le=100)):
+    """
+    Sugiere nombres de productos mientras se escribe, sin distinguir mayúsculas ni tildes.
+    - **q**: Texto escrito; cada palabra debe ser el principio de una palabra del nombre.
+    - **limite**: Número máximo de sugerencias.
+
+    Devuelve cada nombre con el número de productos (supermercados) que lo tienen.
+    """
+    # Si el índice ha caducado se reconstruye en segundo plano y mientras tanto se usa el anterior
+    refresco_autocompletar.vigente()
+    return indice_autocompletar.buscar(q, limite)
+
+
+@router.get("/buscar", dependencies=[catalogo_condicional], summary="Buscar productos con un filtro")
+async def obtener_productos_filtro(response: Response, supermercado_id: int, categoria_id: int, db: AsyncSession = Depends(get_db)):
 
     """
     Buscar poroductos filtrando por supermercado y categoría.
@@ -40,89 +82,136 @@ def obtener_productos_filtro(supermercado_id: int, categoria_id: int, db: Sessio
     - **categoria_id**: Id de la categoría.
     """
 
-    # Realizar la consulta que incluye la relación con la categoría
-    productos = db.query(models.Producto).join(models.Categoria).filter(
+    # Realizar la consulta que incluye la categoría y el supermercado
+    productos = (await db.execute(consulta_filas_productos().where(
         models.Producto.supermercado_id == supermercado_id,
         models.Producto.categoria_id == categoria_id
-    ).all()
+    ))).all()
 
     # Transformar los productos para incluir el nombre y pasillo de la categoría
-    resultado = []
-    for producto in productos:
-        categoria = db.query(models.Categoria).filter(models.Categoria.id == producto.categoria_id).first()
-        resultado.append({
-            "id": producto.id,
-            "nombre": producto.nombre,
-            "precio": producto.precio,
-            "pasillo": categoria.pasillo,
-            "categoria": categoria.nombre,
-            "supermercado": producto.supermercado.nombre
-        })
-    
-    return resultado
-
-
-@router.get("/ordenados", summary="Obtener productos ordenados")
-def obtener_productos_ordenados(orden: str = "nombre", db: Session = Depends(get_db)):
+    resultado = [fila_producto_buscar(producto) for producto in productos]
+
+    return respuesta_json(resultado, response)
+
+
+@router.get("/ordenados", dependencies=[catalogo_condicional], summary="Obtener productos ordenados")
+async def obtener_productos_ordenados(response: Response, orden: str = "nombre", pagina: Paginacion = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Obtiene todos los productos ordenados.
     - **orden**: Puede ser "nombre" o "precio".
+    - **limit**: Número máximo de productos (sin él se devuelven todos).
+    - **after**: Cursor de la página anterior, válido solo para el mismo orden.
+    - **formato**: "json" o "ndjson".
     """
     if orden not in ["nombre", "precio"]:
         return {"error": "Parámetro de orden inválido. Usa 'nombre' o 'precio'."}
 
-    productos = db.query(models.Producto).order_by(getattr(models.Producto, orden)).all()
-
-    # Construimos la respuesta con detalles del producto
-    resultado = [
-        {
-            "id": item.id,
-            "nombre": item.nombre,
-            "precio": item.precio,
-            "pasillo": item.categoria.pasillo,
-            "categoría": item.categoria.nombre,
-            "supermercado": item.supermercado.nombre,
-        }
-        for item in productos
-    ]
-
-    return resultado
+    # Las páginas se sacan del índice en memoria si está activo y no ha caducado;
+    # los listados completos y el streaming siguen yendo a la base de datos
+    if indices_ordenados.activo and pagina.limit is not None and pagina.formato == "json" and refresco_ordenados.vigente():
+        despues = decodificar_cursor(pagina.after, 2) if pagina.after else None
+        try:
+            ids = getattr(indices_ordenados, orden).pagina(despues, pagina.limit + 1)
+        except TypeError:
+            raise BadRequestException(detail="Cursor inválido")
+        productos = await productos_por_ids(db, ids[:pagina.limit])
+        if len(ids) > pagina.limit and productos:
+            response.headers["X-Siguiente-Cursor"] = codificar_cursor([getattr(productos[-1], orden), productos[-1].id])
+        return respuesta_json([fila_producto_a_dict(item) for item in productos], response)
+
+    return await listar(
+        db,
+        consulta_filas_productos(),
+        [columna_orden_producto(db, orden), models.Producto.id],
+        lambda item: [getattr(item, orden), item.id],
+        fila_producto_a_dict,
+        pagina,
+        response,
+    )
 
 
-@router.get("/filtrar/precio", summary="Filtrar productos por precio")
-def filtrar_productos_por_precio(min_precio: float, max_precio: float, db: Session = Depends(get_db)):
+@router.get("/filtrar/precio", dependencies=[catalogo_condicional], summary="Filtrar productos por precio")
+async def filtrar_productos_por_precio(response: Response, min_precio: float, max_precio: float, db: AsyncSession = Depends(get_db)):
     """
     Filtra productos dentro de un rango de precios.
     - **min_precio**: Precio mínimo.
     - **max_precio**: Precio máximo.
     """
-    productos = db.query(models.Producto).filter(
-        models.Producto.precio >= min_precio,
-        models.Producto.precio <= max_precio
-    ).all()
+    en_rango = models.Producto.precio.between(min_precio, max_precio)
+    ids = indices_ordenados.precio.rango(min_precio, max_precio) if indices_ordenados.activo and refresco_ordenados.vigente() else None
+    if ids is not None and len(ids) <= ordenados.MAXIMO_IDS:
+        # Con el índice en memoria solo se cargan los productos del rango. El rango se vuelve
+        # a comprobar en la base de datos y se reordena por si otro worker ha cambiado algún
+        # precio desde la última reconstrucción (ver app/indices/refresco.py).
+        productos = sorted(await productos_por_ids(db, ids, en_rango), key=lambda item: (item.precio, item.id))
+    else:
+        productos = (await db.execute(
+            consulta_filas_productos().where(en_rango).order_by(models.Producto.precio, models.Producto.id)
+        )).all()
 
     if not productos:
         return {"error": "No se encontraron productos en ese rango de precios"}
 
 
     # Construimos la respuesta con detalles del producto
-    resultado = [
-        {
-            "id": item.id,
-            "nombre": item.nombre,
-            "precio": item.precio,
-            "pasillo": item.categoria.pasillo,
-            "categoría": item.categoria.nombre,
-            "supermercado": item.supermercado.nombre,
-        }
-        for item in productos
-    ]
+    resultado = [fila_producto_a_dict(item) for item in productos]
 
-    return resultado
+    return respuesta_json(resultado, response)
+
+
+@router.get("/{id}/historial", dependencies=[Depends(condicional("producto", cache_control=CACHE_CONTROL["productos"]))], summary="Historial de precios de un producto")
+async def historial_precio_producto(
+    response: Response,
+    id: int,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    agrupar: str = "dia",
+    limite: int = Query(10000, ge=1, le=100000),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Obtiene la serie de precios de un producto en un intervalo de fechas (UTC).
+    - **desde** / **hasta**: Intervalo de fechas; sin ellos, todo el historial.
+    - **agrupar**: "hora", "dia", "semana" o "mes" para un punto por intervalo con el precio
+      mínimo, el máximo, el último y el número de cambios; "ninguno" para todos los cambios.
+    - **limite**: Número máximo de puntos sin agrupar.
+
+    **precio_inicial** es el precio vigente al empezar el intervalo.
+    """
+    if agrupar != "ninguno" and agrupar not in AGRUPACIONES:
+        raise BadRequestException(detail="Agrupación inválida. Usa 'ninguno', 'hora', 'dia', 'semana' o 'mes'.")
+
+    # Las fechas del historial se guardan en UTC sin zona horaria
+    desde, hasta = (
+        fecha.astimezone(timezone.utc).replace(tzinfo=None) if fecha is not None and fecha.tzinfo else fecha
+        for fecha in (desde, hasta)
+    )
+    if desde is not None and hasta is not None and desde > hasta:
+        raise BadRequestException(detail="La fecha desde no puede ser posterior a hasta")
+
+    if agrupar == "ninguno":
+        puntos = [fila_historial(fila) for fila in await db.execute(consulta_historial(id, desde, hasta, limite))]
+    else:
+        consulta = consulta_serie(id, desde, hasta, agrupar, db.get_bind().dialect.name)
+        puntos = [fila_serie(fila) for fila in await db.execute(consulta)]
+    precio_inicial = (await db.execute(consulta_precio_anterior(id, desde))).scalar() if desde is not None else None
+
+    # El historial se conserva al borrar el producto: solo es 404 si no hay nada
+    if not puntos and precio_inicial is None and await db.get(models.Producto, id) is None:
+        raise NotFoundException(detail="Producto no encontrado")
+
+    return respuesta_json({
+        "producto_id": id,
+        "agrupar": agrupar,
+        "desde": desde,
+        "hasta": hasta,
+        "precio_inicial": precio_inicial,
+        "puntos": puntos,
+    }, response)
 
 
 @router.post("/nuevo", summary="Crear un nuevo producto")
-def crear_producto(producto: schemas.ProductoResponse, db: Session = Depends(get_db)):
+async def crear_producto(producto: schemas.ProductoResponse, db: AsyncSession = Depends(get_db)):
     """
     Crea un nuevo producto en el sistema.
     - **nombre**: Nombre del producto.
@@ -133,20 +222,16 @@ def crear_producto(producto: schemas.ProductoResponse, db: Session = Depends(get
 
     # Buscar el supermercado por nombre
     if producto.supermercado:
-        supermercado_db = db.query(models.Supermercado).filter(models.Supermercado.nombre == producto.supermercado).first()
-        if supermercado_db:
-            supermercado_id = supermercado_db.id
-        else:
+        supermercado_id = await cache_supermercados.resolver(db, producto.supermercado, comprobar=True)
+        if supermercado_id is None:
             raise NotFoundException(detail="Supermercado no encontrado")
     else:
         raise NotFoundException(detail="El supermercado es obligatorio")
 
     # Buscar la categoría por nombre
     if producto.categoria:
-        categoria_db = db.query(models.Categoria).filter(models.Categoria.nombre == producto.categoria).first()
-        if categoria_db:
-            categoria_id = categoria_db.id
-        else:
+        categoria_id = await cache_categorias.resolver(db, producto.categoria, comprobar=True)
+        if categoria_id is None:
             raise NotFoundException(detail="Categoría no encontrada")
     else:
         raise NotFoundException(detail="La categoría es obligatoria")
@@ -159,22 +244,62 @@ def crear_producto(producto: schemas.ProductoResponse, db: Session = Depends(get
         categoria_id=categoria_id
     )
 
-    # Agregar el producto a la base de datos y hacer commit
+    # Agregar el producto y el primer punto de su historial de precios y hacer commit
     db.add(nuevo_producto)
-    db.commit()
-    db.refresh(nuevo_producto)
+    await db.flush()
+    db.add(models.HistorialPrecio(producto_id=nuevo_producto.id, precio=nuevo_producto.precio))
+    await db.commit()
+    incrementar_version("producto")
+    indice_autocompletar.agregar(nuevo_producto.nombre)
+    indices_ordenados.agregar(nuevo_producto.id, nuevo_producto.nombre, nuevo_producto.precio)
+    matriz_precios.agregar(nuevo_producto.id, nuevo_producto.nombre, nuevo_producto.precio, supermercado_id)
 
     return {"mensaje": "Producto creado exitosamente"}
 
 
+@router.post("/importar", summary="Importar productos en bloque")
+async def importar_productos(request: Request, formato: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    """
+    Importa productos desde un CSV o NDJSON enviado en el cuerpo de la petición.
+    - **formato**: "csv" o "ndjson". Si no se indica se deduce del Content-Type.
+
+    El CSV debe tener cabecera con las columnas nombre, precio, supermercado y categoria;
+    cada línea NDJSON es un objeto con esos mismos campos.
+    Las filas con errores se saltan y se indican en la respuesta con su número de línea.
+    """
+    if formato is None:
+        formato = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    if formato not in ["csv", "ndjson"]:
+        raise BadRequestException(detail="Formato inválido. Usa 'csv' o 'ndjson'.")
+
+    inicio = time.perf_counter()
+    importacion = ImportacionProductos(db)
+    try:
+        await importacion.importar(leer_filas(leer_lineas(request.stream()), formato))
+    except ValueError as e:
+        raise BadRequestException(detail=str(e))
+    finally:
+        if importacion.insertados:
+            incrementar_version("producto")
+    segundos = time.perf_counter() - inicio
+
+    return {
+        "insertados": importacion.insertados,
+        "num_errores": importacion.num_errores,
+        "errores": sorted(importacion.errores, key=lambda error: error["linea"]),
+        "segundos": round(segundos, 3),
+        "filas_por_segundo": round(importacion.insertados / segundos, 1) if segundos else None,
+    }
+
+
 @router.put("/actualizar-categoria/{id}", summary="Actualizar la categoría de un producto")
-def actualizar_producto(id: int, producto: schemas.ProductoRespActCat, db: Session = Depends(get_db)):
+async def actualizar_producto(id: int, producto: schemas.ProductoRespActCat, db: AsyncSession = Depends(get_db)):
     """
     Actualiza la categoría de un producto por su ID.
     - **categoria**: Nombre de la nueva categoría del producto.
     """
     # Buscar el producto en la base de datos
-    producto_buscado = db.query(models.Producto).filter(models.Producto.id == id).first()
+    producto_buscado = await db.get(models.Producto, id)
 
     # Verificar si el producto existe
     if producto_buscado is None:
@@ -183,56 +308,152 @@ def actualizar_producto(id: int, producto: schemas.ProductoRespActCat, db: Sessi
 
     if producto.categoria:
         # Buscar la categoría por nombre
-        categoria_db = db.query(models.Categoria).filter(models.Categoria.nombre == producto.categoria).first()
-        if categoria_db:
-            producto_buscado.categoria_id = categoria_db.id
+        categoria_id = await cache_categorias.resolver(db, producto.categoria, comprobar=True)
+        if categoria_id is not None:
+            producto_buscado.categoria_id = categoria_id
         else:
             raise NotFoundException(detail="Categoría no encontrada")
 
     # Guardar los cambios en la base de datos
-    db.commit()
-    db.refresh(producto_buscado)
+    await db.commit()
+    await db.refresh(producto_buscado)
+    incrementar_version("producto")
 
     return {"mensaje": "Producto actualizado con éxito"}
 
 
 
 @router.put("/actualizar-precio/{id}", summary="Actualizar el precio de un producto")
-def actualizar_precio_producto(id: int, producto: schemas.ProductoRespActPre, db: Session = Depends(get_db)):
+async def actualizar_precio_producto(id: int, producto: schemas.ProductoRespActPre, db: AsyncSession = Depends(get_db)):
     """
     Actualiza el precio de un producto por su ID.
     - **id**: ID del producto a actualizar.
     - **nuevo_precio**: Nuevo precio del producto.
     """
     # Buscar el producto en la base de datos
-    producto_db = db.query(models.Producto).filter(models.Producto.id == id).first()
+    producto_db = await db.get(models.Producto, id)
 
     # Verificar si el producto existe
     if producto_db is None:
         raise NotFoundException(detail="Producto no encontrado")
 
     # Actualizar el precio del producto
+    precio_anterior = producto_db.precio
     producto_db.precio = producto.precio
+    db.add(models.HistorialPrecio(producto_id=id, precio=producto.precio))
 
     # Guardar los cambios en la base de datos
-    db.commit()
-    db.refresh(producto_db)
+    await db.commit()
+    await db.refresh(producto_db)
+    incrementar_version("producto")
+    indices_ordenados.cambiar_precio(producto_db.id, precio_anterior, producto_db.precio)
+    matriz_precios.cambiar_precio(producto_db.id, producto_db.precio)
 
     return {"mensaje": "Precio del producto actualizado con éxito"}
 
 
+@router.put("/actualizar-precios", summary="Actualizar el precio de muchos productos")
+async def actualizar_precios_productos(cambio: schemas.ActualizacionPrecios, db: AsyncSession = Depends(get_db)):
+    """
+    Cambia el precio de todos los productos que cumplen los filtros con un solo UPDATE.
+    - **modo**: "absoluto" (el precio pasa a ser **valor**), "porcentaje" (sube o baja un
+      **valor** por ciento) o "diferencia" (suma **valor**, negativo para bajar).
+    - **supermercado** / **categoria**: Nombre del supermercado y de la categoría.
+    - **min_precio** / **max_precio**: Rango del precio actual.
+    - **ids**: Ids de los productos.
+    - **todos**: Obligatorio para cambiar todos los productos si no se indica ningún filtro.
+    - **devolver_productos**: Incluir en la respuesta los productos con su nuevo precio.
+
+    Los precios se redondean a céntimos y no bajan de 0. Los totales de las listas no cambian:
+    guardan el precio del momento en que se agregó cada producto.
+    """
+    if cambio.modo == "absoluto":
+        if cambio.valor < 0:
+            raise BadRequestException(detail="El precio no puede ser negativo")
+        nuevo_precio = round(cambio.valor, 2)
+    elif cambio.modo in ["porcentaje", "diferencia"]:
+        if cambio.modo == "porcentaje":
+            nuevo_precio = models.Producto.precio * (1 + cambio.valor / 100)
+        else:
+            nuevo_precio = models.Producto.precio + cambio.valor
+        # round(numeric, int) existe en PostgreSQL y en SQLite; round(float, int) solo en SQLite
+        nuevo_precio = func.round(cast(nuevo_precio, Numeric), 2)
+        nuevo_precio = case((nuevo_precio < 0, 0.0), else_=nuevo_precio)
+    else:
+        raise BadRequestException(detail="Modo inválido. Usa 'absoluto', 'porcentaje' o 'diferencia'.")
+
+    filtros = []
+    if cambio.supermercado is not None:
+        supermercado_id = await cache_supermercados.resolver(db, cambio.supermercado)
+        if supermercado_id is None:
+            raise NotFoundException(detail="Supermercado no encontrado")
+        filtros.append(models.Producto.supermercado_id == supermercado_id)
+    if cambio.categoria is not None:
+        categoria_id = await cache_categorias.resolver(db, cambio.categoria)
+        if categoria_id is None:
+            raise NotFoundException(detail="Categoría no encontrada")
+        filtros.append(models.Producto.categoria_id == categoria_id)
+    if cambio.min_precio is not None:
+        filtros.append(models.Producto.precio >= cambio.min_precio)
+    if cambio.max_precio is not None:
+        filtros.append(models.Producto.precio <= cambio.max_precio)
+    if cambio.ids is not None:
+        filtros.append(models.Producto.id.in_(cambio.ids))
+    if not filtros and not cambio.todos:
+        raise BadRequestException(detail="Indica algún filtro, o todos=true para cambiar el precio de todos los productos")
+    filtros.append(models.Producto.precio.isnot(None))
+
+    # El índice por precio necesita el precio anterior para mover cada producto;
+    # las filas se bloquean hasta el commit para que no cambien entre las dos sentencias
+    anteriores = {}
+    if indices_ordenados.activo:
+        anteriores = dict((await db.execute(
+            select(models.Producto.id, models.Producto.precio).where(*filtros).with_for_update()
+        )).all())
+
+    resultado = await db.execute(
+        update(models.Producto)
+        .where(*filtros)
+        .values(precio=nuevo_precio)
+        .returning(models.Producto.id, models.Producto.nombre, models.Producto.precio, models.Producto.supermercado_id)
+        .execution_options(synchronize_session=False)
+    )
+    # SQLite devuelve como enteros los precios sin decimales
+    cambiados = [(id, nombre, float(precio), supermercado_id) for id, nombre, precio, supermercado_id in resultado]
+
+    # El historial de precios se escribe en la misma transacción
+    if cambiados:
+        await db.execute(insert(models.HistorialPrecio), filas_historial((id, precio) for id, _, precio, _ in cambiados))
+    await db.commit()
+
+    if cambiados:
+        incrementar_version("producto")
+    for id, _, precio, _ in cambiados:
+        if id in anteriores:
+            indices_ordenados.cambiar_precio(id, anteriores[id], precio)
+        matriz_precios.cambiar_precio(id, precio)
+
+    respuesta = {"actualizados": len(cambiados)}
+    if cambio.devolver_productos:
+        respuesta["productos"] = [fila_precio_actualizado(fila) for fila in cambiados]
+    return respuesta_json(respuesta)
+
+
 @router.delete("/eliminar/{id}", summary="Eliminar un producto")
-def eliminar_producto(id: int, db: Session = Depends(get_db)):
+async def eliminar_producto(id: int, db: AsyncSession = Depends(get_db)):
     """
     Elimina un producto por su ID.
     - **id**: ID del producto a eliminar.
     """
-    producto_db = db.query(models.Producto).filter(models.Producto.id == id).first()
+    producto_db = await db.get(models.Producto, id)
 
     if not producto_db:
         return {"error": "Producto no encontrado"}
 
-    db.delete(producto_db)
-    db.commit()
+    # Quitar el producto de los totales de las listas que lo contienen y borrarlo
+    await borrar_productos(db, [id])
+    await db.commit()
+    incrementar_version("producto", "lista_compra")
+    quitar_de_indices([(producto_db.id, producto_db.nombre, producto_db.precio)])
 
     return {"mensaje": "Producto eliminado con éxito"}
@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from app.db.database import async_engine, replica_engine
+
+router = APIRouter(
+    tags=["Salud"],  # Esta etiqueta agrupa las rutas en Swagger UI
+)
+
+# Estado del arranque del worker, lo rellena el evento de startup de main.py
+estado_arranque = {
+    "listo": False,
+    "modo": None,
+    "version_esquema": None,
+    "segundos_hasta_listo": None,
+}
+
+
+@router.get("/ready", summary="Comprobar si el worker puede recibir tráfico")
+async def comprobar_listo():
+    """
+    Devuelve 200 cuando el worker ha terminado de arrancar (esquema comprobado e
+    índices en memoria construidos) y la base de datos responde (también la
+    réplica de lectura, si la hay); si no, 503.
+    """
+    if not estado_arranque["listo"]:
+        return JSONResponse(status_code=503, content={"listo": False, "detail": "El worker está arrancando"})
+
+    try:
+        async with async_engine.connect() as conexion:
+            await conexion.execute(text("SELECT 1"))
+    except Exception:
+        return JSONResponse(status_code=503, content={"listo": False, "detail": "Sin conexión con la base de datos"})
+
+    if replica_engine is not None:
+        try:
+            async with replica_engine.connect() as conexion:
+                await conexion.execute(text("SELECT 1"))
+        except Exception:
+            return JSONResponse(status_code=503, content={"listo": False, "detail": "Sin conexión con la réplica de lectura"})
+
+    return estado_arranque
@@ -1,8 +1,15 @@
 from http.client import HTTPException
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app import models, schemas
+from app.cache import cache_supermercados
+from app.condicional import CACHE_CONTROL, condicional, incrementar_version
+from app.borrado import borrado_terminado, borrar, iniciar_purga, quitar_de_indices
+from app.respuestas import RespuestaJSON
+from app.consultas import consulta_listas_compra
+from app.paginacion import Paginacion, listar
 from app.exceptions import NotFoundException
 
 router = APIRouter(
@@ -11,34 +18,32 @@ router = APIRouter(
 )
 
 # Ruta para obtener todos los supermercados
-@router.get("/", summary="Obtener todos los supermercados", description="Obtiene la lista de todos los supermercados registrados en el sistema.")
-def obtener_supermercados(db:Session=Depends(get_db)):
-    data = db.query(models.Supermercado).all()
-
+@router.get("/", dependencies=[Depends(condicional("supermercado", cache_control=CACHE_CONTROL["supermercados"]))], summary="Obtener todos los supermercados", description="Obtiene la lista de todos los supermercados registrados en el sistema.")
+async def obtener_supermercados(response: Response, pagina: Paginacion = Depends(), db:AsyncSession=Depends(get_db)):
     # Construimos la respuesta con detalles del supermercado
-    resultado = [
-        {
-            "id": item.id,
-            "nombre": item.nombre,
-        }
-        for item in data
-    ]
-
-    return resultado 
-
-
-@router.get("/buscar/{id}", response_model=schemas.Supermercado, summary="Buscar supermercado")
-def obtener_supermercado(id: int, db: Session = Depends(get_db)):
+    return await listar(
+        db,
+        select(models.Supermercado),
+        [models.Supermercado.id],
+        lambda item: [item.id],
+        lambda item: {"id": item.id, "nombre": item.nombre},
+        pagina,
+        response,
+    )
+
+
+@router.get("/buscar/{id}", dependencies=[Depends(condicional("supermercado", cache_control=CACHE_CONTROL["supermercados"]))], response_model=schemas.Supermercado, summary="Buscar supermercado")
+async def obtener_supermercado(id: int, db: AsyncSession = Depends(get_db)):
     """
     Obtiene un supermercado por su ID.
     - **id**: El ID del supermercado a buscar.
     """
-    return db.query(models.Supermercado).filter(models.Supermercado.id == id).first()
+    return await db.get(models.Supermercado, id)
 
 
 @router.get("/listas/{id}", summary="Obtener listas de compra de un supermercado")
-def obtener_listas_compra_supermercado(id: int, db: Session = Depends(get_db)):
-    supermercado = db.query(models.Supermercado).filter(models.Supermercado.id == id).first()
+async def obtener_listas_compra_supermercado(id: int, db: AsyncSession = Depends(get_db)):
+    supermercado = await db.get(models.Supermercado, id)
 
     """
     Obtener las listas de la compra de un supermercado.
@@ -54,37 +59,50 @@ def obtener_listas_compra_supermercado(id: int, db: Session = Depends(get_db)):
             "usuario": item.usuario.nombre,
             "fecha": item.fecha_creacion.strftime('%d-%m-%Y'),
             "supermercado": item.supermercado.nombre,
-            "productos": len(item.productos),
+            "productos": item.num_productos,
+            "total": item.total,
         }
-        for item in supermercado.listas_compra
+        for item in (await db.execute(consulta_listas_compra().where(models.ListaCompra.supermercado_id == id))).scalars()
     ]
     return resultado
 
 
 @router.post("/nuevo", summary="Crear un nuevo supermercado")
-def crear_supermercado(supermercado: schemas.Supermercado, db: Session = Depends(get_db)):
+async def crear_supermercado(supermercado: schemas.Supermercado, db: AsyncSession = Depends(get_db)):
     """
     Crea un supermercado en el sistema.
     - **nombre**: Nombre del supermercado, asegúrate de usar uno que no exista.
     """
     nuevo_supermercado = models.Supermercado(nombre=supermercado.nombre)
     db.add(nuevo_supermercado)
-    db.commit()
-    db.refresh(nuevo_supermercado)
+    await db.commit()
+    await db.refresh(nuevo_supermercado)
+    cache_supermercados.invalidar()
+    incrementar_version("supermercado")
 
     return{"Respuesta": "Supermercado creado"}
 
 
 @router.delete("/eliminar/{id}", summary="Eliminar un supermercado")
-def eliminar_supermercado(id: int, db: Session = Depends(get_db)):
+async def eliminar_supermercado(id: int, asincrono: bool = False, db: AsyncSession = Depends(get_db)):
     """
-    Eliminar un supermercado por su ID.
+    Eliminar un supermercado por su ID, con sus productos y sus listas de la compra.
     - **id**: El ID del supermercado a eliminar.
+    - **asincrono**: Si es true, borra por lotes en segundo plano y responde al momento
+      con el estado de la purga (su avance se consulta en /borrados/{id}).
     """
-
-    supermercado = db.query(models.Supermercado).filter(models.Supermercado.id == id).first()
-    if supermercado is None:
+    if asincrono:
+        purga = await iniciar_purga(db, "supermercado", id)
+        if purga is None:
+            raise NotFoundException(detail="Supermercado no encontrado")
+        return RespuestaJSON(purga.resumen(), status_code=202)
+
+    eliminados = (await db.execute(
+        select(models.Producto.id, models.Producto.nombre, models.Producto.precio).where(models.Producto.supermercado_id == id)
+    )).all()
+    if not await borrar(db, "supermercado", id):
         raise NotFoundException(detail="Supermercado no encontrado")
-    db.delete(supermercado)
-    db.commit()
+    await db.commit()
+    borrado_terminado("supermercado")
+    quitar_de_indices(eliminados)
     return {"Respuesta": "Supermercado eliminado con éxito"}
\ No newline at end of file
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas import Usuario
 from app.db.database import get_db
 from app import models
-from app.utils import hash_password, check_password
+from app.cache import cache_credenciales, cache_usuarios
+from app.condicional import incrementar_version
+from app.utils import check_password_async, hash_password_async, necesita_rehash
+from app.paginacion import Paginacion, listar
+from app.sesiones import esquema_bearer, sesiones, usuario_actual
 
 router = APIRouter(
     prefix="/usuarios",
@@ -11,27 +18,28 @@ router = APIRouter(
 )
 
 @router.get("/")
-def obtener_usuarios(db:Session=Depends(get_db)):
-    data = db.query(models.Usuario).all()
-    
+async def obtener_usuarios(response: Response, pagina: Paginacion = Depends(), db:AsyncSession=Depends(get_db)):
     # Construimos la respuesta con detalles del usuario
-    resultado = [
-        {
+    return await listar(
+        db,
+        select(models.Usuario),
+        [models.Usuario.id],
+        lambda item: [item.id],
+        lambda item: {
             "id": item.id,
             "nombre": item.nombre,
             "apellido": item.apellido,
             "nombre de usuario": item.username,
             "contraseña": item.password,
-        }
-        for item in data
-    ]
-
-    return resultado
+        },
+        pagina,
+        response,
+    )
 
 @router.post("/registrar")
-def registrar_usario(user: Usuario, db: Session = Depends(get_db)):
-    # Encriptar la contraseña antes de guardarla
-    hashed_password = hash_password(user.password)
+async def registrar_usario(user: Usuario, db: AsyncSession = Depends(get_db)):
+    # Encriptar la contraseña antes de guardarla (en los hilos dedicados a contraseñas)
+    hashed_password = await hash_password_async(user.password)
     nuevo_usuario = models.Usuario(
         username=user.username,
         password=hashed_password,
@@ -39,14 +47,54 @@ def registrar_usario(user: Usuario, db: Session = Depends(get_db)):
         apellido=user.apellido,
     )
     db.add(nuevo_usuario)
-    db.commit()
-    db.refresh(nuevo_usuario)
+    await db.commit()
+    await db.refresh(nuevo_usuario)
+    cache_usuarios.invalidar()
+    incrementar_version("usuario")
     return {"Respuesta": "Usuario creado exitosamente"}
 
 
+# Respuesta del login con un token de sesión nuevo
+def respuesta_login(usuario_id: int) -> dict:
+    token, caduca = sesiones.emitir(usuario_id)
+    return {
+        "Respuesta": "Login exitoso",
+        "token": token,
+        "tipo": "bearer",
+        "caduca": datetime.fromtimestamp(caduca).isoformat(),
+    }
+
+
 @router.post("/login")
-def login_usuario(user: Usuario, db: Session = Depends(get_db)):
-    usuario = db.query(models.Usuario).filter(models.Usuario.username == user.username).first()
-    if usuario and check_password(user.password, usuario.password):
-        return {"Respuesta": "Login exitoso"}
-    raise HTTPException(status_code=401, detail="Credenciales inválidas")
+async def login_usuario(user: Usuario, db: AsyncSession = Depends(get_db)):
+    """
+    Comprueba las credenciales y devuelve un token de sesión.
+    Las rutas que necesitan un usuario lo reciben en la cabecera
+    `Authorization: Bearer <token>`.
+    """
+    usuario = (await db.execute(select(models.Usuario).where(models.Usuario.username == user.username))).scalars().first()
+
+    # Un login repetido con las mismas credenciales no vuelve a calcular el hash
+    if usuario and cache_credenciales.verificada(user.username, user.password, usuario.password):
+        return respuesta_login(usuario.id)
+
+    # Sin usuario también se calcula un hash para no delatar qué usuarios existen
+    if not await check_password_async(user.password, usuario.password if usuario else None):
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+
+    # Los hashes antiguos o con menos iteraciones se actualizan al entrar
+    if necesita_rehash(usuario.password):
+        usuario.password = await hash_password_async(user.password)
+        await db.commit()
+
+    cache_credenciales.guardar(user.username, user.password, usuario.password)
+    return respuesta_login(usuario.id)
+
+
+@router.post("/logout", dependencies=[Depends(usuario_actual)])
+async def logout_usuario(credenciales: HTTPAuthorizationCredentials = Depends(esquema_bearer)):
+    """
+    Revoca el token de sesión enviado en la cabecera Authorization.
+    """
+    sesiones.revocar(credenciales.credentials)
+    return {"Respuesta": "Sesión cerrada"}
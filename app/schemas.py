@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 # Esquema de Usuario
@@ -47,10 +47,15 @@ class ListaCompra(BaseModel):
     class Config:
         orm_mode = True
 
+# Esquema para agregar varios productos a una lista de compra
+class ProductoListaNuevo(BaseModel):
+    nombre_producto: str
+    cantidad: int = Field(gt=0)
+
 # Esquema de ListaCompra
 class ListaCompraRespNueva(BaseModel):
     supermercado: str
-    usuario: str
+    usuario: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -80,10 +85,23 @@ class ProductoRespActPre(BaseModel):
     class Config:
         orm_mode = True
 
+# Esquema para cambiar el precio de muchos productos a la vez
+class ActualizacionPrecios(BaseModel):
+    modo: str  # "absoluto", "porcentaje" o "diferencia"
+    valor: float
+    supermercado: Optional[str] = None
+    categoria: Optional[str] = None
+    min_precio: Optional[float] = None
+    max_precio: Optional[float] = None
+    ids: Optional[List[int]] = None
+    todos: bool = False  # obligatorio para cambiar todos los productos sin filtro
+    devolver_productos: bool = False
+
 # Esquema para obtener los productos en una lista de compra
 class ListaCompraResponse(BaseModel):
     id: int
     fecha_creacion: datetime
+    total: float
     productos: List[ProductoLista]
 
     class Config:
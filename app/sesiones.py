@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.exceptions import UnauthorizedException
+
+# Clave con la que se firman los tokens; todos los workers deben tener la misma.
+# Es obligatoria con MODO_ARRANQUE=verificar (producción). En desarrollo, si no
+# se configura, se genera una al arrancar: los tokens dejan de valer al
+# reiniciar y no sirven en otro worker.
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+if not SECRET_KEY:
+    if os.getenv("MODO_ARRANQUE", "migrar") == "verificar":
+        raise RuntimeError("Falta SECRET_KEY: configura la misma clave en todos los workers")
+    SECRET_KEY = secrets.token_hex(32)
+    logging.getLogger("app.sesiones").warning(
+        "SECRET_KEY no configurada: se usa una clave aleatoria, los tokens solo valen en este proceso"
+    )
+
+# Duración (segundos) de una sesión y capacidad de la caché de tokens
+SESION_DURACION = int(os.getenv("SESION_DURACION", "3600"))
+CACHE_SESIONES_CAPACIDAD = int(os.getenv("CACHE_SESIONES_CAPACIDAD", "10000"))
+
+
+def _firmar(contenido: str) -> str:
+    firma = hmac.new(SECRET_KEY.encode(), contenido.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(firma).decode().rstrip("=")
+
+
+# Tokens de sesión firmados: <usuario_id>.<caduca>.<aleatorio>.<firma>.
+# La firma se comprueba una vez por token y el resultado queda en una caché
+# LRU token -> (usuario_id, caduca), así las peticiones autenticadas no
+# consultan la tabla de usuarios. Los tokens revocados (logout) se recuerdan
+# hasta que caducan, pero solo en el proceso que atiende el logout: en los demás
+# workers, y en este después de reiniciar, el token sigue valiendo hasta que
+# caduca (como mucho SESION_DURACION segundos).
+class Sesiones:
+    def __init__(self, duracion: int = SESION_DURACION, capacidad: int = CACHE_SESIONES_CAPACIDAD):
+        self.duracion = duracion
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()  # token -> (usuario_id, caduca)
+        self._revocados = {}  # token -> caduca
+        self.aciertos = 0
+        self.fallos = 0
+
+    def emitir(self, usuario_id: int) -> tuple:
+        caduca = int(time.time()) + self.duracion
+        contenido = f"{usuario_id}.{caduca}.{secrets.token_urlsafe(12)}"
+        token = f"{contenido}.{_firmar(contenido)}"
+        self._guardar(token, usuario_id, caduca)
+        return token, caduca
+
+    def _guardar(self, token: str, usuario_id: int, caduca: int):
+        self._entradas[token] = (usuario_id, caduca)
+        self._entradas.move_to_end(token)
+        if len(self._entradas) > self.capacidad:
+            self._entradas.popitem(last=False)
+
+    # Devuelve el id del usuario del token, o None si no es válido, ha caducado o se ha revocado
+    def resolver(self, token: str) -> Optional[int]:
+        ahora = time.time()
+        entrada = self._entradas.get(token)
+        if entrada is not None:
+            if entrada[1] > ahora:
+                self._entradas.move_to_end(token)
+                self.aciertos += 1
+                return entrada[0]
+            del self._entradas[token]
+            return None
+
+        self.fallos += 1
+        if token in self._revocados:
+            return None
+        try:
+            contenido, firma = token.rsplit(".", 1)
+            usuario_id, caduca, _ = contenido.split(".", 2)
+            usuario_id, caduca = int(usuario_id), int(caduca)
+        except ValueError:
+            return None
+        if caduca <= ahora or not hmac.compare_digest(firma, _firmar(contenido)):
+            return None
+
+        self._guardar(token, usuario_id, caduca)
+        return usuario_id
+
+    def revocar(self, token: str):
+        self._entradas.pop(token, None)
+        try:
+            caduca = int(token.split(".")[1])
+        except (IndexError, ValueError):
+            return
+
+        # Se olvidan los tokens revocados que ya han caducado por su cuenta
+        ahora = time.time()
+        if len(self._revocados) >= self.capacidad:
+            self._revocados = {revocado: fin for revocado, fin in self._revocados.items() if fin > ahora}
+        if caduca > ahora:
+            self._revocados[token] = caduca
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "capacidad": self.capacidad,
+            "revocados": len(self._revocados),
+            "duracion_segundos": self.duracion,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+sesiones = Sesiones()
+
+# Cabecera Authorization: Bearer <token>
+esquema_bearer = HTTPBearer(auto_error=False)
+
+
+# Id del usuario de la sesión, o None si la petición no lleva token
+async def usuario_opcional(credenciales: Optional[HTTPAuthorizationCredentials] = Depends(esquema_bearer)) -> Optional[int]:
+    if credenciales is None:
+        return None
+    usuario_id = sesiones.resolver(credenciales.credentials)
+    if usuario_id is None:
+        raise UnauthorizedException(detail="Token inválido o caducado")
+    return usuario_id
+
+
+# Id del usuario de la sesión; la petición debe llevar un token válido
+async def usuario_actual(usuario_id: Optional[int] = Depends(usuario_opcional)) -> int:
+    if usuario_id is None:
+        raise UnauthorizedException(detail="Falta el token de sesión")
+    return usuario_id
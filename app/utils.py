@@ -1,9 +1,86 @@
+import asyncio
+import base64
 import hashlib
+import hmac
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from app.exceptions import ServiceUnavailableException
 
-# Función para hashear la contraseña
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+# Iteraciones de PBKDF2-SHA256 de las contraseñas nuevas (factor de trabajo)
+PASSWORD_ITERACIONES = int(os.getenv("PASSWORD_ITERACIONES", "600000"))
 
-# Función para verificar la contraseña
-def check_password(password: str, hashed_password: str) -> bool:
-    return hash_password(password) == hashed_password
+# Hilos dedicados a calcular hashes y cuántos cálculos pueden estar en cola a la vez.
+# Así un aluvión de logins no ocupa el pool de hilos compartido de la aplicación;
+# con la cola llena se responde 503 en lugar de hacer esperar a la petición.
+PASSWORD_HILOS = int(os.getenv("PASSWORD_HILOS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_COLA = int(os.getenv("PASSWORD_COLA", str(PASSWORD_HILOS * 8)))
+
+ALGORITMO = "pbkdf2_sha256"
+
+ejecutor_contrasenas = ThreadPoolExecutor(max_workers=PASSWORD_HILOS, thread_name_prefix="contrasenas")
+_cola_contrasenas = asyncio.Semaphore(PASSWORD_COLA)
+
+
+def _codificar(datos: bytes) -> str:
+    return base64.b64encode(datos).decode().rstrip("=")
+
+
+def _pbkdf2(password: str, sal: bytes, iteraciones: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), sal, iteraciones)
+
+
+# Función para hashear la contraseña.
+# Formato: pbkdf2_sha256$<iteraciones>$<sal>$<hash>
+def hash_password(password: str, iteraciones: int = PASSWORD_ITERACIONES) -> str:
+    sal = secrets.token_bytes(16)
+    return f"{ALGORITMO}${iteraciones}${_codificar(sal)}${_codificar(_pbkdf2(password, sal, iteraciones))}"
+
+
+# Función para verificar la contraseña, comparando en tiempo constante.
+# Acepta también los hashes SHA-256 antiguos. Sin hash (usuario inexistente)
+# se devuelve False. En los dos casos se calcula antes el hash ficticio, para
+# que tarden lo mismo que un hash actual y no delaten qué usuarios existen ni
+# cuáles tienen todavía un hash antiguo.
+def check_password(password: str, hashed_password: Optional[str]) -> bool:
+    partes = hashed_password.split("$") if hashed_password is not None else []
+    if len(partes) != 4 or partes[0] != ALGORITMO:
+        check_password(password, hash_ficticio())
+        if hashed_password is None:
+            return False
+        antiguo = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(antiguo.encode(), hashed_password.encode())
+
+    _, iteraciones, sal, esperado = partes
+    sal = base64.b64decode(sal + "=" * (-len(sal) % 4))
+    return hmac.compare_digest(_codificar(_pbkdf2(password, sal, int(iteraciones))).encode(), esperado.encode())
+
+
+# Indica si el hash es antiguo o usa menos iteraciones de las configuradas
+def necesita_rehash(hashed_password: str) -> bool:
+    partes = hashed_password.split("$")
+    return len(partes) != 4 or partes[0] != ALGORITMO or int(partes[1]) < PASSWORD_ITERACIONES
+
+
+# Hash de referencia para que un usuario inexistente tarde lo mismo que uno existente
+@lru_cache(maxsize=1)
+def hash_ficticio() -> str:
+    return hash_password(secrets.token_hex(16))
+
+
+async def _en_ejecutor(funcion, *args):
+    if _cola_contrasenas.locked():
+        raise ServiceUnavailableException(detail="Demasiados inicios de sesión a la vez, inténtalo de nuevo más tarde")
+    async with _cola_contrasenas:
+        return await asyncio.get_running_loop().run_in_executor(ejecutor_contrasenas, funcion, *args)
+
+
+# Versiones asíncronas que calculan el hash en los hilos dedicados
+async def hash_password_async(password: str) -> str:
+    return await _en_ejecutor(hash_password, password)
+
+
+async def check_password_async(password: str, hashed_password: Optional[str]) -> bool:
+    return await _en_ejecutor(check_password, password, hashed_password)
@@ -0,0 +1,80 @@
+"""
+Mide el tiempo desde que se lanza un worker de uvicorn hasta que /ready responde 200,
+en cada modo de arranque (MODO_ARRANQUE):
+
+- migrar (vacía): el worker crea el esquema y carga los datos en una base de datos nueva.
+- migrar: el worker comprueba las migraciones y los datos en una base de datos ya preparada.
+- verificar: el worker solo comprueba la versión del esquema.
+
+Uso:
+    python -m benchmarks.arranque --repeticiones 5
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usan bases de datos SQLite temporales
+(el modo "migrar (vacía)" solo se mide en ese caso).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def entorno_sqlite(ruta: str) -> dict:
+    return dict(os.environ, DATABASE_URL=f"sqlite:///{ruta}", DATABASE_ASYNC_URL=f"sqlite+aiosqlite:///{ruta}")
+
+
+# Lanza uvicorn y devuelve (segundos hasta /ready, segundos_hasta_listo según el propio worker)
+def medir_arranque(entorno: dict, puerto: int) -> tuple:
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if proceso.poll() is not None:
+                raise RuntimeError("El worker ha terminado antes de estar listo")
+            try:
+                respuesta = httpx.get(f"http://127.0.0.1:{puerto}/ready", timeout=1)
+                if respuesta.status_code == 200:
+                    return time.perf_counter() - inicio, respuesta.json()["segundos_hasta_listo"]
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+def main(args):
+    directorio = tempfile.mkdtemp()
+    if "DATABASE_URL" in os.environ:
+        base = dict(os.environ)
+    else:
+        base = entorno_sqlite(os.path.join(directorio, "preparada.db"))
+    subprocess.run([sys.executable, "-m", "app.db.comandos", "migrar"], env=base, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, "-m", "app.db.comandos", "sembrar"], env=base, check=True, stdout=subprocess.DEVNULL)
+
+    casos = []
+    if "DATABASE_URL" not in os.environ:
+        casos.append(("migrar (vacía)", lambda i: dict(entorno_sqlite(os.path.join(directorio, f"vacia{i}.db")), MODO_ARRANQUE="migrar")))
+    casos.append(("migrar", lambda i: dict(base, MODO_ARRANQUE="migrar")))
+    casos.append(("verificar", lambda i: dict(base, MODO_ARRANQUE="verificar", SECRET_KEY=base.get("SECRET_KEY", "arranque"))))
+
+    print(f"{'modo':<18}{'lanzar -> /ready (s)':>22}{'importación -> listo (s)':>26}")
+    for nombre, entorno in casos:
+        medidas = [medir_arranque(entorno(i), args.puerto) for i in range(args.repeticiones)]
+        total = statistics.median(medida[0] for medida in medidas)
+        interno = statistics.median(medida[1] for medida in medidas)
+        print(f"{nombre:<18}{total:>22.3f}{interno:>26.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5, help="Arranques por modo (se muestra la mediana)")
+    parser.add_argument("--puerto", type=int, default=8765)
+    main(parser.parse_args())
@@ -0,0 +1,122 @@
+"""
+Compara peticiones por segundo de /productos/ y /listas_compra/{id}
+entre endpoints síncronos (pool de hilos + sesión síncrona) y los
+endpoints asíncronos de la API (AsyncSession).
+
+Uso:
+    python -m benchmarks.asincrono --productos 5000 --peticiones 500 --concurrencia 50
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, joinedload
+
+from app import models, schemas
+from app.db.database import SessionLocal, engine
+from app.db.iniciar_db import cargar_bd
+from app.db.migraciones import aplicar_migraciones
+from benchmarks.serializacion import consulta_productos, producto_a_dict
+
+
+# Endpoints síncronos equivalentes, como estaban antes de pasar a async
+def get_db_sincrono():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Productos de una lista de la compra con el producto asociado
+def consulta_productos_lista(lista_compra_id: int):
+    return (
+        select(models.ProductoLista)
+        .options(joinedload(models.ProductoLista.producto))
+        .where(models.ProductoLista.lista_compra_id == lista_compra_id)
+    )
+
+
+app_sincrona = FastAPI()
+
+
+@app_sincrona.get("/productos/")
+def obtener_productos(db: Session = Depends(get_db_sincrono)):
+    return [producto_a_dict(item) for item in db.execute(consulta_productos()).scalars()]
+
+
+@app_sincrona.get("/listas_compra/{id}", response_model=schemas.ListaCompraResponse)
+def obtener_lista_compra(id: int, db: Session = Depends(get_db_sincrono)):
+    lista_compra = db.get(models.ListaCompra, id)
+    productos_lista = db.execute(consulta_productos_lista(id)).scalars().all()
+    return schemas.ListaCompraResponse(
+        id=lista_compra.id,
+        fecha_creacion=lista_compra.fecha_creacion,
+        total=lista_compra.total,
+        productos=[schemas.ProductoLista(
+            producto=producto.producto.nombre,
+            cantidad=producto.cantidad,
+            precio=producto.precio
+        ) for producto in productos_lista]
+    )
+
+
+# Crea las tablas, los datos iniciales y productos adicionales hasta llegar a num_productos
+def preparar_datos(num_productos: int):
+    aplicar_migraciones(engine)
+    with SessionLocal() as db:
+        cargar_bd(db)
+        existentes = db.query(models.Producto).count()
+        if existentes < num_productos:
+            db.execute(insert(models.Producto), [
+                {"nombre": f"Producto {i}", "precio": 1 + i % 50, "supermercado_id": 1 + i % 10, "categoria_id": 1 + i % 10}
+                for i in range(existentes, num_productos)
+            ])
+            db.commit()
+
+
+async def medir(app, url: str, peticiones: int, concurrencia: int) -> float:
+    semaforo = asyncio.Semaphore(concurrencia)
+    transporte = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        async def peticion():
+            async with semaforo:
+                respuesta = await cliente.get(url)
+                respuesta.raise_for_status()
+
+        await peticion()  # calentamiento
+        inicio = time.perf_counter()
+        await asyncio.gather(*(peticion() for _ in range(peticiones)))
+        return peticiones / (time.perf_counter() - inicio)
+
+
+async def main(args):
+    import main as api
+
+    preparar_datos(args.productos)
+    print(f"{'ruta':<22}{'sync req/s':>14}{'async req/s':>14}")
+    for url in ["/productos/", "/listas_compra/1"]:
+        sincrono = await medir(app_sincrona, url, args.peticiones, args.concurrencia)
+        asincrono = await medir(api.app, url, args.peticiones, args.concurrencia)
+        print(f"{url:<22}{sincrono:>14.1f}{asincrono:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=1000, help="Número de productos en la base de datos")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por ruta y modo")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Peticiones simultáneas")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""
+Mide la latencia del índice de autocompletado con nombres sintéticos.
+
+Uso:
+    python -m benchmarks.autocompletar --productos 1000000 --consultas 10000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.indices.autocompletar import IndiceAutocompletar
+
+PALABRAS = [
+    "leche", "lácteos", "queso", "yogur", "pan", "molde", "manzana", "pera", "zumo", "naranja",
+    "pollo", "carne", "ternera", "cerdo", "atún", "aceite", "oliva", "arroz", "pasta", "tomate",
+    "chocolate", "galletas", "café", "té", "agua", "cerveza", "vino", "detergente", "champú", "jabón",
+]
+MARCAS = [f"marca{i}" for i in range(500)]
+
+
+def main(args):
+    aleatorio = random.Random(args.semilla)
+    nombres = [
+        " ".join(aleatorio.sample(PALABRAS, 2) + [aleatorio.choice(MARCAS), str(aleatorio.randint(1, 2000))])
+        for _ in range(args.productos)
+    ]
+
+    indice = IndiceAutocompletar()
+    inicio = time.perf_counter()
+    indice.reconstruir(nombres)
+    print(f"construcción: {time.perf_counter() - inicio:.2f} s, {len(indice)} nombres distintos")
+
+    consultas = []
+    for _ in range(args.consultas):
+        # Principio de la primera palabra y, la mitad de las veces, de la marca
+        palabras = aleatorio.choice(nombres).split()
+        consulta = palabras[0][:aleatorio.randint(1, len(palabras[0]))]
+        if aleatorio.random() < 0.5:
+            consulta += " " + palabras[2][:aleatorio.randint(1, len(palabras[2]))]
+        consultas.append(consulta)
+
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        indice.buscar(consulta, 10)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    percentiles = statistics.quantiles(tiempos, n=100)
+    print(f"p50 {percentiles[49]:.3f} ms  p95 {percentiles[94]:.3f} ms  p99 {percentiles[98]:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=10_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    main(parser.parse_args())
@@ -0,0 +1,287 @@
+"""
+Prueba de carga HTTP: arranca la API con uvicorn contra una base de datos local,
+la rellena con datos sintéticos (app/db/sintetico.py) si está vacía y lanza una
+mezcla de peticiones parecida al uso real (catálogo, búsquedas, filtros de
+precio, listas de la compra y login).
+
+Muestra peticiones por segundo y latencias p50/p95/p99 por ruta, y guarda los
+resultados en JSON para compararlos entre ejecuciones. Con --comparar termina con
+código 1 si alguna ruta es más lenta que en el fichero de referencia por encima
+del umbral.
+
+Uso:
+    python -m benchmarks.carga --productos 10000 --duracion 30 --salida resultados.json
+    python -m benchmarks.carga --comparar resultados.json --umbral 1.25
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "carga.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+
+import httpx
+from sqlalchemy import func, select
+
+from app import models
+from app.db.database import SessionLocal, engine
+from app.db.migraciones import aplicar_migraciones
+from app.db.sintetico import generar
+
+PERCENTILES = ["p50", "p95", "p99"]
+
+# Peso de cada tipo de petición en la mezcla
+MEZCLA = {
+    "GET /productos/": 25,
+    "GET /productos/ordenados": 10,
+    "GET /productos/buscar": 15,
+    "GET /productos/filtrar/precio": 15,
+    "GET /productos/autocompletar": 10,
+    "POST /listas_compra/nueva": 5,
+    "POST /listas_compra/{id}/producto": 15,
+    "POST /usuarios/login": 5,
+}
+
+
+# Migra la base de datos y, si está vacía, la rellena con datos sintéticos.
+# Devuelve los nombres de producto distintos y los números de supermercados y categorías.
+def preparar_datos(args) -> tuple:
+    aplicar_migraciones(engine)
+    with SessionLocal() as db:
+        vacia = not db.execute(select(func.count(models.Producto.id))).scalar()
+    if vacia:
+        generar(
+            engine,
+            supermercados=args.supermercados,
+            productos=args.productos,
+            usuarios=args.productos // 10,
+            listas=args.productos // 5,
+            productos_lista=args.productos,
+            semilla=args.semilla,
+        )
+    with SessionLocal() as db:
+        nombres = list(db.execute(select(models.Producto.nombre).distinct().order_by(models.Producto.nombre)).scalars())
+        supermercados = db.execute(select(func.max(models.Supermercado.id))).scalar()
+        categorias = db.execute(select(func.max(models.Categoria.id))).scalar()
+    random.Random(args.semilla).shuffle(nombres)
+    return nombres, supermercados, categorias
+
+
+def percentil(tiempos: list, p: float) -> float:
+    return tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))] if tiempos else 0.0
+
+
+class Estadisticas:
+    def __init__(self):
+        self.tiempos = {ruta: [] for ruta in MEZCLA}
+        self.errores = {ruta: 0 for ruta in MEZCLA}
+
+    def resumen(self, segundos: float) -> dict:
+        rutas = {}
+        for ruta, tiempos in self.tiempos.items():
+            tiempos = sorted(tiempos)
+            rutas[ruta] = {
+                "peticiones": len(tiempos),
+                "errores": self.errores[ruta],
+                "por_segundo": round(len(tiempos) / segundos, 1),
+                **{nombre: round(percentil(tiempos, int(nombre[1:]) / 100), 2) for nombre in PERCENTILES},
+            }
+        return rutas
+
+
+# Genera las peticiones de la mezcla y las lanza con la concurrencia indicada
+class Carga:
+    def __init__(self, cliente: httpx.AsyncClient, datos: tuple, args):
+        self.cliente = cliente
+        self.productos, self.supermercados, self.categorias = datos
+        self.args = args
+        self.aleatorio = random.Random(args.semilla)
+        self.estadisticas = Estadisticas()
+        self.usuarios = []
+        self.tokens = []
+        self.listas = []
+        self.agregados = 0
+        self.cursores = []
+
+    async def preparar(self):
+        for i in range(self.args.usuarios):
+            usuario = {"username": f"carga{i}_{time.time_ns()}", "password": f"clave{i}", "nombre": f"Carga{i}", "apellido": "Prueba"}
+            (await self.cliente.post("/usuarios/registrar", json=usuario)).raise_for_status()
+            respuesta = (await self.cliente.post("/usuarios/login", json=usuario)).json()
+            self.usuarios.append(usuario)
+            self.tokens.append(respuesta["token"])
+
+        with SessionLocal() as db:
+            inicial = db.execute(select(func.max(models.ListaCompra.id))).scalar() or 0
+        for token in self.tokens:
+            (await self.cliente.post("/listas_compra/nueva", json={"supermercado": "Supermercado 1"}, headers={"Authorization": f"Bearer {token}"})).raise_for_status()
+        with SessionLocal() as db:
+            self.listas = list(db.execute(select(models.ListaCompra.id).where(models.ListaCompra.id > inicial)).scalars())
+
+    def peticion(self, ruta: str):
+        aleatorio = self.aleatorio
+        if ruta == "GET /productos/":
+            parametros = {"limit": 50}
+            if self.cursores and aleatorio.random() < 0.7:
+                parametros["after"] = aleatorio.choice(self.cursores)
+            return "GET", "/productos/", {"params": parametros}
+        if ruta == "GET /productos/ordenados":
+            return "GET", "/productos/ordenados", {"params": {"orden": aleatorio.choice(["precio", "nombre"]), "limit": 50}}
+        if ruta == "GET /productos/buscar":
+            return "GET", "/productos/buscar", {"params": {"supermercado_id": aleatorio.randint(1, self.supermercados), "categoria_id": aleatorio.randint(1, self.categorias)}}
+        if ruta == "GET /productos/filtrar/precio":
+            minimo = round(aleatorio.uniform(0.5, 20), 2)
+            return "GET", "/productos/filtrar/precio", {"params": {"min_precio": minimo, "max_precio": minimo + 0.05}}
+        if ruta == "GET /productos/autocompletar":
+            return "GET", "/productos/autocompletar", {"params": {"q": aleatorio.choice(["le", "leche", "pan de", "pol", "agua font", "cho", "champú d"])}}
+        if ruta == "POST /listas_compra/nueva":
+            token = aleatorio.choice(self.tokens)
+            return "POST", "/listas_compra/nueva", {"json": {"supermercado": f"Supermercado {aleatorio.randint(1, self.supermercados)}"}, "headers": {"Authorization": f"Bearer {token}"}}
+        if ruta == "POST /listas_compra/{id}/producto":
+            # Cada par (lista, producto) se usa una sola vez para no repetir productos en una lista
+            numero = self.agregados
+            self.agregados += 1
+            lista = self.listas[numero % len(self.listas)]
+            producto = self.productos[(numero // len(self.listas)) % len(self.productos)]
+            return "POST", f"/listas_compra/{lista}/producto", {"params": {"nombre_producto": producto, "cantidad": aleatorio.randint(1, 5)}}
+        if ruta == "POST /usuarios/login":
+            return "POST", "/usuarios/login", {"json": aleatorio.choice(self.usuarios)}
+        raise ValueError(ruta)
+
+    async def lanzar(self, ruta: str):
+        metodo, url, opciones = self.peticion(ruta)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.cliente.request(metodo, url, **opciones)
+        except httpx.HTTPError:
+            self.estadisticas.errores[ruta] += 1
+            return
+        self.estadisticas.tiempos[ruta].append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code >= 400:
+            self.estadisticas.errores[ruta] += 1
+        elif ruta == "GET /productos/" and "x-siguiente-cursor" in respuesta.headers and len(self.cursores) < 1000:
+            self.cursores.append(respuesta.headers["x-siguiente-cursor"])
+
+    async def ejecutar(self) -> float:
+        rutas = list(MEZCLA)
+        pesos = list(MEZCLA.values())
+        fin = time.perf_counter() + self.args.duracion
+
+        async def trabajador():
+            while time.perf_counter() < fin:
+                await self.lanzar(self.aleatorio.choices(rutas, pesos)[0])
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajador() for _ in range(self.args.concurrencia)))
+        return time.perf_counter() - inicio
+
+
+# Arranca uvicorn y espera a que /ready responda
+def arrancar_api(args) -> subprocess.Popen:
+    entorno = dict(os.environ, MODO_ARRANQUE="verificar", PASSWORD_ITERACIONES=str(args.iteraciones),
+                   SECRET_KEY=os.environ.get("SECRET_KEY") or secrets.token_hex(32))
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.puerto), "--workers", str(args.workers), "--log-level", "warning"],
+        env=entorno,
+    )
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("La API ha terminado al arrancar")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.puerto}/ready", timeout=1).status_code == 200:
+                return proceso
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    proceso.terminate()
+    raise RuntimeError("La API no está lista tras 60 segundos")
+
+
+# Rutas cuyo percentil ha empeorado más que el umbral respecto a la referencia
+def regresiones(actual: dict, referencia: dict, umbral: float, nombre_percentil: str) -> list:
+    encontradas = []
+    for ruta, datos in actual["rutas"].items():
+        anterior = referencia["rutas"].get(ruta)
+        if not anterior or not anterior[nombre_percentil] or not datos["peticiones"]:
+            continue
+        proporcion = datos[nombre_percentil] / anterior[nombre_percentil]
+        if proporcion > umbral:
+            encontradas.append((ruta, anterior[nombre_percentil], datos[nombre_percentil], proporcion))
+    return encontradas
+
+
+async def main(args):
+    datos = preparar_datos(args)
+    proceso = arrancar_api(args)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.puerto}", timeout=30) as cliente:
+            carga = Carga(cliente, datos, args)
+            await carga.preparar()
+            segundos = await carga.ejecutar()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    rutas = carga.estadisticas.resumen(segundos)
+    total = sum(datos["peticiones"] for datos in rutas.values())
+    resultados = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "configuracion": {clave: valor for clave, valor in vars(args).items() if clave not in ("salida", "comparar")},
+        "base_de_datos": engine.url.get_backend_name(),
+        "python": platform.python_version(),
+        "segundos": round(segundos, 2),
+        "por_segundo": round(total / segundos, 1),
+        "rutas": rutas,
+    }
+
+    print(f"{total} peticiones en {segundos:.1f} s ({resultados['por_segundo']} req/s), concurrencia {args.concurrencia}")
+    print(f"{'ruta':<36}{'peticiones':>11}{'errores':>9}{'req/s':>9}" + "".join(f"{nombre + ' ms':>10}" for nombre in PERCENTILES))
+    for ruta, datos in rutas.items():
+        print(f"{ruta:<36}{datos['peticiones']:>11}{datos['errores']:>9}{datos['por_segundo']:>9}" + "".join(f"{datos[nombre]:>10.2f}" for nombre in PERCENTILES))
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fichero:
+            json.dump(resultados, fichero, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as fichero:
+            referencia = json.load(fichero)
+        encontradas = regresiones(resultados, referencia, args.umbral, args.percentil)
+        for ruta, anterior, actual, proporcion in encontradas:
+            print(f"REGRESIÓN {ruta}: {args.percentil} {anterior:.2f} ms -> {actual:.2f} ms (x{proporcion:.2f})")
+        if encontradas:
+            sys.exit(1)
+        print(f"Sin regresiones de {args.percentil} por encima de x{args.umbral} respecto a {args.comparar}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=10000, help="Productos de la base de datos sintética (con 1/10 de usuarios y 1/5 de listas)")
+    parser.add_argument("--supermercados", type=int, default=100, help="Supermercados de la base de datos sintética")
+    parser.add_argument("--usuarios", type=int, default=20, help="Usuarios que crean listas y hacen login")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Peticiones simultáneas")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--iteraciones", type=int, default=600000, help="PASSWORD_ITERACIONES de la API")
+    parser.add_argument("--puerto", type=int, default=8766)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="Fichero JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=1.25, help="Empeoramiento máximo permitido (1.25 = 25%% más lento)")
+    parser.add_argument("--percentil", choices=PERCENTILES, default="p95", help="Percentil que se compara")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,63 @@
+"""
+Mide el comparador de listas (GET /listas_compra/{id}/comparar) sobre la matriz
+de precios en memoria, sin base de datos: el coste de una lista en todos los
+supermercados y el reparto entre 1, 2 y 3 supermercados.
+
+Uso:
+    python -m benchmarks.comparador --supermercados 100 --nombres 20000 --articulos 50 --cobertura 0.9
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.indices.precios import MatrizPrecios
+
+
+def main(args):
+    aleatorio = random.Random(args.semilla)
+    productos = []
+    for nombre in range(args.nombres):
+        base = aleatorio.uniform(1, 10)
+        for supermercado_id in range(1, args.supermercados + 1):
+            if aleatorio.random() < args.cobertura:
+                productos.append((len(productos) + 1, f"Producto {nombre}", round(base * aleatorio.uniform(0.8, 1.2), 2), supermercado_id))
+
+    matriz = MatrizPrecios()
+    inicio = time.perf_counter()
+    matriz.reconstruir(productos)
+    print(f"Matriz de {args.nombres} nombres × {args.supermercados} supermercados "
+          f"({len(productos)} productos) construida en {time.perf_counter() - inicio:.2f} s")
+
+    listas = [
+        [(f"Producto {nombre}", aleatorio.randint(1, 3)) for nombre in aleatorio.sample(range(args.nombres), args.articulos)]
+        for _ in range(args.listas)
+    ]
+    print(f"{'tiendas':>8}{'p50 ms':>10}{'p95 ms':>10}{'exactos':>10}")
+    for tiendas in (1, 2, 3):
+        tiempos, exactos = [], 0
+        for articulos in listas:
+            inicio = time.perf_counter()
+            resultado = matriz.comparar(articulos, tiendas)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            exactos += resultado["reparto"]["exacto"]
+        cuantiles = statistics.quantiles(tiempos, n=20)
+        print(f"{tiendas:>8}{statistics.median(tiempos):>10.2f}{cuantiles[18]:>10.2f}{exactos:>10}")
+
+    # Cambios de precio incrementales
+    ids = [aleatorio.choice(productos)[0] for _ in range(10000)]
+    inicio = time.perf_counter()
+    for id in ids:
+        matriz.cambiar_precio(id, round(aleatorio.uniform(1, 10), 2))
+    print(f"Cambio de precio: {(time.perf_counter() - inicio) / len(ids) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--supermercados", type=int, default=100)
+    parser.add_argument("--nombres", type=int, default=20000, help="Nombres de producto distintos")
+    parser.add_argument("--articulos", type=int, default=50, help="Productos por lista")
+    parser.add_argument("--cobertura", type=float, default=0.9, help="Probabilidad de que un supermercado venda cada nombre")
+    parser.add_argument("--listas", type=int, default=50, help="Listas comparadas por número de tiendas")
+    parser.add_argument("--semilla", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,135 @@
+"""
+Mide el rendimiento del login (PBKDF2) mientras otros endpoints reciben carga,
+y cuánto empeora la latencia de esos endpoints durante un aluvión de logins.
+
+Modos:
+- bucle: el hash se calcula en el bucle de eventos (como una llamada síncrona).
+- ejecutor: el hash se calcula en los hilos dedicados a contraseñas.
+- caché: ejecutor y logins repetidos servidos por la caché de credenciales.
+
+Uso:
+    python -m benchmarks.login --usuarios 20 --logins 100 --concurrencia 10
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+
+import httpx
+
+from app import utils
+from app.cache import cache_credenciales
+from app.db.database import SessionLocal, engine
+from app.db.iniciar_db import cargar_bd
+from app.db.migraciones import aplicar_migraciones
+from app.routers import usuario
+
+URL_CARGA = "/productos/?limit=50"
+
+
+async def check_password_en_bucle(password, hashed_password):
+    return utils.check_password(password, hashed_password)
+
+
+def percentil(tiempos: list, p: float) -> float:
+    tiempos = sorted(tiempos)
+    return tiempos[max(0, int(len(tiempos) * p) - 1)] if tiempos else 0.0
+
+
+# Peticiones continuas a URL_CARGA hasta que se active parar; devuelve las latencias en ms
+async def generar_carga(cliente, parar: asyncio.Event, concurrencia: int) -> list:
+    tiempos = []
+
+    async def bucle():
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            (await cliente.get(URL_CARGA)).raise_for_status()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    await asyncio.gather(*(bucle() for _ in range(max(1, concurrencia // 2))))
+    return tiempos
+
+
+# Logins por segundo y respuestas 503 (cola de hashes llena), que se reintentan
+async def logins(cliente, credenciales: list, num_logins: int, concurrencia: int) -> tuple:
+    semaforo = asyncio.Semaphore(concurrencia)
+    rechazados = 0
+
+    async def login(i):
+        nonlocal rechazados
+        async with semaforo:
+            while True:
+                respuesta = await cliente.post("/usuarios/login", json=credenciales[i % len(credenciales)])
+                if respuesta.status_code != 503:
+                    break
+                rechazados += 1
+                await asyncio.sleep(0.01)
+            respuesta.raise_for_status()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(num_logins)))
+    return num_logins / (time.perf_counter() - inicio), rechazados
+
+
+async def medir(cliente, credenciales: list, args) -> tuple:
+    parar = asyncio.Event()
+    carga = asyncio.create_task(generar_carga(cliente, parar, args.concurrencia))
+    por_segundo, rechazados = await logins(cliente, credenciales, args.logins, args.concurrencia)
+    parar.set()
+    tiempos = await carga
+    return por_segundo, rechazados, statistics.median(tiempos), percentil(tiempos, 0.99)
+
+
+async def main(args):
+    import main as api
+
+    aplicar_migraciones(engine)
+    with SessionLocal() as db:
+        cargar_bd(db)
+
+    transporte = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=None) as cliente:
+        credenciales = []
+        for i in range(args.usuarios):
+            datos = {"username": f"benchmark{i}_{time.time_ns()}", "password": f"clave{i}", "nombre": "B", "apellido": "B"}
+            (await cliente.post("/usuarios/registrar", json=datos)).raise_for_status()
+            credenciales.append(datos)
+
+        # Latencia de URL_CARGA sin logins
+        parar = asyncio.Event()
+        carga = asyncio.create_task(generar_carga(cliente, parar, args.concurrencia))
+        await asyncio.sleep(2)
+        parar.set()
+        base = await carga
+        print(f"{URL_CARGA} sin logins: p50 {statistics.median(base):.1f} ms, p99 {percentil(base, 0.99):.1f} ms")
+        print(f"PBKDF2 {utils.PASSWORD_ITERACIONES} iteraciones, {utils.PASSWORD_HILOS} hilos de contraseñas")
+        print(f"PASSWORD_COLA {utils.PASSWORD_COLA}: los logins que no caben reciben 503 y se reintentan")
+        print(f"{'modo':<10}{'logins/s':>10}{'503':>6}{'carga p50 ms':>14}{'carga p99 ms':>14}")
+
+        original = usuario.check_password_async
+        for modo in ["bucle", "ejecutor", "caché"]:
+            usuario.check_password_async = check_password_en_bucle if modo == "bucle" else original
+            cache_credenciales.ttl = 60 if modo == "caché" else 0
+            cache_credenciales.invalidar()
+            if modo == "caché":
+                await logins(cliente, credenciales, len(credenciales), args.concurrencia)  # llenar la caché
+            por_segundo, rechazados, p50, p99 = await medir(cliente, credenciales, args)
+            print(f"{modo:<10}{por_segundo:>10.1f}{rechazados:>6}{p50:>14.1f}{p99:>14.1f}")
+        usuario.check_password_async = original
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=20, help="Usuarios registrados para el benchmark")
+    parser.add_argument("--logins", type=int, default=100, help="Logins por modo")
+    parser.add_argument("--concurrencia", type=int, default=10, help="Logins simultáneos")
+    asyncio.run(main(parser.parse_args()))
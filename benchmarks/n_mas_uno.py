@@ -0,0 +1,133 @@
+"""
+Recorre todos los endpoints de la API con el detector de N+1 en modo "error"
+(DETECTOR_N1=error) sobre los datos iniciales ampliados, y termina con código 1
+si alguna petición repite una sentencia más de DETECTOR_N1_UMBRAL veces, falla
+con un 500 o si hay rutas de la aplicación que el recorrido no visita.
+tests/test_n_mas_uno.py hace el mismo recorrido en las pruebas.
+
+Uso:
+    python -m benchmarks.n_mas_uno
+    PERFIL_DIRECTORIO=perfiles python -m benchmarks.n_mas_uno   # guarda además el perfil de cada petición
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import os
+import sys
+import tempfile
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+os.environ.setdefault("DETECTOR_N1", "error")
+
+from fastapi.testclient import TestClient
+
+import main
+from app import metricas, perfilador
+
+# Productos que se añaden a la lista 1 para que tenga más productos que el umbral
+NOMBRES_LISTA = ["Lechuga", "Jugo de Naranja", "Pollo", "Pan de Molde", "Helado", "Chocolate",
+                 "Detergente", "Camiseta", "Pera", "Tomate", "Zumo de Uva", "Yogurt", "Carne de Res"]
+
+CSV_IMPORTACION = "nombre,precio,supermercado,categoria\n" + "".join(
+    f"Importado {i},{1 + i / 10},Aldi,Frutas\n" for i in range(20)
+)
+
+# (método, url, argumentos de la petición), en orden: las últimas borran datos
+PASOS = [
+    ("post", "/listas_compra/1/productos", {"json": [{"nombre_producto": nombre, "cantidad": 1} for nombre in NOMBRES_LISTA]}),
+    ("get", "/productos/", {}),
+    ("get", "/productos/?limit=5&formato=ndjson", {}),
+    ("get", "/productos/autocompletar?q=ma", {}),
+    ("get", "/productos/buscar?supermercado_id=2&categoria_id=1", {}),
+    ("get", "/productos/ordenados?orden=precio&limit=10", {}),
+    ("get", "/productos/ordenados?orden=nombre", {}),
+    ("get", "/productos/filtrar/precio?min_precio=0&max_precio=10", {}),
+    ("get", "/productos/1/historial", {}),
+    ("get", "/supermercados/", {}),
+    ("get", "/supermercados/buscar/1", {}),
+    ("get", "/supermercados/listas/1", {}),
+    ("get", "/categorias/", {}),
+    ("get", "/categorias/buscar/1", {}),
+    ("get", "/listas_compra/", {}),
+    ("get", "/listas_compra/1", {}),
+    ("get", "/listas_compra/1/productos", {}),
+    ("get", "/listas_compra/1/comparar?tiendas=2", {}),
+    ("get", "/usuarios/", {}),
+    ("post", "/usuarios/registrar", {"json": {"username": "perfil", "password": "perfil", "nombre": "Perfil", "apellido": "N1"}}),
+    ("post", "/usuarios/login", {"json": {"username": "perfil", "password": "perfil", "nombre": "Perfil", "apellido": "N1"}}),
+    ("post", "/usuarios/logout", {}),
+    ("post", "/supermercados/nuevo", {"json": {"nombre": "Eroski"}}),
+    ("post", "/categorias/nueva", {"json": {"nombre": "Mascotas", "pasillo": 11}}),
+    ("put", "/categorias/actualizar/11", {"json": {"nombre": "Mascotas", "pasillo": 12}}),
+    ("post", "/productos/nuevo", {"json": {"nombre": "Kiwi", "precio": 2.0, "supermercado": "Aldi", "categoria": "Frutas"}}),
+    ("put", "/productos/actualizar-categoria/16", {"json": {"nombre": "Kiwi", "categoria": "Verduras"}}),
+    ("put", "/productos/actualizar-precio/16", {"json": {"precio": 2.5}}),
+    ("get", "/productos/16/historial?agrupar=ninguno", {}),
+    ("put", "/productos/actualizar-precios", {"json": {"modo": "porcentaje", "valor": -10, "supermercado": "Aldi", "devolver_productos": True}}),
+    ("post", "/listas_compra/nueva", {"json": {"supermercado": "Aldi", "usuario": "Juan"}}),
+    ("post", "/listas_compra/1/producto?nombre_producto=Kiwi&cantidad=2", {}),
+    ("delete", "/listas_compra/1/producto/16", {}),
+    ("delete", "/productos/eliminar/16", {}),
+    ("delete", "/categorias/eliminar/11", {}),
+    ("delete", "/categorias/eliminar/10?asincrono=true", {}),
+    ("get", "/borrados/", {}),
+    ("get", "/borrados/{purga}", {}),
+    ("delete", "/listas_compra/eliminar/2", {}),
+    ("delete", "/supermercados/eliminar/1", {}),
+    ("post", "/productos/importar?formato=csv", {"content": CSV_IMPORTACION}),
+    ("get", "/internal/pool", {}),
+    ("get", "/internal/cache", {}),
+    ("get", "/ready", {}),
+    ("get", "/metrics", {}),
+]
+
+
+# Hace las peticiones de PASOS con el cliente y devuelve (método, url, estado) de cada una.
+# Espera la base de datos con los datos iniciales.
+def recorrer(cliente) -> list:
+    resultados = []
+    token = purga = None
+    for metodo, url, argumentos in PASOS:
+        if url == "/usuarios/logout":
+            argumentos = {**argumentos, "headers": {"Authorization": f"Bearer {token}"}}
+        url = url.replace("{purga}", str(purga))
+        respuesta = getattr(cliente, metodo)(url, **argumentos)
+        if url == "/usuarios/login" and respuesta.status_code == 200:
+            token = respuesta.json()["token"]
+        if "asincrono=true" in url and respuesta.status_code == 202:
+            purga = respuesta.json()["id"]
+        resultados.append((metodo.upper(), url, respuesta.status_code))
+    return resultados
+
+
+# Rutas de la aplicación (las del esquema OpenAPI) que no ha visitado ninguna petición
+def rutas_sin_visitar() -> list:
+    visitadas = set(metricas.rutas)
+    return sorted(
+        (metodo.upper(), ruta) for ruta, operaciones in main.app.openapi()["paths"].items()
+        for metodo in operaciones if (metodo.upper(), ruta) not in visitadas
+    )
+
+
+def comprobar() -> int:
+    with TestClient(main.app, raise_server_exceptions=False) as cliente:
+        resultados = recorrer(cliente)
+    for metodo, url, estado in resultados:
+        print(f"{estado}  {metodo:<7}{url}")
+    fallos = sum(estado >= 500 for _, _, estado in resultados)
+    sin_visitar = rutas_sin_visitar()
+
+    print()
+    for metodo, ruta, forma, veces in perfilador.infracciones:
+        print(f"N+1 en {metodo} {ruta} ({veces} veces): {forma}")
+    for metodo, ruta in sin_visitar:
+        print(f"Sin visitar: {metodo} {ruta}")
+    print(f"{len(PASOS)} peticiones, {fallos} errores 5xx, {len(perfilador.infracciones)} N+1, "
+          f"{len(sin_visitar)} rutas sin visitar (umbral {perfilador.UMBRAL_N1}).")
+    return 1 if fallos or perfilador.infracciones or sin_visitar else 0
+
+
+if __name__ == "__main__":
+    sys.exit(comprobar())
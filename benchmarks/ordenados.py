@@ -0,0 +1,109 @@
+"""
+Compara la latencia de las consultas por precio y de las páginas ordenadas
+entre la consulta SQL y el índice ordenado en memoria (INDICE_ORDENADO).
+
+Uso:
+    python -m benchmarks.ordenados --productos 100000 --peticiones 200
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+# Sin caducidad: se mide el índice, no su reconstrucción
+os.environ.setdefault("INDICES_VENTANA", "0")
+
+import httpx
+from sqlalchemy import insert
+
+from app import models
+from app.db.database import SessionLocal, engine
+from app.db.iniciar_db import cargar_bd
+from app.db.migraciones import aplicar_migraciones
+from app.indices.ordenados import indices_ordenados
+from app.indices.refresco import refresco_ordenados
+from app.paginacion import codificar_cursor
+
+
+# Crea las tablas, los datos iniciales y productos con precios aleatorios hasta llegar a num_productos
+def preparar_datos(num_productos: int, semilla: int):
+    aplicar_migraciones(engine)
+    aleatorio = random.Random(semilla)
+    with SessionLocal() as db:
+        cargar_bd(db)
+        existentes = db.query(models.Producto).count()
+        if existentes < num_productos:
+            db.execute(insert(models.Producto), [
+                {
+                    "nombre": f"Producto {aleatorio.randint(1, num_productos)}",
+                    "precio": round(aleatorio.uniform(0.5, 100), 2),
+                    "supermercado_id": 1 + i % 10,
+                    "categoria_id": 1 + i % 10,
+                }
+                for i in range(existentes, num_productos)
+            ])
+            db.commit()
+    refresco_ordenados.reconstruir()
+
+
+# Milisegundos por petición (mediana y p99), una detrás de otra
+async def medir(cliente, urls: list) -> tuple:
+    await cliente.get(urls[0])  # calentamiento
+    tiempos = []
+    for url in urls:
+        inicio = time.perf_counter()
+        respuesta = await cliente.get(url)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        respuesta.raise_for_status()
+    tiempos.sort()
+    return statistics.median(tiempos), tiempos[int(len(tiempos) * 0.99) - 1]
+
+
+async def main(args):
+    import main as api
+
+    preparar_datos(args.productos, args.semilla)
+    aleatorio = random.Random(args.semilla)
+
+    # Rangos estrechos (unas decenas de productos), páginas a mitad del listado y top-k
+    rangos = []
+    paginas = []
+    for _ in range(args.peticiones):
+        minimo = round(aleatorio.uniform(0.5, 99), 2)
+        rangos.append(f"/productos/filtrar/precio?min_precio={minimo}&max_precio={minimo + args.ancho}")
+        cursor = codificar_cursor([round(aleatorio.uniform(0.5, 100), 2), aleatorio.randint(1, args.productos)])
+        paginas.append(f"/productos/ordenados?orden=precio&limit=50&after={cursor}")
+    casos = {
+        "rango de precios": rangos,
+        "página por precio": paginas,
+        "10 más baratos": ["/productos/ordenados?orden=precio&limit=10"] * args.peticiones,
+        "10 primeros por nombre": ["/productos/ordenados?orden=nombre&limit=10"] * args.peticiones,
+    }
+
+    transporte = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        print(f"{'consulta':<26}{'SQL p50':>10}{'SQL p99':>10}{'índice p50':>12}{'índice p99':>12}  (ms)")
+        for nombre, urls in casos.items():
+            indices_ordenados.activo = False
+            sql = await medir(cliente, urls)
+            indices_ordenados.activo = True
+            indice = await medir(cliente, urls)
+            print(f"{nombre:<26}{sql[0]:>10.2f}{sql[1]:>10.2f}{indice[0]:>12.2f}{indice[1]:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100000, help="Número de productos en la base de datos")
+    parser.add_argument("--peticiones", type=int, default=200, help="Peticiones por consulta y modo")
+    parser.add_argument("--ancho", type=float, default=0.05, help="Ancho de los rangos de precio")
+    parser.add_argument("--semilla", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""
+Comprueba el reparto de peticiones entre la base de datos primaria y la réplica
+de lectura con dos bases de datos SQLite locales: la réplica es una copia de la
+primaria hecha al arrancar y no recibe los cambios posteriores, como una réplica
+con retraso. Termina con código 1 si alguna comprobación falla.
+
+- Las lecturas van a la réplica y las escrituras a la primaria.
+- Quien acaba de escribir lee de la primaria durante DB_LECTURA_TRAS_ESCRITURA
+  segundos; los demás clientes siguen leyendo de la réplica.
+- Las decisiones aparecen en /metrics (api_bd_enrutado_total).
+
+Uso:
+    python -m benchmarks.replica
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+_directorio = tempfile.mkdtemp()
+PRIMARIA = os.path.join(_directorio, "primaria.db")
+REPLICA = os.path.join(_directorio, "replica.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARIA}"
+os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{PRIMARIA}"
+os.environ["DATABASE_REPLICA_ASYNC_URL"] = f"sqlite+aiosqlite:///{REPLICA}"
+os.environ.setdefault("DB_LECTURA_TRAS_ESCRITURA", "1")
+
+from fastapi.testclient import TestClient
+
+import main
+from app.db.replica import COOKIE_ESCRITURA, DB_LECTURA_TRAS_ESCRITURA
+
+NOMBRE = "Solo en la primaria"
+
+
+# Copia la primaria en la réplica
+def replicar():
+    with sqlite3.connect(PRIMARIA) as origen, sqlite3.connect(REPLICA) as destino:
+        origen.backup(destino)
+
+
+def nombres_supermercados(cliente, formato: str = "json") -> set:
+    respuesta = cliente.get(f"/supermercados/?formato={formato}")
+    if formato == "ndjson":
+        return {json.loads(linea)["nombre"] for linea in respuesta.text.splitlines()}
+    return {supermercado["nombre"] for supermercado in respuesta.json()}
+
+
+def comprobar() -> int:
+    fallos = 0
+
+    def resultado(descripcion: str, correcto: bool):
+        nonlocal fallos
+        fallos += not correcto
+        print(f"{'OK   ' if correcto else 'FALLO'}  {descripcion}")
+
+    with TestClient(main.app) as escritor:
+        otro = TestClient(main.app)  # otro cliente, sin las cookies del primero
+        replicar()
+        resultado("Sin escrituras, la réplica responde igual que la primaria", "Aldi" in nombres_supermercados(otro))
+
+        respuesta = escritor.post("/supermercados/nuevo", json={"nombre": NOMBRE})
+        resultado("La escritura va a la primaria y devuelve la cookie de escritura reciente",
+                  respuesta.status_code == 200 and COOKIE_ESCRITURA in respuesta.cookies)
+        resultado("Quien ha escrito lee de la primaria y ve su cambio", NOMBRE in nombres_supermercados(escritor))
+        resultado("Otro cliente lee de la réplica, que aún no tiene el cambio", NOMBRE not in nombres_supermercados(otro))
+        resultado("El NDJSON de otro cliente también sale de la réplica", NOMBRE not in nombres_supermercados(otro, "ndjson"))
+
+        time.sleep(DB_LECTURA_TRAS_ESCRITURA + 0.1)
+        resultado("Pasado el plazo, quien escribió vuelve a leer de la réplica", NOMBRE not in nombres_supermercados(escritor))
+
+        replicar()
+        resultado("Cuando la réplica se pone al día, todos ven el cambio", NOMBRE in nombres_supermercados(otro))
+
+        metricas = otro.get("/metrics").text
+        for destino, motivo in (("replica", "lectura"), ("primaria", "escritura"), ("primaria", "lectura_tras_escritura")):
+            resultado(f"/metrics cuenta las peticiones a la {destino} por {motivo}",
+                      f'destino="{destino}",motivo="{motivo}"' in metricas)
+        resultado("/ready comprueba también la réplica", otro.get("/ready").status_code == 200)
+        resultado("/internal/pool incluye el pool de la réplica", "replica" in otro.get("/internal/pool").json())
+
+    print(f"\n{fallos} comprobaciones fallidas.")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(comprobar())
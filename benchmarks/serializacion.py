@@ -0,0 +1,109 @@
+"""
+Compara la latencia de GET /productos/ (todos los productos) con la serialización
+anterior (objetos del ORM + diccionarios + jsonable_encoder + JSONResponse) y la
+actual (tuplas de columnas + serializador compilado + JSON directo en bytes).
+
+Uso:
+    python -m benchmarks.serializacion --productos 100000 --peticiones 10
+
+Sin DATABASE_URL / DATABASE_ASYNC_URL se usa una base de datos SQLite temporal.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    _ruta = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_ruta}"
+    os.environ["DATABASE_ASYNC_URL"] = f"sqlite+aiosqlite:///{_ruta}"
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app import models
+from app.db.database import SessionLocal, engine, get_db
+from app.db.iniciar_db import cargar_bd
+from app.db.migraciones import aplicar_migraciones
+
+# Productos con su categoría y supermercado como objetos del ORM
+def consulta_productos():
+    return select(models.Producto).options(
+        joinedload(models.Producto.categoria),
+        joinedload(models.Producto.supermercado),
+    )
+
+
+# Respuesta de los listados de productos a partir de objetos del ORM
+def producto_a_dict(item: models.Producto) -> dict:
+    return {
+        "id": item.id,
+        "nombre": item.nombre,
+        "precio": item.precio,
+        "pasillo": item.categoria.pasillo,
+        "categoría": item.categoria.nombre,
+        "supermercado": item.supermercado.nombre,
+    }
+
+
+# Endpoint como estaba antes: objetos del ORM y respuesta por defecto de FastAPI
+app_anterior = FastAPI(default_response_class=JSONResponse)
+
+
+@app_anterior.get("/productos/")
+async def obtener_productos(db: AsyncSession = Depends(get_db)):
+    return [producto_a_dict(item) for item in (await db.execute(consulta_productos())).scalars()]
+
+
+# Crea las tablas, los datos iniciales y productos adicionales hasta llegar a num_productos
+def preparar_datos(num_productos: int):
+    aplicar_migraciones(engine)
+    with SessionLocal() as db:
+        cargar_bd(db)
+        existentes = db.query(models.Producto).count()
+        if existentes < num_productos:
+            db.execute(insert(models.Producto), [
+                {"nombre": f"Producto {i}", "precio": 1 + (i % 5000) / 100, "supermercado_id": 1 + i % 10, "categoria_id": 1 + i % 10}
+                for i in range(existentes, num_productos)
+            ])
+            db.commit()
+
+
+# Milisegundos por petición (una detrás de otra) y tamaño de la respuesta
+async def medir(app, peticiones: int) -> tuple:
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=None) as cliente:
+        respuesta = await cliente.get("/productos/")  # calentamiento
+        tiempos = []
+        for _ in range(peticiones):
+            inicio = time.perf_counter()
+            (await cliente.get("/productos/")).raise_for_status()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), min(tiempos), len(respuesta.content), respuesta.json()
+
+
+async def main(args):
+    import main as api
+
+    preparar_datos(args.productos)
+    anterior = await medir(app_anterior, args.peticiones)
+    actual = await medir(api.app, args.peticiones)
+    assert anterior[3] == actual[3], "Las dos respuestas deben tener el mismo contenido"
+
+    print(f"GET /productos/ con {len(actual[3])} productos")
+    print(f"{'versión':<10}{'p50 ms':>10}{'mín ms':>10}{'bytes':>12}")
+    for nombre, (p50, minimo, tamano, _) in [("anterior", anterior), ("actual", actual)]:
+        print(f"{nombre:<10}{p50:>10.1f}{minimo:>10.1f}{tamano:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--productos", type=int, default=100000, help="Número de productos en la base de datos")
+    parser.add_argument("--peticiones", type=int, default=10, help="Peticiones por versión")
+    asyncio.run(main(parser.parse_args()))
@@ -1,27 +1,55 @@
+import time
+INICIO_IMPORTACION = time.perf_counter()
+
+import os
 from fastapi import FastAPI, Request
 import uvicorn
 from app import models
-from app.routers import producto, categoria, lista_compra, supermercado, usuario
-from app.db.iniciar_db import *
-from app.db.database import *
-from fastapi.responses import JSONResponse
-from app.exceptions import NotFoundException, UnauthorizedException, ForbiddenException, BadRequestException, InternalServerErrorException
+from app.routers import producto, categoria, lista_compra, supermercado, usuario, interno, salud, metricas, borrados
+from app.metricas import MiddlewareMetricas
+from app.perfilador import PERFILADOR_ACTIVO, MiddlewarePerfilador
+from app.db.replica import SQLALCHEMY_REPLICA_ASYNC_URL, MiddlewareLecturaTrasEscritura
+from app.routers.salud import estado_arranque
+from app.db.iniciar_db import cargar_bd
+from app.db.database import SessionLocal, engine
+from app.db.migraciones import aplicar_migraciones, comprobar_version
+from app.indices.ordenados import indices_ordenados
+from app.indices.precios import matriz_precios
+from app.indices.refresco import refresco_autocompletar, refresco_matriz, refresco_ordenados
+from fastapi.responses import JSONResponse, Response
+from app.respuestas import RespuestaJSON
+from app.exceptions import NotFoundException, UnauthorizedException, ForbiddenException, BadRequestException, InternalServerErrorException, NotModifiedException, ServiceUnavailableException
 
-#Función para crear las tablas en la base de datos
-def create_tables():
-    try:
-        Base.metadata.create_all(bind=engine)
-        print("Tablas creadas con éxito.")
-    except Exception as e:
-        print(f"Error al crear las tablas: {e}")
+# Modo de arranque de cada worker:
+# - "migrar": aplica las migraciones y carga los datos iniciales al arrancar (desarrollo).
+# - "verificar": solo comprueba la versión del esquema; las migraciones y los datos
+#   se aplican antes con python -m app.db.comandos migrar / sembrar.
+MODO_ARRANQUE = os.getenv("MODO_ARRANQUE", "migrar")
 
-create_tables()
+#Función para crear o actualizar las tablas en la base de datos.
+# Si una migración falla, el error llega al arranque y el worker no arranca con el esquema a medias.
+def create_tables():
+    version = aplicar_migraciones(engine)
+    print(f"Esquema de la base de datos en la versión {version}.")
+    return version
 
 app = FastAPI(
     title="API de Supermercados",
     description="API para gestionar productos, supermercados, categorías y listas de compra.",
+    default_response_class=RespuestaJSON,
 )
 
+# Latencia, tamaño, estado y coste en SQL de cada petición, expuestos en /metrics
+app.add_middleware(MiddlewareMetricas)
+
+# Detector de N+1 y perfil de sentencias SQL por petición (solo en desarrollo y pruebas)
+if PERFILADOR_ACTIVO:
+    app.add_middleware(MiddlewarePerfilador)
+
+# Con réplica de lectura, cookie que mantiene en la primaria las lecturas de quien acaba de escribir
+if SQLALCHEMY_REPLICA_ASYNC_URL:
+    app.add_middleware(MiddlewareLecturaTrasEscritura)
+
 # Manejo global de excepciones
 @app.exception_handler(NotFoundException)
 async def not_found_exception_handler(request: Request, exc: NotFoundException):
@@ -58,6 +86,22 @@ async def internal_server_error_exception_handler(request: Request, exc: Interna
         content={"detail": exc.detail}
     )
 
+@app.exception_handler(ServiceUnavailableException)
+async def service_unavailable_exception_handler(request: Request, exc: ServiceUnavailableException):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers=exc.headers
+    )
+
+# Respuesta 304 de los GET condicionales (sin cuerpo)
+@app.exception_handler(NotModifiedException)
+async def not_modified_exception_handler(request: Request, exc: NotModifiedException):
+    return Response(
+        status_code=exc.status_code,
+        headers=exc.headers
+    )
+
 # Captura cualquier otra excepción (500 Internal Server Error)
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
@@ -70,15 +114,40 @@ async def generic_exception_handler(request: Request, exc: Exception):
 # Llamar a la función cuando la aplicación inicie
 @app.on_event("startup")
 def startup_event():
-    db = SessionLocal()
-    cargar_bd(db)
-    db.close()
+    if MODO_ARRANQUE == "verificar":
+        version = comprobar_version(engine)
+    else:
+        version = create_tables()
+
+    if MODO_ARRANQUE != "verificar":
+        with SessionLocal() as db:
+            cargar_bd(db)
+    # Construir el índice de autocompletado con los nombres de todos los productos
+    refresco_autocompletar.reconstruir()
+    # Índices ordenados por precio y por nombre, si están activos
+    if indices_ordenados.activo:
+        refresco_ordenados.reconstruir()
+    # Matriz de precios por nombre de producto y supermercado para el comparador de listas
+    if matriz_precios.activo:
+        refresco_matriz.reconstruir()
+
+    estado_arranque.update(
+        listo=True,
+        modo=MODO_ARRANQUE,
+        version_esquema=version,
+        segundos_hasta_listo=round(time.perf_counter() - INICIO_IMPORTACION, 3),
+    )
+    print(f"Worker listo en {estado_arranque['segundos_hasta_listo']} s desde la importación ({MODO_ARRANQUE}).")
 
 app.include_router(usuario.router)
 app.include_router(supermercado.router)
 app.include_router(categoria.router)
 app.include_router(producto.router)
 app.include_router(lista_compra.router)
+app.include_router(interno.router)
+app.include_router(salud.router)
+app.include_router(metricas.router)
+app.include_router(borrados.router)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", port=8000, reload=True)
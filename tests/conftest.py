@@ -0,0 +1,84 @@
+import os
+import tempfile
+
+# La configuración se lee al importar la aplicación: base de datos SQLite temporal
+# (el motor asíncrono la abre con aiosqlite), detector de N+1 en modo error y hashes rápidos
+_directorio = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'pruebas.db')}"
+os.environ["DETECTOR_N1"] = "error"
+os.environ["SECRET_KEY"] = "clave-de-pruebas"
+os.environ["PASSWORD_ITERACIONES"] = "1000"
+
+import pytest
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+
+import main
+from app import models, perfilador
+from app.cache import cache_categorias, cache_credenciales, cache_supermercados, cache_usuarios
+from app.db.database import SessionLocal, async_engine, engine
+from app.db.migraciones import version_esquema
+
+
+# Borra todas las tablas; el arranque de la aplicación las vuelve a crear con los datos iniciales
+def reiniciar_bd():
+    models.Base.metadata.drop_all(engine)
+    version_esquema.drop(engine, checkfirst=True)
+    for cache in (cache_supermercados, cache_categorias, cache_usuarios, cache_credenciales):
+        cache.invalidar()
+    perfilador.infracciones.clear()
+
+
+# Cliente de la API sobre una base de datos recién creada con los datos iniciales
+@pytest.fixture
+def cliente():
+    reiniciar_bd()
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+# Sesión síncrona para preparar y comprobar datos directamente en la base de datos
+@pytest.fixture
+def db(cliente):
+    with SessionLocal() as db:
+        yield db
+
+
+# Base de datos recién creada con los datos iniciales, sin arrancar la aplicación
+@pytest.fixture
+def datos_iniciales():
+    from app.db.iniciar_db import cargar_bd
+    from app.db.migraciones import aplicar_migraciones
+
+    reiniciar_bd()
+    aplicar_migraciones(engine)
+    with SessionLocal() as db:
+        cargar_bd(db)
+
+
+# Cliente sobre una base de datos con datos sintéticos (sin los datos iniciales) y estadísticas del planificador
+@pytest.fixture
+def cliente_sintetico():
+    from app.db.migraciones import aplicar_migraciones
+    from app.db.sintetico import generar
+
+    reiniciar_bd()
+    aplicar_migraciones(engine)
+    generar(engine, supermercados=20, productos=2000, ofertas=4, usuarios=200, listas=400, productos_lista=3000, historial=2)
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("ANALYZE")
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+# Sentencias (SQL, parámetros) que ejecuta el motor asíncrono durante la prueba
+@pytest.fixture
+def sentencias():
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capturar)
+    yield capturadas
+    event.remove(async_engine.sync_engine, "before_cursor_execute", capturar)
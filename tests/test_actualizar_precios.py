@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import func, select
+from app import models
+from app.indices.ordenados import indices_ordenados
+from app.indices.precios import matriz_precios
+from app.indices.refresco import refresco_ordenados
+
+URL = "/productos/actualizar-precios"
+
+
+def precios(db) -> dict:
+    db.expire_all()
+    return dict(db.execute(select(models.Producto.id, models.Producto.precio)).all())
+
+
+def historial(db) -> dict:
+    return dict(db.execute(
+        select(models.HistorialPrecio.producto_id, func.count()).group_by(models.HistorialPrecio.producto_id)
+    ).all())
+
+
+def actualizar(cliente, **cambio):
+    return cliente.put(URL, json=cambio)
+
+
+# Solo cambian los productos filtrados; el resto queda igual
+def cambios(antes: dict, despues: dict) -> dict:
+    return {id: precio for id, precio in despues.items() if precio != antes[id]}
+
+
+@pytest.mark.parametrize("cambio, esperados", [
+    # Manzana es el único producto de Carrefour en Frutas
+    (dict(modo="absoluto", valor=3.004, supermercado="Carrefour", categoria="Frutas"), {1: 3.0}),
+    (dict(modo="porcentaje", valor=-10, supermercado="Carrefour"), {1: 9.45, 4: 2.25, 7: 4.05, 10: 13.5, 13: 4.95}),
+    (dict(modo="diferencia", valor=-1, categoria="Verduras"), {2: 2.0, 12: 3.0}),
+    (dict(modo="diferencia", valor=0.5, min_precio=12, max_precio=15), {10: 15.5, 11: 12.5}),
+    # No bajan de 0
+    (dict(modo="diferencia", valor=-2, ids=[4, 6, 9]), {4: 0.5, 6: 0.0, 9: 0.0}),
+    (dict(modo="porcentaje", valor=-150, ids=[1, 2]), {1: 0.0, 2: 0.0}),
+])
+def test_modos_y_filtros(cliente, db, cambio, esperados):
+    antes, historial_antes = precios(db), historial(db)
+
+    respuesta = actualizar(cliente, **cambio, devolver_productos=True)
+
+    assert respuesta.status_code == 200
+    despues = precios(db)
+    assert cambios(antes, despues) == esperados
+    assert respuesta.json()["actualizados"] == len(esperados)
+    assert {p["id"]: p["precio"] for p in respuesta.json()["productos"]} == esperados
+    # Una fila de historial por producto cambiado, con el precio nuevo
+    assert {id: n - historial_antes.get(id, 0) for id, n in historial(db).items() if n != historial_antes.get(id, 0)} == \
+        dict.fromkeys(esperados, 1)
+    ultimos = dict(db.execute(
+        select(models.HistorialPrecio.producto_id, models.HistorialPrecio.precio)
+        .where(models.HistorialPrecio.producto_id.in_(esperados))
+        .order_by(models.HistorialPrecio.id)
+    ).all())
+    assert ultimos == esperados
+
+
+def test_todos_es_obligatorio_sin_filtros(cliente, db):
+    antes = precios(db)
+    assert actualizar(cliente, modo="diferencia", valor=1).status_code == 400
+    assert precios(db) == antes
+
+    respuesta = actualizar(cliente, modo="diferencia", valor=1, todos=True)
+    assert respuesta.json() == {"actualizados": len(antes)}
+    assert precios(db) == {id: round(precio + 1, 2) for id, precio in antes.items()}
+
+
+@pytest.mark.parametrize("cambio, estado", [
+    (dict(modo="absoluto", valor=-1, ids=[1]), 400),
+    (dict(modo="multiplicar", valor=2, ids=[1]), 400),
+    (dict(modo="absoluto", valor=1, supermercado="No existe"), 404),
+    (dict(modo="absoluto", valor=1, categoria="No existe"), 404),
+])
+def test_errores(cliente, db, cambio, estado):
+    antes = precios(db)
+    assert actualizar(cliente, **cambio).status_code == estado
+    assert precios(db) == antes
+
+
+# El índice ordenado y la matriz del comparador de este worker ven los precios nuevos
+def test_actualiza_indices_en_memoria(cliente, db, monkeypatch):
+    monkeypatch.setattr(indices_ordenados, "activo", True)
+    refresco_ordenados.reconstruir()
+    try:
+        assert actualizar(cliente, modo="absoluto", valor=99.99, ids=[1, 4]).status_code == 200
+
+        assert list(indices_ordenados.precio.rango(99.99, 99.99)) == [1, 4]
+        assert 1 not in indices_ordenados.precio.rango(10.5, 10.5)
+        supermercados = matriz_precios.comparar([("Manzana", 1), ("Leche", 2)], 1)["supermercados"]
+        assert supermercados[0]["supermercado_id"] == 1 and supermercados[0]["total"] == 299.97
+    finally:
+        indices_ordenados.reconstruir([])
+        refresco_ordenados.construido = None
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import event, select
+from app import models
+from app.db.database import async_engine
+from app.db.totales import sumar_a_lista
+
+URL = "/listas_compra/1/productos"
+
+
+# {producto_id: (cantidad, precio)} de la lista 1
+def productos_lista(db) -> dict:
+    db.expire_all()
+    return {
+        producto_id: (cantidad, round(precio, 2))
+        for producto_id, cantidad, precio in db.execute(
+            select(models.ProductoLista.producto_id, models.ProductoLista.cantidad, models.ProductoLista.precio)
+            .where(models.ProductoLista.lista_compra_id == 1)
+        )
+    }
+
+
+def test_estado_de_cada_producto(cliente, db):
+    antes = productos_lista(db)
+
+    respuesta = cliente.post(URL, json=[
+        {"nombre_producto": "Leche", "cantidad": 2},
+        {"nombre_producto": "No existe", "cantidad": 1},
+        {"nombre_producto": "Manzana", "cantidad": 5},
+        {"nombre_producto": "Pollo", "cantidad": 1},
+    ])
+
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"agregados": 2, "productos": [
+        {"producto": "Leche", "estado": "agregado"},
+        {"producto": "No existe", "estado": "no encontrado"},
+        {"producto": "Manzana", "estado": "ya en la lista"},
+        {"producto": "Pollo", "estado": "agregado"},
+    ]}
+    # La Manzana conserva su cantidad
+    assert productos_lista(db) == {**antes, 4: (2, 5.0), 5: (1, 6.0)}
+
+
+# El mismo producto dos veces en la petición solo se agrega la primera
+def test_producto_repetido_en_la_peticion(cliente, db):
+    respuesta = cliente.post(URL, json=[
+        {"nombre_producto": "Leche", "cantidad": 2},
+        {"nombre_producto": "Leche", "cantidad": 3},
+    ])
+
+    assert respuesta.json() == {"agregados": 1, "productos": [
+        {"producto": "Leche", "estado": "agregado"},
+        {"producto": "Leche", "estado": "ya en la lista"},
+    ]}
+    assert productos_lista(db)[4] == (2, 5.0)
+
+
+@pytest.mark.parametrize("productos, estado", [
+    ([{"nombre_producto": "Leche", "cantidad": 0}], 422),
+    ([{"nombre_producto": "Leche", "cantidad": 1}, {"nombre_producto": "Pollo", "cantidad": -1}], 422),
+    ([{"nombre_producto": "Leche"}], 422),
+])
+def test_cantidad_no_valida(cliente, db, productos, estado):
+    antes = productos_lista(db)
+    assert cliente.post(URL, json=productos).status_code == estado
+    assert productos_lista(db) == antes
+
+
+def test_lista_no_encontrada(cliente):
+    assert cliente.post("/listas_compra/99/productos", json=[{"nombre_producto": "Leche", "cantidad": 1}]).status_code == 404
+
+
+# Si otra petición agrega uno de los productos a la vez, no se agrega ninguno
+def test_todo_en_una_transaccion(cliente, db):
+    db.add(models.ProductoLista(lista_compra_id=1, producto_id=5, cantidad=1, precio=6.0))
+    db.execute(sumar_a_lista(1, 1, 6.0))
+    db.commit()
+    antes = productos_lista(db)
+    lista = db.get(models.ListaCompra, 1)
+    totales = (lista.num_productos, lista.total)
+
+    # La consulta de los productos que ya están en la lista no ve el de la otra petición
+    def sin_ver_el_otro(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT producto_lista.producto_id"):
+            parameters = (-1, *parameters[1:])
+        return statement, parameters
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", sin_ver_el_otro, retval=True)
+    try:
+        respuesta = cliente.post(URL, json=[
+            {"nombre_producto": "Leche", "cantidad": 2},
+            {"nombre_producto": "Pollo", "cantidad": 1},
+        ])
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", sin_ver_el_otro)
+
+    assert respuesta.status_code == 400
+    assert productos_lista(db) == antes
+    db.refresh(lista)
+    assert (lista.num_productos, lista.total) == totales
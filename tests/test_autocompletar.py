@@ -0,0 +1,82 @@
+import time
+from sqlalchemy import delete, insert, select
+from app import models
+from app.indices.autocompletar import IndiceAutocompletar, normalizar
+from app.indices.refresco import refresco_autocompletar
+
+
+def indice(*nombres) -> IndiceAutocompletar:
+    resultado = IndiceAutocompletar()
+    resultado.reconstruir(nombres)
+    return resultado
+
+
+def nombres(resultados: list) -> list:
+    return [resultado["nombre"] for resultado in resultados]
+
+
+def test_sin_tildes_ni_mayusculas():
+    assert normalizar("Lácteos ÑAME Crème") == "lacteos name creme"
+    i = indice("Lácteos", "Pan de Molde", "CAFÉ")
+    assert nombres(i.buscar("lac")) == ["Lácteos"]
+    assert nombres(i.buscar("LÁC")) == ["Lácteos"]
+    assert nombres(i.buscar("cafe")) == ["CAFÉ"]
+    assert nombres(i.buscar("molde PAN")) == ["Pan de Molde"]
+    assert i.buscar("xyz") == [] and i.buscar("  ") == []
+
+
+# Primero los que empiezan por lo escrito y después los más cortos
+def test_orden_por_prefijo_y_longitud():
+    i = indice("Zumo de Uva", "Uva Blanca", "Uvas", "Pan", "Zumo de Uva Roja")
+    assert nombres(i.buscar("uva")) == ["Uvas", "Uva Blanca", "Zumo de Uva", "Zumo de Uva Roja"]
+    assert nombres(i.buscar("uva", limite=2)) == ["Uvas", "Uva Blanca"]
+
+
+# Un nombre de varios productos cuenta cuántos lo tienen y sale al quitar el último
+def test_agregar_y_quitar():
+    i = indice("Leche", "Leche")
+    assert i.buscar("le") == [{"nombre": "Leche", "productos": 2}]
+
+    i.agregar("Leche Entera")
+    i.agregar("Lentejas")
+    assert nombres(i.buscar("le")) == ["Leche", "Lentejas", "Leche Entera"]
+    assert nombres(i.buscar("entera")) == ["Leche Entera"]
+
+    i.quitar("Leche")
+    assert i.buscar("leche")[0] == {"nombre": "Leche", "productos": 1}
+    i.quitar("Leche")
+    i.quitar("Leche Entera")
+    assert nombres(i.buscar("le")) == ["Lentejas"]
+    assert i.buscar("entera") == []
+    i.quitar("No existe")
+    assert len(i) == 1
+
+
+def test_altas_y_bajas_de_la_api(cliente, db):
+    assert cliente.post("/productos/nuevo", json={
+        "nombre": "Ñoquis", "precio": 2.0, "supermercado": "Carrefour", "categoria": "Frutas",
+    }).status_code == 200
+    assert nombres(cliente.get("/productos/autocompletar?q=noq").json()) == ["Ñoquis"]
+
+    id = db.scalar(select(models.Producto.id).where(models.Producto.nombre == "Ñoquis"))
+    assert cliente.delete(f"/productos/eliminar/{id}").status_code == 200
+    assert cliente.get("/productos/autocompletar?q=noq").json() == []
+
+
+# Los productos creados o borrados por otro worker llegan al caducar el índice
+def test_indice_caduca(cliente, db, monkeypatch):
+    db.execute(insert(models.Producto).values(nombre="Kiwi", precio=1.0, supermercado_id=1, categoria_id=1))
+    db.execute(delete(models.Producto).where(models.Producto.nombre == "Manzana"))
+    db.commit()
+    assert cliente.get("/productos/autocompletar?q=kiw").json() == []
+    assert nombres(cliente.get("/productos/autocompletar?q=manz").json()) == ["Manzana"]
+
+    reconstrucciones = refresco_autocompletar.reconstrucciones
+    monkeypatch.setattr(refresco_autocompletar, "construido", refresco_autocompletar.construido - refresco_autocompletar.ventana - 1)
+    cliente.get("/productos/autocompletar?q=kiw")  # lanza la reconstrucción
+    limite = time.monotonic() + 5
+    while refresco_autocompletar.reconstrucciones == reconstrucciones and time.monotonic() < limite:
+        time.sleep(0.01)
+
+    assert nombres(cliente.get("/productos/autocompletar?q=kiw").json()) == ["Kiwi"]
+    assert cliente.get("/productos/autocompletar?q=manz").json() == []
@@ -0,0 +1,69 @@
+import time
+from sqlalchemy import func, select
+from app import models
+
+
+# Número de productos y total de cada lista, guardados y recalculados desde producto_lista
+def totales_listas(db) -> tuple:
+    db.expire_all()
+    guardados = {
+        lista.id: (lista.num_productos, round(lista.total, 2))
+        for lista in db.execute(select(models.ListaCompra)).scalars()
+    }
+    recalculados = {
+        lista_id: (num_productos, round(total, 2))
+        for lista_id, num_productos, total in db.execute(
+            select(models.ListaCompra.id, func.count(models.ProductoLista.id), func.coalesce(func.sum(models.ProductoLista.precio), 0))
+            .outerjoin(models.ProductoLista, models.ProductoLista.lista_compra_id == models.ListaCompra.id)
+            .group_by(models.ListaCompra.id)
+        )
+    }
+    return guardados, recalculados
+
+
+def test_eliminar_categoria_descuenta_una_vez_los_totales(cliente, db):
+    # La categoría 7 (Congelados) tiene el Helado, que está en la lista 3 (4 productos, 45.2)
+    assert cliente.delete("/categorias/eliminar/7").status_code == 200
+
+    guardados, recalculados = totales_listas(db)
+    assert guardados == recalculados
+    assert guardados[3] == (3, 20.2)
+    assert db.scalar(select(func.count()).select_from(models.Producto).where(models.Producto.categoria_id == 7)) == 0
+
+
+def test_eliminar_supermercado_borra_sus_listas_y_descuenta_los_totales(cliente, db):
+    assert cliente.delete("/supermercados/eliminar/1").status_code == 200
+
+    guardados, recalculados = totales_listas(db)
+    assert guardados == recalculados
+    assert 1 not in guardados
+    # El Helado y la Camiseta de Carrefour salen de la lista 3 de otro supermercado
+    assert guardados[3] == (2, 11.2)
+    assert db.scalar(select(func.count()).select_from(models.Producto).where(models.Producto.supermercado_id == 1)) == 0
+    huerfanos = select(func.count()).select_from(models.ProductoLista).where(
+        models.ProductoLista.lista_compra_id.not_in(select(models.ListaCompra.id))
+        | models.ProductoLista.producto_id.not_in(select(models.Producto.id))
+    )
+    assert db.scalar(huerfanos) == 0
+
+
+def test_purga_asincrona_termina_con_los_totales_correctos(cliente, db):
+    respuesta = cliente.delete("/supermercados/eliminar/2?asincrono=true")
+    assert respuesta.status_code == 202
+
+    for _ in range(100):
+        purga = cliente.get(f"/borrados/{respuesta.json()['id']}").json()
+        if purga["estado"] not in ("pendiente", "en_curso"):
+            break
+        time.sleep(0.02)
+    assert purga["estado"] == "terminada"
+    assert purga["porcentaje"] == 100.0
+
+    guardados, recalculados = totales_listas(db)
+    assert guardados == recalculados
+    assert db.get(models.Supermercado, 2) is None
+
+
+def test_eliminar_inexistente(cliente):
+    assert cliente.delete("/categorias/eliminar/999").status_code == 404
+    assert cliente.delete("/supermercados/eliminar/999?asincrono=true").status_code == 404
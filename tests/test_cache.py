@@ -0,0 +1,112 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import delete, insert, select
+from app import models
+from app.cache import CacheNombres, cache_supermercados
+from app.db.database import AsyncSessionLocal, SessionLocal, async_engine
+
+
+# Resuelve los nombres en orden con una sesión asíncrona; devuelve los ids y las sentencias de cada uno
+def resolver(cache: CacheNombres, *nombres, comprobar=False) -> list:
+    async def resolver_todos():
+        try:
+            async with AsyncSessionLocal() as db:
+                return [await cache.resolver(db, nombre, comprobar=comprobar) for nombre in nombres]
+        finally:
+            await async_engine.dispose()
+
+    return asyncio.run(resolver_todos())
+
+
+def estadisticas(cache: CacheNombres) -> tuple:
+    return cache.aciertos, cache.fallos, cache.estadisticas()["entradas"]
+
+
+def test_acierto_y_fallo(datos_iniciales, sentencias):
+    cache = CacheNombres(models.Supermercado)
+
+    assert resolver(cache, "Aldi", "Aldi", "Aldi") == [2, 2, 2]
+    assert estadisticas(cache) == (2, 1, 1)
+    assert len(sentencias) == 1
+
+
+# Los nombres que no existen no se guardan: un alta en otro worker se ve al momento
+def test_nombre_no_encontrado(datos_iniciales):
+    cache = CacheNombres(models.Supermercado)
+
+    assert resolver(cache, "Eroski", "Eroski") == [None, None]
+    assert estadisticas(cache) == (0, 2, 0)
+
+    with SessionLocal() as db:
+        db.execute(insert(models.Supermercado).values(nombre="Eroski"))
+        db.commit()
+    assert resolver(cache, "Eroski") == [11]
+
+
+def test_caducidad(datos_iniciales):
+    cache = CacheNombres(models.Supermercado, ttl=0.05)
+
+    assert resolver(cache, "Aldi") == [2]
+    time.sleep(0.1)
+    assert resolver(cache, "Aldi") == [2]
+    assert estadisticas(cache) == (0, 2, 1)
+
+
+def test_capacidad(datos_iniciales):
+    cache = CacheNombres(models.Supermercado, capacidad=2)
+
+    # Lidl es la entrada menos usada cuando entra Gadis
+    resolver(cache, "Aldi", "Lidl", "Aldi", "Gadis", "Aldi", "Lidl")
+    assert estadisticas(cache) == (2, 4, 2)
+
+
+def test_invalidar(datos_iniciales):
+    cache = CacheNombres(models.Supermercado)
+    resolver(cache, "Aldi")
+
+    cache.invalidar()
+
+    assert resolver(cache, "Aldi") == [2]
+    assert estadisticas(cache) == (0, 2, 1)
+
+
+# Otro worker borra la fila o la vuelve a crear con otro id: sin comprobar se devuelve el id
+# guardado; comprobando se busca de nuevo por nombre
+@pytest.mark.parametrize("recrear, esperado", [(False, None), (True, 11)])
+def test_comprobar_tras_borrado_en_otro_worker(datos_iniciales, recrear, esperado):
+    cache = CacheNombres(models.Supermercado)
+    resolver(cache, "Aldi")
+
+    with SessionLocal() as db:
+        db.execute(delete(models.Supermercado).where(models.Supermercado.id == 2))
+        if recrear:
+            db.execute(insert(models.Supermercado).values(nombre="Aldi"))
+        db.commit()
+
+    assert resolver(cache, "Aldi") == [2]
+    assert resolver(cache, "Aldi", comprobar=True) == [esperado]
+    assert resolver(cache, "Aldi") == [esperado]
+
+
+def test_comprobar_acierto(datos_iniciales, sentencias):
+    cache = CacheNombres(models.Supermercado)
+
+    assert resolver(cache, "Aldi", "Aldi", comprobar=True) == [2, 2]
+    assert estadisticas(cache) == (1, 1, 1)
+    assert "supermercado.id = ?" in sentencias[1][0]
+
+
+# Crear un producto con un supermercado que otro worker ha borrado es un 404, no una fila huérfana
+def test_crear_producto_con_supermercado_borrado(cliente, db):
+    producto = {"nombre": "Kiwi", "precio": 2.5, "supermercado": "Aldi", "categoria": "Frutas"}
+    assert cliente.post("/productos/nuevo", json=producto).status_code == 200
+    assert cache_supermercados.estadisticas()["entradas"] == 1
+
+    db.execute(delete(models.Supermercado).where(models.Supermercado.id == 2))
+    db.commit()
+
+    respuesta = cliente.post("/productos/nuevo", json={**producto, "nombre": "Mango"})
+
+    assert respuesta.status_code == 404
+    assert db.scalar(select(models.Producto.id).where(models.Producto.nombre == "Mango")) is None
@@ -0,0 +1,131 @@
+import random
+import time
+import pytest
+from sqlalchemy import insert
+from app import models
+from app.indices import precios
+from app.indices.precios import MatrizPrecios, _busqueda_local, _coste
+from app.indices.refresco import refresco_matriz
+
+# (id, nombre, precio, supermercado_id)
+PRODUCTOS = [
+    (1, "leche", 1.0, 1), (2, "leche", 0.9, 2),
+    (3, "pan", 2.0, 1), (4, "pan", 1.5, 3),
+    (5, "huevos", 3.0, 2), (6, "huevos", 2.5, 3),
+]
+ARTICULOS = [("leche", 2), ("pan", 1), ("huevos", 1), ("caviar", 1)]
+
+
+def matriz(productos=PRODUCTOS) -> MatrizPrecios:
+    resultado = MatrizPrecios()
+    resultado.reconstruir(productos)
+    return resultado
+
+
+def totales(resultado: dict) -> dict:
+    return {s["supermercado_id"]: (s["total"], s["faltan"]) for s in resultado["supermercados"]}
+
+
+def test_comparar_por_supermercado():
+    resultado = matriz().comparar(ARTICULOS, 1)
+
+    assert resultado["no_disponibles"] == ["caviar"]
+    assert totales(resultado) == {1: (4.0, 1), 2: (4.8, 1), 3: (4.0, 1)}
+    assert [s["supermercado_id"] for s in resultado["supermercados"]] == [1, 3, 2]
+    assert resultado["reparto"]["faltan"] == 1 and resultado["reparto"]["total"] == 4.0
+
+
+def test_reparto_entre_dos_tiendas():
+    reparto = matriz().comparar(ARTICULOS, 2)["reparto"]
+
+    assert reparto["exacto"] and reparto["faltan"] == 0 and reparto["total"] == 5.8
+    assert {t["supermercado_id"]: sorted(t["productos"]) for t in reparto["tiendas"]} == {2: ["leche"], 3: ["huevos", "pan"]}
+    assert sum(t["total"] for t in reparto["tiendas"]) == pytest.approx(5.8)
+
+
+@pytest.mark.parametrize("cantidad", [0, -1])
+def test_cantidad_menor_que_uno(cantidad):
+    with pytest.raises(ValueError):
+        matriz().comparar([("leche", cantidad)], 2)
+
+
+# Las tiendas que otra iguala o mejora en todo no cuentan para el número de combinaciones
+def test_columnas_dominadas(monkeypatch):
+    monkeypatch.setattr(precios, "MAXIMO_COMBINACIONES", 1)
+    productos = [(i, nombre, precio * s, s) for s in (1, 2, 3) for i, (nombre, precio) in enumerate([("a", 1.0), ("b", 2.0)], 10 * s)]
+    reparto = matriz(productos).comparar([("a", 1), ("b", 1)], 3)["reparto"]
+    assert reparto["exacto"]
+    assert [t["supermercado_id"] for t in reparto["tiendas"]] == [1]
+    assert reparto["total"] == 3.0
+
+
+# La búsqueda local nunca da un reparto mejor que el exacto, y con pocas tiendas suele dar el mismo
+@pytest.mark.parametrize("semilla", range(20))
+def test_busqueda_local_frente_a_exacto(monkeypatch, semilla):
+    aleatorio = random.Random(semilla)
+    productos, id = [], 0
+    for supermercado in range(1, 9):
+        for articulo in range(12):
+            if aleatorio.random() < 0.7:
+                id += 1
+                productos.append((id, f"p{articulo}", round(aleatorio.uniform(1, 10), 2), supermercado))
+    articulos = [(f"p{articulo}", aleatorio.randint(1, 3)) for articulo in range(12)]
+
+    exacto = matriz(productos).comparar(articulos, 3)["reparto"]
+    monkeypatch.setattr(precios, "MAXIMO_COMBINACIONES", 0)
+    local = matriz(productos).comparar(articulos, 3)["reparto"]
+
+    assert exacto["exacto"] and not local["exacto"]
+    assert len(local["tiendas"]) <= 3
+    assert (local["faltan"], local["total"]) >= (exacto["faltan"], exacto["total"])
+    assert sum(t["total"] for t in local["tiendas"]) == pytest.approx(local["total"], abs=0.05)
+
+
+def test_busqueda_local_mejora_la_eleccion_voraz():
+    # La tienda 0 es la mejor sola, pero las tiendas 1 y 2 juntas son mejores que cualquier pareja con la 0
+    columnas = [(5.0, 5.0, 5.0, 5.0), (1.0, 1.0, 9.0, 9.0), (9.0, 9.0, 1.0, 1.0)]
+    conjunto, coste = _busqueda_local(columnas, [0, 1, 2], 2)
+    assert sorted(conjunto) == [1, 2] and coste == _coste([1.0, 1.0, 1.0, 1.0])
+
+
+def test_cambios_de_celdas():
+    m = matriz(PRODUCTOS + [(7, "leche", 0.8, 1)])
+    leche = lambda: totales(m.comparar([("leche", 1)], 1))
+    assert leche() == {1: (0.8, 0), 2: (0.9, 0)}
+
+    m.cambiar_precio(7, 1.5)  # la celda pasa a ser el otro producto del mismo supermercado
+    assert leche()[1] == (1.0, 0)
+    m.quitar(1)
+    assert leche()[1] == (1.5, 0)
+    m.quitar(7)  # sin productos en la celda, el supermercado deja de venderlo
+    assert leche() == {2: (0.9, 0)}
+    m.quitar(2)  # sin ningún supermercado, el nombre sale de la matriz
+    assert m.comparar([("leche", 1)], 1)["no_disponibles"] == ["leche"]
+
+    m.agregar(8, "leche", 0.7, 9)  # supermercado nuevo: columna nueva
+    assert leche() == {9: (0.7, 0)}
+    assert totales(m.comparar([("pan", 1)], 1)) == {1: (2.0, 0), 3: (1.5, 0)}
+
+
+def test_comparar_rechaza_cantidad_cero(cliente, db):
+    db.execute(insert(models.ProductoLista).values(lista_compra_id=2, producto_id=1, cantidad=0, precio=0))
+    db.commit()
+    assert cliente.get("/listas_compra/2/comparar").status_code == 400
+
+
+# Un producto creado por otro worker entra en el comparador como mucho al caducar la matriz
+def test_matriz_caduca(cliente, db, monkeypatch):
+    url = "/listas_compra/1/comparar"
+    assert totales(cliente.get(url).json())[2] == (6.0, 2)
+    db.execute(insert(models.Producto).values(nombre="Manzana", precio=1.0, supermercado_id=2, categoria_id=1))
+    db.commit()
+    assert totales(cliente.get(url).json())[2] == (6.0, 2)
+
+    reconstrucciones = refresco_matriz.reconstrucciones
+    monkeypatch.setattr(refresco_matriz, "construido", refresco_matriz.construido - refresco_matriz.ventana - 1)
+    assert totales(cliente.get(url).json())[2] == (9.0, 1)
+    limite = time.monotonic() + 5
+    while refresco_matriz.reconstrucciones == reconstrucciones and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert refresco_matriz.vigente()
+    assert totales(cliente.get(url).json())[2] == (9.0, 1)
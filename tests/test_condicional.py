@@ -0,0 +1,34 @@
+from app import condicional
+
+
+def test_etag_y_304(cliente):
+    respuesta = cliente.get("/productos/")
+    etag = respuesta.headers["ETag"]
+
+    repetida = cliente.get("/productos/", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.headers["ETag"] == etag
+
+
+def test_escritura_cambia_el_etag(cliente):
+    etag = cliente.get("/productos/").headers["ETag"]
+
+    nuevo = {"nombre": "Kiwi", "precio": 2.0, "supermercado": "Aldi", "categoria": "Frutas"}
+    assert cliente.post("/productos/nuevo", json=nuevo).status_code == 200
+
+    respuesta = cliente.get("/productos/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+    assert "Kiwi" in {producto["nombre"] for producto in respuesta.json()}
+
+
+# Un worker que no ha visto la escritura deja de responder 304 al cambiar la ventana
+def test_etag_caduca_con_la_ventana(cliente, monkeypatch):
+    assert condicional.ETAG_VENTANA > 0
+    etag = cliente.get("/categorias/").headers["ETag"]
+
+    ahora = condicional.time.time()
+    monkeypatch.setattr(condicional.time, "time", lambda: ahora + condicional.ETAG_VENTANA)
+    respuesta = cliente.get("/categorias/", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
@@ -0,0 +1,47 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from app import models
+
+# Listados y detalles cuyo número de sentencias no debe depender del número de filas
+URLS = [
+    "/productos/",
+    "/productos/ordenados?orden=nombre",
+    "/productos/ordenados?orden=precio",
+    "/productos/filtrar/precio?min_precio=0&max_precio=100",
+    "/productos/buscar?supermercado_id=1&categoria_id=1",
+    "/supermercados/listas/1",
+    "/listas_compra/",
+    "/listas_compra/1",
+    "/listas_compra/1/productos",
+]
+
+
+def contar_sentencias(cliente, sentencias, url: str) -> int:
+    sentencias.clear()
+    assert cliente.get(url).status_code == 200
+    return len(sentencias)
+
+
+# Añade productos del supermercado 1 y la categoría 1, y listas del supermercado 1 con productos
+def ampliar_datos(db, productos: int, listas: int):
+    primero = db.execute(insert(models.Producto).returning(models.Producto.id), [
+        dict(nombre=f"Producto {i}", precio=1 + i % 50, supermercado_id=1, categoria_id=1) for i in range(productos)
+    ]).scalars().all()[0]
+    db.execute(insert(models.ListaCompra), [
+        dict(supermercado_id=1, usuario_id=1 + i % 2, fecha_creacion=datetime.utcnow()) for i in range(listas)
+    ])
+    db.execute(insert(models.ProductoLista), [
+        dict(cantidad=1, precio=1.0, lista_compra_id=1, producto_id=primero + i) for i in range(productos)
+    ])
+    db.commit()
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_sentencias_no_crecen_con_las_filas(cliente, db, sentencias, url):
+    pocas = contar_sentencias(cliente, sentencias, url)
+    ampliar_datos(db, productos=200, listas=50)
+    muchas = contar_sentencias(cliente, sentencias, url)
+
+    assert muchas == pocas
+    assert pocas <= 3
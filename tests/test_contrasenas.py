@@ -0,0 +1,68 @@
+import asyncio
+import hashlib
+import pytest
+from sqlalchemy import insert, select
+from app import models, utils
+from app.cache import cache_credenciales
+
+USUARIO = dict(username="ana789", password="secreta", nombre="Ana", apellido="Gil")
+
+
+def test_hash_y_verificacion():
+    hashed = utils.hash_password("secreta")
+    algoritmo, iteraciones, _, _ = hashed.split("$")
+    assert algoritmo == utils.ALGORITMO and int(iteraciones) == utils.PASSWORD_ITERACIONES
+    assert hashed != utils.hash_password("secreta")  # sal distinta cada vez
+    assert utils.check_password("secreta", hashed)
+    assert not utils.check_password("otra", hashed)
+    assert not utils.check_password("secreta", None)
+    assert not utils.necesita_rehash(hashed)
+    assert utils.necesita_rehash(utils.hash_password("secreta", iteraciones=utils.PASSWORD_ITERACIONES - 1))
+
+
+def test_hash_antiguo():
+    antiguo = hashlib.sha256(b"secreta").hexdigest()
+    assert utils.check_password("secreta", antiguo)
+    assert not utils.check_password("otra", antiguo)
+    assert utils.necesita_rehash(antiguo)
+
+
+# Un hash antiguo y un usuario inexistente hacen el mismo trabajo PBKDF2 que un hash actual
+@pytest.mark.parametrize("hashed", [hashlib.sha256(b"secreta").hexdigest(), None, utils.hash_password("secreta")])
+def test_mismo_trabajo_con_cualquier_hash(monkeypatch, hashed):
+    utils.hash_ficticio()
+    calculos = []
+    pbkdf2 = utils._pbkdf2
+    monkeypatch.setattr(utils, "_pbkdf2", lambda *args: calculos.append(args[2]) or pbkdf2(*args))
+    utils.check_password("secreta", hashed)
+    assert calculos == [utils.PASSWORD_ITERACIONES]
+
+
+def test_login_actualiza_hash_antiguo(cliente, db):
+    db.execute(insert(models.Usuario), [dict(USUARIO, password=hashlib.sha256(b"secreta").hexdigest())])
+    db.commit()
+    credenciales = USUARIO
+
+    assert cliente.post("/usuarios/login", json=credenciales).status_code == 200
+    guardado = db.scalar(select(models.Usuario.password).where(models.Usuario.username == "ana789"))
+    assert guardado.startswith(utils.ALGORITMO + "$") and utils.check_password("secreta", guardado)
+
+    cache_credenciales.invalidar()
+    assert cliente.post("/usuarios/login", json=credenciales).status_code == 200
+    assert cliente.post("/usuarios/login", json=dict(credenciales, password="otra")).status_code == 401
+
+
+def test_registro_guarda_pbkdf2(cliente, db):
+    assert cliente.post("/usuarios/registrar", json=USUARIO).status_code == 200
+    guardado = db.scalar(select(models.Usuario.password).where(models.Usuario.username == "ana789"))
+    assert guardado.startswith(utils.ALGORITMO + "$")
+    assert cliente.post("/usuarios/login", json=USUARIO).status_code == 200
+
+
+# Con la cola de cálculos llena se responde 503 en lugar de esperar
+def test_cola_llena_responde_503(cliente, monkeypatch):
+    monkeypatch.setattr(utils, "_cola_contrasenas", asyncio.Semaphore(0))
+    respuesta = cliente.post("/usuarios/login", json=USUARIO)
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == "1"
+    assert cliente.post("/usuarios/registrar", json=USUARIO).status_code == 503
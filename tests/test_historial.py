@@ -0,0 +1,98 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import insert
+from app import models
+
+URL = "/productos/2/historial"
+ENERO = "desde=2024-01-01T00:00:00&hasta=2024-01-31T23:59:59"
+
+
+# Cambios de precio de la Lechuga; el 1 de enero de 2024 es lunes
+@pytest.fixture
+def historial(db):
+    db.execute(insert(models.HistorialPrecio), [
+        {"producto_id": 2, "fecha": fecha, "precio": precio}
+        for fecha, precio in [
+            (datetime(2023, 12, 20, 10), 1.0),
+            (datetime(2024, 1, 3, 9), 2.0),
+            (datetime(2024, 1, 7, 23, 30), 3.0),
+            (datetime(2024, 1, 8), 2.5),
+            (datetime(2024, 1, 10, 12), 4.0),
+            (datetime(2024, 1, 10, 18), 3.5),
+        ]
+    ])
+    db.commit()
+
+
+def punto(fecha, minimo, maximo, ultimo, cambios) -> dict:
+    return {"fecha": fecha, "minimo": minimo, "maximo": maximo, "ultimo": ultimo, "cambios": cambios}
+
+
+@pytest.mark.parametrize("agrupar, puntos", [
+    # La semana empieza el lunes: el domingo 7 va con el lunes 1 y el lunes 8 abre la siguiente
+    ("semana", [
+        punto("2024-01-01T00:00:00", 2.0, 3.0, 3.0, 2),
+        punto("2024-01-08T00:00:00", 2.5, 4.0, 3.5, 3),
+    ]),
+    ("dia", [
+        punto("2024-01-03T00:00:00", 2.0, 2.0, 2.0, 1),
+        punto("2024-01-07T00:00:00", 3.0, 3.0, 3.0, 1),
+        punto("2024-01-08T00:00:00", 2.5, 2.5, 2.5, 1),
+        punto("2024-01-10T00:00:00", 3.5, 4.0, 3.5, 2),
+    ]),
+    ("mes", [punto("2024-01-01T00:00:00", 2.0, 4.0, 3.5, 5)]),
+])
+def test_serie_agrupada(cliente, historial, agrupar, puntos):
+    respuesta = cliente.get(f"{URL}?{ENERO}&agrupar={agrupar}")
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["puntos"] == puntos
+    # Precio vigente al empezar el intervalo: el último cambio anterior
+    assert respuesta.json()["precio_inicial"] == 1.0
+
+
+def test_serie_sin_agrupar(cliente, historial):
+    respuesta = cliente.get(f"{URL}?desde=2024-01-07T00:00:00&hasta=2024-01-09T00:00:00&agrupar=ninguno")
+
+    assert respuesta.json()["puntos"] == [
+        {"fecha": "2024-01-07T23:30:00", "precio": 3.0},
+        {"fecha": "2024-01-08T00:00:00", "precio": 2.5},
+    ]
+    assert respuesta.json()["precio_inicial"] == 2.0
+
+
+# Las fechas con zona horaria se pasan a UTC
+def test_fechas_con_zona_horaria(cliente, historial):
+    respuesta = cliente.get(f"{URL}?desde=2024-01-08T01:00:00%2B01:00&hasta=2024-01-08T01:00:00%2B01:00&agrupar=ninguno")
+
+    assert respuesta.json()["desde"] == "2024-01-08T00:00:00"
+    assert respuesta.json()["puntos"] == [{"fecha": "2024-01-08T00:00:00", "precio": 2.5}]
+
+
+def test_intervalo_vacio(cliente, historial):
+    respuesta = cliente.get(f"{URL}?desde=2020-01-01T00:00:00&hasta=2020-12-31T00:00:00")
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["puntos"] == [] and respuesta.json()["precio_inicial"] is None
+
+
+def test_producto_no_encontrado(cliente):
+    assert cliente.get(f"/productos/999/historial?{ENERO}").status_code == 404
+
+
+# El historial se conserva al borrar el producto
+def test_producto_borrado(cliente, historial):
+    assert cliente.delete("/productos/eliminar/2").status_code == 200
+
+    respuesta = cliente.get(f"{URL}?{ENERO}&agrupar=mes")
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["puntos"] == [punto("2024-01-01T00:00:00", 2.0, 4.0, 3.5, 5)]
+
+
+@pytest.mark.parametrize("consulta", [
+    "agrupar=anio",
+    "desde=2024-02-01T00:00:00&hasta=2024-01-01T00:00:00",
+])
+def test_peticion_no_valida(cliente, consulta):
+    assert cliente.get(f"{URL}?{consulta}").status_code == 400
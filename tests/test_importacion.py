@@ -0,0 +1,117 @@
+import json
+import pytest
+from sqlalchemy import func, select
+from app import importacion, models
+from app.indices.autocompletar import indice_autocompletar
+
+URL = "/productos/importar"
+
+
+# (nombre, precio, supermercado_id, categoria_id) de los productos creados después de los datos iniciales
+def importados(db) -> list:
+    return db.execute(
+        select(models.Producto.nombre, models.Producto.precio, models.Producto.supermercado_id, models.Producto.categoria_id)
+        .where(models.Producto.id > 15).order_by(models.Producto.id)
+    ).all()
+
+
+def ndjson(*filas) -> str:
+    return "\n".join(fila if isinstance(fila, str) else json.dumps(fila) for fila in filas)
+
+
+def test_csv(cliente, db):
+    historial_antes = db.scalar(select(func.count()).select_from(models.HistorialPrecio))
+    contenido = (
+        "﻿nombre,precio,supermercado,categoria\r\n"
+        "Kiwi,2.5,Carrefour,Frutas\r\n"
+        '"Queso, curado",8,Aldi,Lácteos\r\n'
+        "\r\n"
+        "Agua,0.4,Lidl,Bebidas"
+    )
+
+    respuesta = cliente.post(URL, content=contenido.encode(), headers={"Content-Type": "text/csv"})
+
+    assert respuesta.status_code == 200
+    assert respuesta.json()["insertados"] == 3 and respuesta.json()["errores"] == []
+    assert importados(db) == [("Kiwi", 2.5, 1, 1), ("Queso, curado", 8.0, 2, 4), ("Agua", 0.4, 3, 3)]
+    assert db.scalar(select(func.count()).select_from(models.HistorialPrecio)) == historial_antes + 3
+    assert indice_autocompletar.buscar("kiw", 10) == [{"nombre": "Kiwi", "productos": 1}]
+
+
+def test_ndjson(cliente, db):
+    contenido = ndjson(
+        {"nombre": "Kiwi", "precio": 2.5, "supermercado": "Carrefour", "categoria": "Frutas"},
+        {"categoria": "Bebidas", "supermercado": "Lidl", "precio": "0.4", "nombre": "Agua"},
+    )
+
+    # El formato se deduce del Content-Type
+    respuesta = cliente.post(URL, content=contenido, headers={"Content-Type": "application/x-ndjson"})
+
+    assert respuesta.json()["insertados"] == 2
+    assert importados(db) == [("Kiwi", 2.5, 1, 1), ("Agua", 0.4, 3, 3)]
+
+
+def test_csv_con_filas_erroneas(cliente, db):
+    contenido = "\n".join([
+        "nombre,precio,supermercado,categoria",
+        "Kiwi,2.5,Carrefour,Frutas",
+        "Agua,gratis,Lidl,Bebidas",
+        "Queso,8,Aldi",
+        "Mango,3,No existe,Frutas",
+        "Papaya,4,Aldi,No existe",
+        "Agua,0.4,Lidl,Bebidas",
+    ])
+
+    respuesta = cliente.post(f"{URL}?formato=csv", content=contenido)
+
+    assert respuesta.status_code == 200
+    resultado = respuesta.json()
+    assert resultado["insertados"] == 2 and resultado["num_errores"] == 4
+    assert [(error["linea"], error["error"]) for error in resultado["errores"]] == [
+        (3, "precio: Input should be a valid number, unable to parse string as a number"),
+        (4, "Se esperaban 4 columnas y hay 3"),
+        (5, "Supermercado no encontrado"),
+        (6, "Categoría no encontrada"),
+    ]
+    assert [nombre for nombre, *_ in importados(db)] == ["Kiwi", "Agua"]
+
+
+def test_ndjson_con_filas_erroneas(cliente, db):
+    contenido = ndjson(
+        "{no es json",
+        ["Kiwi", 2.5],
+        {"nombre": "Kiwi", "precio": 2.5, "supermercado": "Carrefour"},
+        {"nombre": "Kiwi", "precio": 2.5, "supermercado": "Carrefour", "categoria": "Frutas"},
+    )
+
+    resultado = cliente.post(f"{URL}?formato=ndjson", content=contenido).json()
+
+    assert resultado["insertados"] == 1
+    assert [(error["linea"], error["error"]) for error in resultado["errores"]] == [
+        (1, "JSON inválido"),
+        (2, "Se esperaba un objeto JSON"),
+        (3, "categoria: Field required"),
+    ]
+
+
+@pytest.mark.parametrize("url, contenido", [
+    (f"{URL}?formato=csv", "nombre,precio,supermercado\nKiwi,2.5,Carrefour\n"),
+    (f"{URL}?formato=csv", "Kiwi,2.5,Carrefour,Frutas\n"),
+    (f"{URL}?formato=xml", "<productos/>"),
+])
+def test_peticion_no_valida(cliente, db, url, contenido):
+    assert cliente.post(url, content=contenido).status_code == 400
+    assert importados(db) == []
+
+
+# Varios lotes y el límite de errores devueltos
+def test_lotes_y_maximo_errores(cliente, db, monkeypatch):
+    monkeypatch.setattr(importacion, "TAMANO_LOTE_IMPORTACION", 2)
+    monkeypatch.setattr(importacion, "MAXIMO_ERRORES", 2)
+    filas = [f"Producto {i},{i},Carrefour,Frutas" for i in range(5)] + ["Malo,x,Carrefour,Frutas"] * 3
+
+    resultado = cliente.post(f"{URL}?formato=csv", content="\n".join(["nombre,precio,supermercado,categoria", *filas])).json()
+
+    assert resultado["insertados"] == 5
+    assert resultado["num_errores"] == 3 and len(resultado["errores"]) == 2
+    assert [nombre for nombre, *_ in importados(db)] == [f"Producto {i}" for i in range(5)]
@@ -0,0 +1,123 @@
+import time
+import pytest
+from sqlalchemy import insert, update
+from app import models
+from app.indices.ordenados import indices_ordenados
+from app.indices.refresco import refresco_ordenados
+
+# Nombres que cambian de orden según la colación, y productos sin nombre o sin precio
+PRODUCTOS = [
+    ("agua", 0.5), ("Zumo", 2.0), ("Ñame", 3.1), ("Árbol", 1.0), ("zanahoria", None),
+    (None, 2.0), (None, None), ("Leche", 0.95), ("Leche", 2.0), ("Leche", None),
+]
+
+
+@pytest.fixture
+def con_indice(db, monkeypatch):
+    db.execute(insert(models.Producto), [
+        dict(nombre=nombre, precio=precio, supermercado_id=1, categoria_id=1) for nombre, precio in PRODUCTOS
+    ])
+    db.commit()
+    monkeypatch.setattr(indices_ordenados, "activo", True)
+    refresco_ordenados.reconstruir()
+    yield
+    indices_ordenados.reconstruir([])
+    refresco_ordenados.construido = None
+
+
+# Ids de todas las páginas siguiendo X-Siguiente-Cursor
+def ids_paginas(cliente, url: str, limite: int) -> list:
+    ids, cursor = [], None
+    while True:
+        respuesta = cliente.get(f"{url}&limit={limite}" + (f"&after={cursor}" if cursor else ""))
+        assert respuesta.status_code == 200
+        ids += [producto["id"] for producto in respuesta.json()]
+        cursor = respuesta.headers.get("X-Siguiente-Cursor")
+        if cursor is None:
+            return ids
+
+
+# Respuesta con el índice en memoria y con la consulta SQL
+def con_y_sin_indice(monkeypatch, consulta):
+    con_indice = consulta()
+    monkeypatch.setattr(indices_ordenados, "activo", False)
+    sin_indice = consulta()
+    monkeypatch.setattr(indices_ordenados, "activo", True)
+    return con_indice, sin_indice
+
+
+@pytest.mark.parametrize("orden", ["nombre", "precio"])
+@pytest.mark.parametrize("limite", [1, 3, 100])
+def test_paginas_del_indice_iguales_que_sql(cliente, con_indice, monkeypatch, orden, limite):
+    url = f"/productos/ordenados?orden={orden}"
+    con_indice, sin_indice = con_y_sin_indice(monkeypatch, lambda: ids_paginas(cliente, url, limite))
+    assert con_indice == sin_indice
+    assert len(con_indice) == len(set(con_indice)) == 15 + len(PRODUCTOS)
+
+
+# Cursores de una página del índice sirven para seguir con la consulta SQL y al revés
+def test_cursores_intercambiables(cliente, con_indice, monkeypatch):
+    url = "/productos/ordenados?orden=nombre&limit=4"
+    completo = ids_paginas(cliente, url, 4)
+    cursor = cliente.get(url).headers["X-Siguiente-Cursor"]
+    monkeypatch.setattr(indices_ordenados, "activo", False)
+    siguiente = cliente.get(f"{url}&after={cursor}").json()
+    assert [producto["id"] for producto in siguiente] == completo[4:8]
+
+
+@pytest.mark.parametrize("minimo, maximo", [(0, 100), (1, 2), (2, 2), (50, 60)])
+def test_rango_de_precios_igual_que_sql(cliente, db, con_indice, monkeypatch, minimo, maximo):
+    # Cambios hechos por otro worker: el índice de este no se entera
+    db.execute(update(models.Producto).where(models.Producto.nombre == "agua").values(precio=80.0))
+    db.execute(update(models.Producto).where(models.Producto.nombre == "Zumo").values(precio=None))
+    db.commit()
+
+    url = f"/productos/filtrar/precio?min_precio={minimo}&max_precio={maximo}"
+    con_indice, sin_indice = con_y_sin_indice(monkeypatch, lambda: cliente.get(url).json())
+    assert con_indice == sin_indice
+    if isinstance(con_indice, list):
+        precios = [producto["precio"] for producto in con_indice]
+        assert precios == sorted(precios) and all(minimo <= precio <= maximo for precio in precios)
+
+
+# Da por caducado el índice y espera a que la reconstrucción en segundo plano termine
+def caducar(monkeypatch):
+    monkeypatch.setattr(refresco_ordenados, "construido", refresco_ordenados.construido - refresco_ordenados.ventana - 1)
+
+
+def esperar_reconstruccion(reconstrucciones: int):
+    limite = time.monotonic() + 5
+    while refresco_ordenados.reconstrucciones == reconstrucciones and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert refresco_ordenados.reconstrucciones > reconstrucciones
+
+
+# Un producto que otro worker mueve al rango consultado aparece como mucho al caducar el índice
+def test_producto_que_entra_en_el_rango_desde_otro_worker(cliente, db, con_indice, monkeypatch):
+    url = "/productos/filtrar/precio?min_precio=70&max_precio=90"
+    db.execute(update(models.Producto).where(models.Producto.nombre == "agua").values(precio=80.0))
+    db.commit()
+    # Dentro de la ventana el índice de este worker todavía no lo ve
+    assert "error" in cliente.get(url).json()
+
+    caducar(monkeypatch)
+    reconstrucciones = refresco_ordenados.reconstrucciones
+    # Caducado, responde la consulta SQL mientras el índice se reconstruye
+    assert [producto["nombre"] for producto in cliente.get(url).json()] == ["agua"]
+    esperar_reconstruccion(reconstrucciones)
+    assert refresco_ordenados.vigente()
+    assert [producto["nombre"] for producto in cliente.get(url).json()] == ["agua"]
+
+
+def test_producto_creado_desde_otro_worker_en_paginas(cliente, db, con_indice, monkeypatch):
+    db.execute(insert(models.Producto).values(nombre="Aaa nuevo", precio=0.01, supermercado_id=1, categoria_id=1))
+    db.commit()
+    for orden in ("nombre", "precio"):
+        assert cliente.get(f"/productos/ordenados?orden={orden}&limit=1").json()[0]["nombre"] != "Aaa nuevo"
+
+    caducar(monkeypatch)
+    reconstrucciones = refresco_ordenados.reconstrucciones
+    assert cliente.get("/productos/ordenados?orden=precio&limit=1").json()[0]["nombre"] == "Aaa nuevo"
+    esperar_reconstruccion(reconstrucciones)
+    for orden in ("nombre", "precio"):
+        assert cliente.get(f"/productos/ordenados?orden={orden}&limit=1").json()[0]["nombre"] == "Aaa nuevo"
@@ -0,0 +1,105 @@
+import re
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, insert, text
+import main
+from app.db.database import engine
+from app.db import migraciones
+from app.db.migraciones import MIGRACIONES, VERSION_ESQUEMA, _m001_esquema_inicial, aplicar_migraciones, version_esquema
+
+
+def test_migracion_junta_productos_repetidos_en_una_lista(tmp_path):
+    motor = create_engine(f"sqlite:///{tmp_path / 'antigua.db'}")
+    # Base de datos en la versión 1 con un producto repetido en una lista
+    with motor.begin() as conexion:
+        _m001_esquema_inicial(conexion)
+        version_esquema.create(conexion)
+        conexion.execute(insert(version_esquema).values(version=1, descripcion="Esquema inicial", aplicada=datetime.utcnow()))
+        conexion.execute(text("INSERT INTO producto_lista (cantidad, precio, lista_compra_id, producto_id) VALUES "
+                              "(2, 4.0, 1, 1), (1, 2.0, 1, 2), (3, 6.0, 1, 1), (1, 2.0, 2, 1)"))
+
+    assert aplicar_migraciones(motor) == VERSION_ESQUEMA
+    with motor.connect() as conexion:
+        filas = conexion.execute(text(
+            "SELECT lista_compra_id, producto_id, cantidad, precio FROM producto_lista ORDER BY lista_compra_id, producto_id"
+        )).all()
+        lista = conexion.execute(text("SELECT num_productos, total FROM lista_compra")).all()
+    assert filas == [(1, 1, 5, 10.0), (1, 2, 1, 2.0), (2, 1, 1, 2.0)]
+    assert lista == []
+    motor.dispose()
+
+
+# Conexión de PostgreSQL que solo apunta las sentencias de una migración
+class ConexionPostgres:
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self):
+        self.sentencias = []
+
+    def execute(self, sentencia, *args):
+        self.sentencias.append(str(sentencia))
+
+
+# Inspector de una base de datos sin claves ajenas que quitar
+class InspectorVacio:
+    def get_foreign_keys(self, tabla):
+        return []
+
+
+# Cada migración se aplica en su propia transacción: las claves creadas NOT VALID
+# se validan en una migración posterior, no en la misma
+def test_claves_se_validan_en_otra_transaccion(monkeypatch):
+    monkeypatch.setattr(migraciones, "inspect", lambda conexion: InspectorVacio())
+    por_migracion = {}
+    for numero, _, migracion in MIGRACIONES[4:]:
+        conexion = ConexionPostgres()
+        migracion(conexion)
+        por_migracion[numero] = conexion.sentencias
+
+    for numero, sentencias in por_migracion.items():
+        creadas = {re.search(r"ADD CONSTRAINT (\w+)", s)[1] for s in sentencias if "NOT VALID" in s}
+        assert not any("VALIDATE" in s for s in sentencias if any(clave in s for clave in creadas))
+        for clave in creadas:
+            assert any(f"VALIDATE CONSTRAINT {clave}" in s for n, posteriores in por_migracion.items() if n > numero for s in posteriores)
+
+
+def test_arranque_falla_si_falla_una_migracion(monkeypatch):
+    def fallar(engine):
+        raise RuntimeError("migración rota")
+
+    monkeypatch.setattr(main, "aplicar_migraciones", fallar)
+    with pytest.raises(RuntimeError, match="migración rota"):
+        main.create_tables()
+
+
+# Peticiones que filtran o hacen join por las columnas indexadas
+URLS_CON_FILTRO = [
+    "/productos/buscar?supermercado_id=2&categoria_id=1",
+    "/productos/filtrar/precio?min_precio=1&max_precio=1.5",
+    "/productos/ordenados?orden=precio&limit=10",
+    "/productos/ordenados?orden=nombre&limit=10",
+    "/productos/1/historial",
+    "/supermercados/listas/1",
+    "/listas_compra/1",
+    "/listas_compra/1/productos",
+    "/listas_compra/1/comparar?tiendas=2",
+]
+
+# Tablas grandes que no se deben recorrer enteras; supermercado y categoría tienen pocas filas
+TABLAS_GRANDES = ("producto", "producto_lista", "lista_compra", "usuario", "historial_precio")
+_RECORRIDO = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.mark.parametrize("url", URLS_CON_FILTRO)
+def test_consultas_usan_indices(cliente_sintetico, sentencias, url):
+    sentencias.clear()
+    assert cliente_sintetico.get(url).status_code == 200
+
+    consultas = [(sql, parametros) for sql, parametros in sentencias if sql.lstrip().upper().startswith("SELECT")]
+    assert consultas
+    with engine.connect() as conexion:
+        for sql, parametros in consultas:
+            plan = [fila[-1] for fila in conexion.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, parametros)]
+            recorridos = [paso for paso in plan if (encontrado := _RECORRIDO.match(paso)) and encontrado.group(1) in TABLAS_GRANDES]
+            assert not recorridos, f"{url}: {sql}\n" + "\n".join(plan)
@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from app import metricas, perfilador
+from benchmarks.n_mas_uno import recorrer, rutas_sin_visitar
+
+
+# Todos los endpoints con el detector de N+1 en modo "error" (ver conftest.py)
+def test_todos_los_endpoints_sin_n_mas_uno(cliente):
+    metricas.rutas.clear()
+    with TestClient(main.app, raise_server_exceptions=False) as sin_excepciones:
+        resultados = recorrer(sin_excepciones)
+
+    assert [resultado for resultado in resultados if resultado[2] >= 500] == []
+    assert perfilador.infracciones == []
+    assert rutas_sin_visitar() == []
+
+
+def test_detector_lanza_al_superar_el_umbral():
+    perfil = perfilador.PerfilPeticion({"method": "GET", "path": "/prueba"})
+    for producto_id in range(perfilador.UMBRAL_N1):
+        perfil.registrar("SELECT * FROM producto WHERE id = ?", (producto_id,), 0.0, False, None)
+    with pytest.raises(perfilador.ConsultasRepetidas):
+        perfil.registrar("SELECT * FROM producto WHERE id = ?", (99,), 0.0, False, None)
+    assert perfilador.infracciones[-1][1] == "/prueba"
+    perfilador.infracciones.clear()
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import insert
+from app import models
+
+
+# Añade productos sin nombre, sin precio y con nombres y precios repetidos
+def anadir_nulos(db):
+    db.execute(insert(models.Producto), [
+        dict(nombre=nombre, precio=precio, supermercado_id=1, categoria_id=1)
+        for nombre, precio in [(None, 1.0), (None, None), ("Leche", None), ("Leche", 0.95), (None, 3.5), ("Arroz", None)]
+    ])
+    db.commit()
+
+
+# Recorre todas las páginas siguiendo X-Siguiente-Cursor
+def recorrer(cliente, url: str, limite: int) -> list:
+    productos, cursor = [], None
+    while True:
+        respuesta = cliente.get(f"{url}&limit={limite}" + (f"&after={cursor}" if cursor else ""))
+        assert respuesta.status_code == 200
+        productos += respuesta.json()
+        cursor = respuesta.headers.get("X-Siguiente-Cursor")
+        if cursor is None:
+            return productos
+
+
+@pytest.mark.parametrize("orden", ["nombre", "precio"])
+@pytest.mark.parametrize("limite", [1, 2, 5])
+def test_paginas_con_nulos(cliente, db, orden, limite):
+    anadir_nulos(db)
+    url = f"/productos/ordenados?orden={orden}"
+    completo = cliente.get(url).json()
+
+    paginado = recorrer(cliente, url, limite)
+
+    # Cada producto aparece una sola vez y en el mismo orden que sin paginar
+    assert [p["id"] for p in paginado] == [p["id"] for p in completo]
+    assert len({p["id"] for p in paginado}) == db.query(models.Producto).count()
+    # Los NULL van al final, ordenados por id
+    valores = [p[orden] for p in completo]
+    nulos = valores.index(None)
+    assert all(valor is None for valor in valores[nulos:])
+    assert valores[:nulos] == sorted(valores[:nulos])
+    ids_nulos = [p["id"] for p in completo[nulos:]]
+    assert ids_nulos == sorted(ids_nulos)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import main
+from app import metricas, models
+from app.db import database
+from app.db.replica import COOKIE_ESCRITURA, MiddlewareLecturaTrasEscritura
+
+NOMBRE = "Solo en la primaria"
+
+
+# Réplica de lectura en otro fichero SQLite, copia de la primaria con los datos iniciales.
+# Devuelve una función que crea clientes de la aplicación con el middleware de la réplica.
+@pytest.fixture
+def con_replica(cliente, tmp_path, monkeypatch):
+    ruta = tmp_path / "replica.db"
+    with sqlite3.connect(database.engine.url.database) as origen, sqlite3.connect(ruta) as destino:
+        origen.backup(destino)
+
+    motor = create_async_engine(f"sqlite+aiosqlite:///{ruta}")
+    monkeypatch.setattr(database, "replica_engine", motor)
+    monkeypatch.setattr(database, "AsyncSessionReplica", async_sessionmaker(bind=motor, class_=AsyncSession, expire_on_commit=False))
+    metricas.enrutado.clear()
+    yield lambda: TestClient(MiddlewareLecturaTrasEscritura(main.app))
+    asyncio.run(motor.dispose())
+
+
+def nombres_supermercados(cliente, formato: str = "json") -> set:
+    respuesta = cliente.get(f"/supermercados/?formato={formato}")
+    assert respuesta.status_code == 200
+    if formato == "ndjson":
+        return {json.loads(linea)["nombre"] for linea in respuesta.text.splitlines()}
+    return {supermercado["nombre"] for supermercado in respuesta.json()}
+
+
+def test_get_lee_de_la_replica(con_replica, db):
+    # Cambio solo en la primaria: la réplica va con retraso
+    db.add(models.Supermercado(nombre=NOMBRE))
+    db.commit()
+
+    cliente = con_replica()
+    assert NOMBRE not in nombres_supermercados(cliente)
+    assert NOMBRE not in nombres_supermercados(cliente, "ndjson")
+    assert metricas.enrutado[("GET", "/supermercados/", "replica", "lectura")] == 2
+
+
+def test_lectura_tras_escritura_va_a_la_primaria(con_replica):
+    escritor, otro = con_replica(), con_replica()
+
+    respuesta = escritor.post("/supermercados/nuevo", json={"nombre": NOMBRE})
+    assert respuesta.status_code == 200
+    assert float(respuesta.cookies[COOKIE_ESCRITURA]) > time.time()
+    assert metricas.enrutado[("POST", "/supermercados/nuevo", "primaria", "escritura")] == 1
+
+    # El cliente lleva la cookie en la siguiente petición y lee de la primaria
+    assert NOMBRE in nombres_supermercados(escritor)
+    assert metricas.enrutado[("GET", "/supermercados/", "primaria", "lectura_tras_escritura")] == 1
+
+    # Los demás clientes siguen leyendo de la réplica
+    assert NOMBRE not in nombres_supermercados(otro)
+
+
+def test_cookie_caducada_vuelve_a_la_replica(con_replica):
+    cliente = con_replica()
+    assert cliente.post("/supermercados/nuevo", json={"nombre": NOMBRE}).status_code == 200
+
+    cliente.cookies.set(COOKIE_ESCRITURA, str(time.time() - 1))
+    assert NOMBRE not in nombres_supermercados(cliente)
+
+
+def test_escritura_fallida_no_pone_la_cookie(con_replica):
+    respuesta = con_replica().delete("/supermercados/eliminar/999")
+    assert respuesta.status_code == 404
+    assert COOKIE_ESCRITURA not in respuesta.cookies
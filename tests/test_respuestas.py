@@ -0,0 +1,30 @@
+import json
+from fastapi import Response
+from sqlalchemy import create_engine, text
+from app.respuestas import respuesta_json, serializador_filas
+
+
+def test_serializador_filas():
+    serializar = serializador_filas(["id", "categoría", "con 'comillas'"])
+    assert serializar((1, "Lácteos", None)) == {"id": 1, "categoría": "Lácteos", "con 'comillas'": None}
+    assert list(serializar((1, 2, 3))) == ["id", "categoría", "con 'comillas'"]
+
+    with create_engine("sqlite://").connect() as conexion:
+        fila = conexion.execute(text("SELECT 1 AS id, 'Lácteos' AS categoria, NULL AS otra")).first()
+    assert serializar(fila) == {"id": 1, "categoría": "Lácteos", "con 'comillas'": None}
+
+
+# Las cabeceras del endpoint pasan a la respuesta, también las repetidas
+def test_respuesta_json_conserva_cabeceras_repetidas():
+    response = Response()
+    response.headers["ETag"] = '"v1"'
+    response.set_cookie("a", "1")
+    response.set_cookie("b", "2")
+
+    respuesta = respuesta_json({"ok": True}, response)
+
+    assert json.loads(respuesta.body) == {"ok": True}
+    assert respuesta.headers["etag"] == '"v1"'
+    assert [valor.split(";")[0] for valor in respuesta.headers.getlist("set-cookie")] == ["a=1", "b=2"]
+    assert respuesta.headers.getlist("content-length") == [str(len(respuesta.body))]
+    assert respuesta.headers["content-type"] == "application/json"
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import time
+from app import sesiones as modulo_sesiones
+from app.sesiones import Sesiones
+
+
+def test_emitir_y_resolver():
+    sesiones = Sesiones(duracion=60)
+    token, caduca = sesiones.emitir(7)
+    assert caduca > time.time()
+    assert sesiones.resolver(token) == 7
+
+    # Otro proceso con la misma clave valida el token por su firma
+    assert Sesiones().resolver(token) == 7
+
+
+def test_firma_alterada_o_clave_distinta(monkeypatch):
+    token, _ = Sesiones().emitir(7)
+    contenido, firma = token.rsplit(".", 1)
+    assert Sesiones().resolver(f"{contenido}.{firma[::-1]}") is None
+    assert Sesiones().resolver(token.replace("7.", "8.", 1)) is None
+    assert Sesiones().resolver("no-es-un-token") is None
+
+    monkeypatch.setattr(modulo_sesiones, "SECRET_KEY", "otra-clave")
+    assert Sesiones().resolver(token) is None
+
+
+def test_token_caducado(monkeypatch):
+    sesiones = Sesiones(duracion=60)
+    token, caduca = sesiones.emitir(7)
+
+    monkeypatch.setattr(modulo_sesiones.time, "time", lambda: caduca + 1)
+    assert sesiones.resolver(token) is None
+    assert Sesiones().resolver(token) is None
+
+
+def test_revocar():
+    sesiones = Sesiones()
+    token, _ = sesiones.emitir(7)
+    sesiones.revocar(token)
+    assert sesiones.resolver(token) is None
+    assert sesiones.estadisticas()["revocados"] == 1
+
+
+def test_login_y_logout(cliente):
+    usuario = {"username": "sesion", "password": "secreta", "nombre": "Ana", "apellido": "Pérez"}
+    assert cliente.post("/usuarios/registrar", json=usuario).status_code == 200
+    token = cliente.post("/usuarios/login", json=usuario).json()["token"]
+    cabeceras = {"Authorization": f"Bearer {token}"}
+
+    assert cliente.post("/usuarios/logout", headers=cabeceras).status_code == 200
+    assert cliente.post("/usuarios/logout", headers=cabeceras).status_code == 401
+
+
+def test_secret_key_obligatoria_en_produccion():
+    entorno = {clave: valor for clave, valor in os.environ.items() if clave != "SECRET_KEY"}
+    entorno["MODO_ARRANQUE"] = "verificar"
+    proceso = subprocess.run([sys.executable, "-c", "import app.sesiones"], env=entorno, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert proceso.returncode != 0
+    assert "Falta SECRET_KEY" in proceso.stderr
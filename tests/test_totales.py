@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event, func, select, update
+from app import models
+from app.db.database import async_engine
+from app.db.totales import reconciliar_totales, sumar_a_lista
+
+
+# (num_productos, total) guardados en cada lista
+def totales(db) -> dict:
+    db.expire_all()
+    return {
+        id: (num_productos, round(total, 2))
+        for id, num_productos, total in db.execute(
+            select(models.ListaCompra.id, models.ListaCompra.num_productos, models.ListaCompra.total)
+        )
+    }
+
+
+# (num_productos, total) de cada lista calculados a partir de producto_lista
+def calculados(db) -> dict:
+    de_la_lista = models.ProductoLista.lista_compra_id == models.ListaCompra.id
+    return {
+        id: (num_productos, round(total, 2))
+        for id, num_productos, total in db.execute(
+            select(
+                models.ListaCompra.id,
+                func.count(models.ProductoLista.id),
+                func.coalesce(func.sum(models.ProductoLista.precio), 0),
+            ).outerjoin(models.ProductoLista, de_la_lista).group_by(models.ListaCompra.id)
+        )
+    }
+
+
+def test_datos_iniciales(db):
+    assert totales(db) == calculados(db) == {1: (3, 57.5), 2: (3, 40.5), 3: (4, 45.2)}
+
+
+def test_agregar_producto(cliente, db):
+    respuesta = cliente.post("/listas_compra/1/producto?nombre_producto=Leche&cantidad=2")
+
+    assert respuesta.status_code == 200
+    assert totales(db)[1] == calculados(db)[1] == (4, 62.5)
+
+
+@pytest.mark.parametrize("url, estado", [
+    ("/listas_compra/1/producto?nombre_producto=Manzana&cantidad=1", 404),  # ya está en la lista
+    ("/listas_compra/1/producto?nombre_producto=No existe&cantidad=1", 404),
+    ("/listas_compra/99/producto?nombre_producto=Leche&cantidad=1", 404),
+])
+def test_agregar_producto_no_cambia_totales(cliente, db, url, estado):
+    antes = totales(db)
+    assert cliente.post(url).status_code == estado
+    assert totales(db) == antes
+
+
+# Otra petición agrega el mismo producto después de que esta compruebe que no está en la lista
+def test_agregar_producto_a_la_vez(cliente, db):
+    db.add(models.ProductoLista(lista_compra_id=1, producto_id=4, cantidad=1, precio=2.5))
+    db.execute(sumar_a_lista(1, 1, 2.5))
+    db.commit()
+
+    # La comprobación de duplicados no lo ve: busca un producto que no existe
+    def sin_ver_el_otro(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM producto_lista" in statement and parameters == (1, 4):
+            parameters = (1, -1)
+        return statement, parameters
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", sin_ver_el_otro, retval=True)
+    try:
+        respuesta = cliente.post("/listas_compra/1/producto?nombre_producto=Leche&cantidad=2")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", sin_ver_el_otro)
+
+    assert respuesta.status_code == 400
+    assert totales(db)[1] == calculados(db)[1] == (4, 60.0)
+
+
+def test_agregar_varios_productos(cliente, db):
+    respuesta = cliente.post("/listas_compra/1/productos", json=[
+        {"nombre_producto": "Leche", "cantidad": 2},
+        {"nombre_producto": "Pollo", "cantidad": 1},
+        {"nombre_producto": "Manzana", "cantidad": 1},
+        {"nombre_producto": "No existe", "cantidad": 1},
+    ])
+
+    assert respuesta.json()["agregados"] == 2
+    assert totales(db)[1] == calculados(db)[1] == (5, 68.5)
+
+
+def test_quitar_producto(cliente, db):
+    assert cliente.delete("/listas_compra/1/producto/2").status_code == 200
+    assert totales(db)[1] == calculados(db)[1] == (2, 51.5)
+
+    # Ya no está en la lista
+    assert cliente.delete("/listas_compra/1/producto/2").status_code == 404
+    assert totales(db)[1] == (2, 51.5)
+
+
+# El importe de cada producto se guarda al agregarlo: cambiar su precio no cambia los totales
+def test_cambiar_precio_no_cambia_totales(cliente, db):
+    antes = totales(db)
+
+    assert cliente.put("/productos/actualizar-precios", json={"modo": "absoluto", "valor": 1, "todos": True}).status_code == 200
+
+    assert totales(db) == calculados(db) == antes
+    # Los productos que se agregan después sí usan el precio nuevo
+    cliente.post("/listas_compra/1/producto?nombre_producto=Leche&cantidad=2")
+    assert totales(db)[1] == (4, 59.5)
+
+
+def test_reconciliar_totales(cliente, db):
+    correctos = totales(db)
+    db.add(models.ListaCompra(supermercado_id=1, usuario_id=1))
+    db.execute(update(models.ListaCompra).values(num_productos=7, total=-1))
+    db.commit()
+
+    resultado = db.execute(reconciliar_totales())
+    db.commit()
+
+    assert resultado.rowcount == 4
+    assert totales(db) == calculados(db) == {**correctos, 4: (0, 0)}